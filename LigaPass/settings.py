@@ -122,10 +122,19 @@ if PRODUCTION:
     }
 else:
     # Development: gunakan SQLite
+    # IMMEDIATE + timeout supaya transaksi paralel (mis. reservasi tiket) menunggu lock, bukan langsung gagal.
+    # Test DB memakai file karena SQLite in-memory tidak mendukung penulisan dari banyak thread.
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
         }
     }
 
@@ -200,6 +209,87 @@ MIDTRANS_CLIENT_KEY = os.getenv("MIDTRANS_CLIENT_KEY")
 MIDTRANS_SERVER_KEY = os.getenv("MIDTRANS_SERVER_KEY")
 MIDTRANS_MERCHANT_ID = os.getenv("MIDTRANS_MERCHANT_ID")
 
+# Client HTTP Midtrans (bookings/midtrans.py): timeout dalam detik, retry hanya untuk
+# panggilan idempoten (status/cancel), circuit breaker terbuka setelah N kegagalan beruntun
+MIDTRANS_BASE_URL = os.getenv("MIDTRANS_BASE_URL", "https://api.sandbox.midtrans.com/v2")
+MIDTRANS_CONNECT_TIMEOUT = 3
+MIDTRANS_READ_TIMEOUT = 10
+MIDTRANS_MAX_RETRIES = 2
+MIDTRANS_POOL_SIZE = 20
+MIDTRANS_BREAKER_THRESHOLD = 5
+MIDTRANS_BREAKER_RESET_SECONDS = 30
+MIDTRANS_SLOW_CALL_MS = 2000
+
+# Tier inventori tiket (opsional): '' = reservasi langsung ke DB,
+# 'local' = counter in-process (test/dev), 'redis' = counter di Redis (production)
+INVENTORY_BACKEND = os.getenv("INVENTORY_BACKEND", "")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+INVENTORY_FLUSH_BATCH_SIZE = 500
+
+# Cache bersama antar worker/proses: Idempotency-Key, antrean waiting room, dan generasi
+# rules promo harus terlihat oleh semua worker. Production (atau bila REDIS_URL di-set)
+# memakai Redis; selain itu LocMemCache untuk dev/test satu proses.
+if PRODUCTION or os.getenv("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'ligapass',
+        }
+    }
+
+# Waiting room pembelian tiket: masa berlaku token antrean dan interval polling klien (detik)
+WAITING_ROOM_TOKEN_MAX_AGE = 60 * 60 * 2
+WAITING_ROOM_POLL_SECONDS = 5
+
+# Masa tahan stok booking PENDING (menit). Booking yang sudah punya transaksi Midtrans
+# mendapat tambahan BOOKING_PAYMENT_TTL_MINUTES (dikirim sebagai custom_expiry ke Midtrans)
+BOOKING_HOLD_TTL_MINUTES = 15
+BOOKING_PAYMENT_TTL_MINUTES = 60
+# Umur maksimal detail halaman pembayaran yang tersimpan di Booking (menit sejak charge)
+PAYMENT_RESPONSE_TTL_MINUTES = BOOKING_PAYMENT_TTL_MINUTES
+BOOKING_SWEEP_BATCH_SIZE = 200
+
+# Inbox notifikasi Midtrans: ukuran batch worker dan batas percobaan per notifikasi
+PAYMENT_NOTIFICATION_BATCH_SIZE = 100
+PAYMENT_NOTIFICATION_MAX_ATTEMPTS = 5
+# Jeda retry notifikasi yang gagal (detik), dua kali lipat tiap percobaan: 30, 60, 120, 240
+PAYMENT_NOTIFICATION_RETRY_SECONDS = 30
+
+# Worker rekonsiliasi status pembayaran: ukuran batch dan jumlah request status paralel
+PAYMENT_RECONCILE_BATCH_SIZE = 200
+PAYMENT_RECONCILE_WORKERS = 8
+
+# Masa simpan snapshot ketersediaan tiket per match (detik); snapshot juga dihapus saat stok berubah
+AVAILABILITY_CACHE_TTL = 5
+
+# Secret HMAC untuk kode tiket (default SECRET_KEY) dan ukuran batch render QR
+TICKET_CODE_SECRET = os.getenv("TICKET_CODE_SECRET")
+TICKET_QR_BATCH_SIZE = 500
+
+# Sinkronisasi scan offline gerbang: maksimum scan per request dan ukuran chunk per transaksi
+GATE_SYNC_MAX_SCANS = 20000
+GATE_SYNC_CHUNK_SIZE = 500
+
+# Ukuran halaman default dan maksimum untuk feed tiket/booking (cursor pagination)
+PAGE_SIZE_DEFAULT = 50
+PAGE_SIZE_MAX = 200
+
+# Shard stok di DB (alternatif tier inventori tanpa Redis): kategori dengan kuota minimal
+# INVENTORY_SHARD_MIN_QUANTITY dipecah menjadi INVENTORY_SHARDS baris; 0 = nonaktif
+INVENTORY_SHARDS = int(os.getenv("INVENTORY_SHARDS", "0"))
+INVENTORY_SHARD_MIN_QUANTITY = 500
+
+# Masa simpan rules promo yang sudah dikompilasi per match (detik); juga dihapus saat Promotion berubah
+PROMO_RULES_CACHE_TTL = 300
+
+# Skor minimal (0-1) agar nama tim dari sumber data otomatis dipetakan ke tim yang ada;
+# di bawahnya nama dipakai apa adanya dan masuk antrian tinjauan admin (TeamNameReview)
+TEAM_RESOLVER_MIN_SCORE = 0.8
+
+# Masa simpan response untuk header Idempotency-Key (detik)
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
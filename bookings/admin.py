@@ -1,3 +1,51 @@
 from django.contrib import admin
+from .models import Booking, PaymentNotification, Promotion, SeatSection, StockMovement, WaitingRoom
 
-# Register your models here.
+@admin.register(WaitingRoom)
+class WaitingRoomAdmin(admin.ModelAdmin):
+    list_display = ('match', 'is_active', 'release_rate_per_minute', 'initial_release', 'opened_at')
+    list_filter = ('is_active',)
+    raw_id_fields = ('match',)
+
+@admin.register(Booking)
+class BookingAdmin(admin.ModelAdmin):
+    list_display = ('booking_id', 'user', 'status', 'total_price', 'midtrans_order_id', 'refund_required', 'created_at')
+    # refund_required: pembayaran masuk setelah booking EXPIRED/CANCELLED, perlu refund manual
+    list_filter = ('status', 'refund_required')
+    search_fields = ('booking_id', 'midtrans_order_id', 'user__username')
+    raw_id_fields = ('user', 'promotion')
+
+@admin.register(PaymentNotification)
+class PaymentNotificationAdmin(admin.ModelAdmin):
+    list_display = ('order_id', 'transaction_status', 'received_at', 'processed_at', 'attempts', 'last_error')
+    list_filter = ('transaction_status',)
+    search_fields = ('order_id',)
+
+@admin.register(SeatSection)
+class SeatSectionAdmin(admin.ModelAdmin):
+    list_display = ('venue', 'name', 'seat_category', 'rows', 'seats_per_row', 'order')
+    list_filter = ('seat_category',)
+    raw_id_fields = ('venue',)
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'code', 'kind', 'value', 'seat_category', 'match', 'starts_at', 'ends_at', 'is_active')
+    list_filter = ('kind', 'is_active', 'seat_category')
+    search_fields = ('name', 'code')
+    raw_id_fields = ('match',)
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'ticket_price', 'reason', 'delta', 'booking')
+    list_filter = ('reason',)
+    raw_id_fields = ('ticket_price', 'booking')
+
+    # Ledger append-only: hanya bisa dibaca dari admin
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class BookingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bookings'
+
+    def ready(self):
+        from matches.models import TicketPrice
+        from . import availability, inventory, ledger, pricing, shards
+        from .models import Promotion
+        post_save.connect(
+            inventory.on_ticket_price_saved,
+            sender=TicketPrice
+        )
+        post_save.connect(ledger.on_ticket_price_saved, sender=TicketPrice)
+        post_save.connect(shards.on_ticket_price_saved, sender=TicketPrice)
+        post_save.connect(availability.on_ticket_price_changed, sender=TicketPrice)
+        post_delete.connect(availability.on_ticket_price_changed, sender=TicketPrice)
+        post_save.connect(pricing.on_promotion_changed, sender=Promotion)
+        post_delete.connect(pricing.on_promotion_changed, sender=Promotion)
@@ -0,0 +1,88 @@
+"""
+Snapshot ketersediaan tiket per match untuk endpoint polling aplikasi.
+
+Payload JSON flutter_get_ticket_prices dibangun sekali lalu disimpan di
+cache beserta ETag-nya. Snapshot dihapus setiap kali stok match tersebut
+berubah (reservasi, pengembalian stok, perubahan TicketPrice) dan juga
+kadaluarsa sendiri setelah AVAILABILITY_CACHE_TTL detik. Klien yang mengirim
+If-None-Match dengan ETag yang sama mendapat 304 tanpa query ke DB.
+"""
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+
+def snapshot_cache_key(match_id):
+    return f"bookings:availability:{match_id}"
+
+
+def _build_snapshot(match_id):
+    from matches.models import Match, TicketPrice
+    from bookings import inventory, shards
+
+    match = (
+        Match.objects.select_related('home_team', 'away_team')
+        .only('id', 'home_team__name', 'away_team__name')
+        .filter(id=match_id).first()
+    )
+    if match is None:
+        return None
+
+    rows = list(
+        TicketPrice.objects.filter(match_id=match_id).order_by('price')
+        .values_list('id', 'seat_category', 'price', 'quantity_available')
+    )
+    quantities = {pk: quantity for pk, _, _, quantity in rows}
+    if inventory.is_enabled():
+        # Saat tier inventori aktif, counter lebih baru daripada kolom di DB
+        quantities.update(inventory.get_store().get_many(list(quantities)))
+    elif shards.is_enabled():
+        # Kategori yang di-shard: stok terbaru = total shard (TicketPrice menunggu flush)
+        quantities.update(shards.totals(quantities))
+
+    payload = {
+        'status': True,
+        'match': {
+            'id': str(match.id),
+            'title': f"{match.home_team.name} vs {match.away_team.name}",
+        },
+        'tickets': [
+            {
+                'id': pk,
+                'match_id': str(match.id),
+                'seat_category': seat_category,
+                'price': float(price),
+                'quantity_available': quantities[pk],
+            }
+            for pk, seat_category, price, _ in rows
+        ],
+    }
+    content = json.dumps(payload, cls=DjangoJSONEncoder).encode()
+    return {'etag': hashlib.sha1(content).hexdigest(), 'content': content}
+
+
+def get_snapshot(match_id):
+    """{'etag', 'content'} untuk match, dari cache bila ada; None jika match tidak ada."""
+    key = snapshot_cache_key(match_id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = _build_snapshot(match_id)
+        if snapshot is not None:
+            cache.set(key, snapshot, getattr(settings, "AVAILABILITY_CACHE_TTL", 5))
+    return snapshot
+
+
+def invalidate(match_ids):
+    """Hapus snapshot match setelah transaksi yang mengubah stok ter-commit."""
+    keys = [snapshot_cache_key(match_id) for match_id in set(match_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def on_ticket_price_changed(sender, instance, raw=False, **kwargs):
+    """Signal post_save/post_delete TicketPrice (admin, sinkronisasi jadwal, dsb.)."""
+    if not raw:
+        invalidate([instance.match_id])
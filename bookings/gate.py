@@ -0,0 +1,142 @@
+"""
+Validasi tiket di gerbang stadion.
+
+- scan_ticket: satu SELECT mencari tiket (match, status booking), lalu
+  UPDATE bersyarat pada baris tiket itu saja (pk, is_used=False). UPDATE
+  tanpa join di-compile menjadi WHERE pada satu baris, sehingga dua scan
+  bersamaan untuk kode yang sama tidak bisa sama-sama ACCEPTED (filter
+  dengan join menjadi WHERE id IN (SELECT ...) yang bisa dievaluasi kedua
+  scan sebelum salah satunya commit).
+- sync_scans: unggahan massal scan offline, diproses per chunk dengan satu
+  SELECT ... FOR UPDATE dan satu UPDATE per chunk.
+- build_manifest: daftar ringkas hash kode tiket yang masih berlaku untuk
+  scanner offline (8 byte SHA-256 per kode, terurut, base64), cukup dicari
+  dengan binary search di perangkat.
+"""
+import base64
+import hashlib
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from bookings.models import Ticket
+
+MANIFEST_DIGEST_BYTES = 8
+
+ACCEPTED = 'accepted'
+ALREADY_USED = 'already_used'
+INVALID = 'invalid'
+WRONG_MATCH = 'wrong_match'
+
+
+def code_digest(code):
+    return hashlib.sha256(code.encode()).digest()[:MANIFEST_DIGEST_BYTES]
+
+
+def scan_ticket(match_id, code, now=None):
+    """Validasi dan tandai satu tiket. Mengembalikan {'result', 'used_at'}."""
+    now = now or timezone.now()
+    code = (code or '').strip().upper()
+    ticket = Ticket.objects.filter(code=code).values(
+        'pk', 'is_used', 'used_at', 'ticket_type__match_id', 'booking__status'
+    ).first()
+    # Tiket dari booking yang tidak (lagi) CONFIRMED, mis. kadaluarsa/dibatalkan, tidak berlaku
+    if ticket is None or ticket['booking__status'] != 'CONFIRMED':
+        return {'result': INVALID, 'used_at': None}
+    if str(ticket['ticket_type__match_id']) != str(match_id):
+        return {'result': WRONG_MATCH, 'used_at': None}
+    if not ticket['is_used'] and Ticket.objects.filter(pk=ticket['pk'], is_used=False).update(is_used=True, used_at=now):
+        return {'result': ACCEPTED, 'used_at': now}
+    # Kalah balapan dengan scan lain: used_at milik scan yang menang
+    used_at = ticket['used_at'] if ticket['is_used'] else (
+        Ticket.objects.filter(pk=ticket['pk']).values_list('used_at', flat=True).first()
+    )
+    return {'result': ALREADY_USED, 'used_at': used_at}
+
+
+def _scan_time(value, now):
+    scanned_at = parse_datetime(value) if isinstance(value, str) else None
+    if scanned_at is None:
+        return now
+    if timezone.is_naive(scanned_at):
+        scanned_at = timezone.make_aware(scanned_at)
+    return min(scanned_at, now)
+
+
+def sync_scans(match_id, scans, chunk_size=None):
+    """
+    Terapkan scan offline [{'code', 'scanned_at'}, ...]. Scan pertama (paling
+    awal) untuk tiap kode yang diterima; sisanya dilaporkan sebagai konflik.
+    Elemen yang bukan object dihitung di 'malformed'.
+    Mengembalikan {'accepted': n, 'already_used': [...], 'invalid': [...],
+    'wrong_match': [...], 'duplicates': n, 'malformed': n}.
+    """
+    chunk_size = chunk_size or getattr(settings, "GATE_SYNC_CHUNK_SIZE", 500)
+    now = timezone.now()
+    earliest = {}
+    duplicates = malformed = 0
+    for scan in scans:
+        if not isinstance(scan, dict):
+            malformed += 1
+            continue
+        code = str(scan.get('code') or '').strip().upper()
+        if not code:
+            continue
+        scanned_at = _scan_time(scan.get('scanned_at'), now)
+        if code in earliest:
+            duplicates += 1
+            scanned_at = min(scanned_at, earliest[code])
+        earliest[code] = scanned_at
+
+    summary = {
+        'accepted': 0, ALREADY_USED: [], INVALID: [], WRONG_MATCH: [], 'duplicates': duplicates, 'malformed': malformed,
+    }
+    codes = list(earliest)
+    for start in range(0, len(codes), chunk_size):
+        chunk = codes[start:start + chunk_size]
+        with transaction.atomic():
+            rows = {
+                code: (pk, is_used, match, status)
+                for pk, code, is_used, match, status in Ticket.objects.select_for_update(of=('self',))
+                .filter(code__in=chunk)
+                .values_list('pk', 'code', 'is_used', 'ticket_type__match_id', 'booking__status')
+            }
+            accepted = {}
+            for code in chunk:
+                if code not in rows or rows[code][3] != 'CONFIRMED':
+                    summary[INVALID].append(code)
+                    continue
+                pk, is_used, ticket_match_id, _ = rows[code]
+                if str(ticket_match_id) != str(match_id):
+                    summary[WRONG_MATCH].append(code)
+                elif is_used:
+                    summary[ALREADY_USED].append(code)
+                else:
+                    accepted[pk] = earliest[code]
+
+            if accepted:
+                Ticket.objects.filter(pk__in=accepted).update(
+                    is_used=True,
+                    used_at=Case(
+                        *[When(pk=pk, then=Value(scanned_at)) for pk, scanned_at in accepted.items()],
+                        output_field=DateTimeField(),
+                    ),
+                )
+        summary['accepted'] += len(accepted)
+    return summary
+
+
+def build_manifest(match_id):
+    """Manifest scanner offline untuk match: hash kode tiket terkonfirmasi yang belum dipakai."""
+    codes = Ticket.objects.filter(
+        ticket_type__match_id=match_id, is_used=False, booking__status='CONFIRMED', code__isnull=False
+    ).values_list('code', flat=True)
+    digests = sorted(code_digest(code) for code in codes.iterator(chunk_size=5000))
+    return {
+        'match_id': str(match_id),
+        'generated_at': timezone.now().isoformat(),
+        'algorithm': f'sha256/{MANIFEST_DIGEST_BYTES * 8}',
+        'count': len(digests),
+        'hashes': base64.b64encode(b''.join(digests)).decode(),
+    }
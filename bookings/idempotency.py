@@ -0,0 +1,69 @@
+"""
+Dukungan header Idempotency-Key untuk endpoint booking dan pembayaran.
+
+Aplikasi mobile me-retry request saat jaringan putus. Dengan header
+Idempotency-Key, response pertama disimpan di cache bersama (TTL
+IDEMPOTENCY_KEY_TTL) dan retry dengan key yang sama mendapat response
+tersebut lagi tanpa menyentuh stok maupun Midtrans.
+"""
+import hashlib
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+HEADER = "Idempotency-Key"
+LOCK_TIMEOUT = 30
+
+
+def _cache_key(request, key):
+    raw = f"{request.user.pk}:{request.path}:{key}"
+    return "idempotency:" + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _should_store(response):
+    # Error server dan antrean (429) bersifat sementara; biarkan retry dieksekusi ulang
+    return response.status_code < 500 and response.status_code != 429
+
+
+def idempotent(view_func):
+    """Decorator: replay response POST pertama untuk Idempotency-Key yang sama."""
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if request.method != "POST" or not key:
+            return view_func(request, *args, **kwargs)
+
+        cache_key = _cache_key(request, key)
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+
+        stored = cache.get(cache_key)
+        if stored is None:
+            # Kunci singkat agar dua retry yang datang bersamaan tidak sama-sama dieksekusi
+            if not cache.add(f"{cache_key}:lock", 1, LOCK_TIMEOUT):
+                return JsonResponse(
+                    {"status": False, "message": "Request dengan Idempotency-Key ini sedang diproses"}, status=409
+                )
+            try:
+                response = view_func(request, *args, **kwargs)
+                if _should_store(response):
+                    cache.set(cache_key, {
+                        'fingerprint': fingerprint,
+                        'status': response.status_code,
+                        'content_type': response.get('Content-Type'),
+                        'content': response.content,
+                    }, getattr(settings, "IDEMPOTENCY_KEY_TTL", 60 * 60 * 24))
+                return response
+            finally:
+                cache.delete(f"{cache_key}:lock")
+
+        if stored['fingerprint'] != fingerprint:
+            return JsonResponse(
+                {"status": False, "message": "Idempotency-Key sudah dipakai untuk request yang berbeda"}, status=422
+            )
+        response = HttpResponse(stored['content'], status=stored['status'], content_type=stored['content_type'])
+        response["Idempotent-Replayed"] = "true"
+        return response
+
+    return wrapper
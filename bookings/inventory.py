@@ -0,0 +1,459 @@
+"""
+Tier inventori opsional untuk TicketPrice.quantity_available.
+
+Saat flash sale, setiap reservasi yang langsung meng-UPDATE baris TicketPrice
+membuat baris tersebut menjadi hot spot. Dengan INVENTORY_BACKEND diaktifkan,
+stok dijaga oleh counter atomik di cache (Redis di production, counter
+in-process untuk test/dev):
+
+- Reservasi mengurangi counter, lalu Booking + BookingItem disimpan ke DB
+  dengan stock_committed=False. Baris BookingItem inilah log write-behind
+  yang durable.
+- flush_pending_stock() menulis pengurangan yang tertunda ke TicketPrice
+  secara batch (satu UPDATE per batch) dan menandai item sebagai committed.
+- reconcile_counters() / refresh_counters() membangun ulang counter dari DB:
+  quantity_available - total BookingItem yang belum di-flush.
+
+Counter dan DB tidak berubah bersamaan: reservasi mengurangi counter lalu
+commit BookingItem, pengembalian stok commit ke DB lalu menambah counter.
+Agar refresh tidak menimpa operasi yang sedang berjalan, tiap counter punya
+versi (naik pada setiap reserve/release/settle) dan jumlah operasi in-flight
+(reserve sampai BookingItem commit, release_on_commit() sampai counter
+ditambah; lihat settle()). Counter hanya ditimpa bila versinya masih sama
+dengan sebelum stok DB dibaca dan tidak ada operasi in-flight; counter lain
+dilewati dan dicoba lagi.
+"""
+import threading
+import time
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+COUNTER_KEY_PREFIX = "ligapass:inventory:tp:"
+VERSION_KEY_PREFIX = "ligapass:inventory:ver:"
+INFLIGHT_KEY_PREFIX = "ligapass:inventory:inflight:"
+# Penanda in-flight kadaluarsa sendiri bila proses mati sebelum settle()
+INFLIGHT_TTL = 60
+REFRESH_ATTEMPTS = 3
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class LocalCounterStore:
+    """Counter in-process; pengganti Redis untuk test dan development satu proses."""
+
+    def __init__(self):
+        self._counters = {}
+        self._versions = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, pks):
+        with self._lock:
+            return {pk: self._counters[pk] for pk in pks if pk in self._counters}
+
+    def versions(self, pks):
+        with self._lock:
+            return {pk: self._versions.get(pk, 0) for pk in pks}
+
+    def init_many(self, counters):
+        """Set counter hanya jika belum ada (seperti SET NX)."""
+        with self._lock:
+            for pk, value in counters.items():
+                self._counters.setdefault(pk, value)
+
+    def set_if_unchanged(self, counters, versions):
+        """Timpa counter yang versinya masih sama dan tanpa reservasi in-flight; kembalikan pk yang dilewati."""
+        skipped = []
+        with self._lock:
+            for pk, value in counters.items():
+                if self._versions.get(pk, 0) != versions.get(pk, 0) or self._inflight_count(pk):
+                    skipped.append(pk)
+                else:
+                    self._counters[pk] = value
+        return skipped
+
+    def _inflight_count(self, pk):
+        count, deadline = self._inflight.get(pk, (0, 0))
+        return count if deadline > time.monotonic() else 0
+
+    def reserve(self, items):
+        """
+        Kurangi semua counter sekaligus atau tidak sama sekali dan tandai
+        reservasinya in-flight. Mengembalikan None jika berhasil, atau
+        (alasan, pk) untuk counter pertama yang belum dimuat ('missing') /
+        stoknya kurang ('short').
+        """
+        with self._lock:
+            for pk, qty in items.items():
+                if pk not in self._counters:
+                    return ('missing', pk)
+                if self._counters[pk] < qty:
+                    return ('short', pk)
+            deadline = time.monotonic() + INFLIGHT_TTL
+            for pk, qty in items.items():
+                self._counters[pk] -= qty
+                self._versions[pk] = self._versions.get(pk, 0) + 1
+                self._inflight[pk] = (self._inflight_count(pk) + 1, deadline)
+        return None
+
+    def begin(self, pks):
+        """Tandai counter in-flight tanpa mengubah nilainya (stok akan dikembalikan setelah commit)."""
+        with self._lock:
+            deadline = time.monotonic() + INFLIGHT_TTL
+            for pk in pks:
+                self._versions[pk] = self._versions.get(pk, 0) + 1
+                self._inflight[pk] = (self._inflight_count(pk) + 1, deadline)
+
+    def settle(self, pks):
+        with self._lock:
+            for pk in pks:
+                count = self._inflight_count(pk)
+                if count > 1:
+                    self._inflight[pk] = (count - 1, self._inflight[pk][1])
+                else:
+                    self._inflight.pop(pk, None)
+                self._versions[pk] = self._versions.get(pk, 0) + 1
+
+    def release(self, items):
+        with self._lock:
+            for pk, qty in items.items():
+                if pk in self._counters:
+                    self._counters[pk] += qty
+                self._versions[pk] = self._versions.get(pk, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._versions.clear()
+            self._inflight.clear()
+
+
+class RedisCounterStore:
+    """
+    Counter di Redis. Reservasi multi-kategori, settle, release, dan
+    penimpaan bersyarat saat refresh dijalankan atomik lewat skrip Lua.
+    KEYS skrip = n key counter, n key versi, lalu n key in-flight.
+    """
+
+    RESERVE_SCRIPT = """
+    local n = #KEYS / 3
+    for i = 1, n do
+        local value = redis.call('GET', KEYS[i])
+        if not value then return -i end
+        if tonumber(value) < tonumber(ARGV[i]) then return i end
+    end
+    for i = 1, n do
+        redis.call('DECRBY', KEYS[i], ARGV[i])
+        redis.call('INCR', KEYS[n + i])
+        redis.call('INCR', KEYS[2 * n + i])
+        redis.call('EXPIRE', KEYS[2 * n + i], ARGV[n + 1])
+    end
+    return 0
+    """
+
+    SETTLE_SCRIPT = """
+    local n = #KEYS / 2
+    for i = 1, n do
+        if tonumber(redis.call('GET', KEYS[n + i]) or '0') > 1 then
+            redis.call('DECR', KEYS[n + i])
+        else
+            redis.call('DEL', KEYS[n + i])
+        end
+        redis.call('INCR', KEYS[i])
+    end
+    return 0
+    """
+
+    BEGIN_SCRIPT = """
+    local n = #KEYS / 2
+    for i = 1, n do
+        redis.call('INCR', KEYS[i])
+        redis.call('INCR', KEYS[n + i])
+        redis.call('EXPIRE', KEYS[n + i], ARGV[1])
+    end
+    return 0
+    """
+
+    RELEASE_SCRIPT = """
+    local n = #KEYS / 2
+    for i = 1, n do
+        if redis.call('EXISTS', KEYS[i]) == 1 then
+            redis.call('INCRBY', KEYS[i], ARGV[i])
+        end
+        redis.call('INCR', KEYS[n + i])
+    end
+    return 0
+    """
+
+    # ARGV = n nilai baru lalu n versi yang dibaca sebelum snapshot DB; mengembalikan index yang dilewati
+    SET_IF_UNCHANGED_SCRIPT = """
+    local n = #KEYS / 3
+    local skipped = {}
+    for i = 1, n do
+        local version = redis.call('GET', KEYS[n + i]) or '0'
+        local inflight = tonumber(redis.call('GET', KEYS[2 * n + i]) or '0')
+        if version == ARGV[n + i] and inflight <= 0 then
+            redis.call('SET', KEYS[i], ARGV[i])
+        else
+            table.insert(skipped, i)
+        end
+    end
+    return skipped
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._reserve = self._client.register_script(self.RESERVE_SCRIPT)
+        self._begin = self._client.register_script(self.BEGIN_SCRIPT)
+        self._settle = self._client.register_script(self.SETTLE_SCRIPT)
+        self._release = self._client.register_script(self.RELEASE_SCRIPT)
+        self._set_if_unchanged = self._client.register_script(self.SET_IF_UNCHANGED_SCRIPT)
+
+    @staticmethod
+    def _key(pk):
+        return f"{COUNTER_KEY_PREFIX}{pk}"
+
+    @staticmethod
+    def _keys(pks, inflight=True):
+        keys = [f"{COUNTER_KEY_PREFIX}{pk}" for pk in pks] + [f"{VERSION_KEY_PREFIX}{pk}" for pk in pks]
+        if inflight:
+            keys += [f"{INFLIGHT_KEY_PREFIX}{pk}" for pk in pks]
+        return keys
+
+    def get_many(self, pks):
+        pks = list(pks)
+        values = self._client.mget([self._key(pk) for pk in pks]) if pks else []
+        return {pk: int(value) for pk, value in zip(pks, values) if value is not None}
+
+    def versions(self, pks):
+        pks = list(pks)
+        values = self._client.mget([f"{VERSION_KEY_PREFIX}{pk}" for pk in pks]) if pks else []
+        return {pk: int(value or 0) for pk, value in zip(pks, values)}
+
+    def init_many(self, counters):
+        pipe = self._client.pipeline()
+        for pk, value in counters.items():
+            pipe.set(self._key(pk), value, nx=True)
+        pipe.execute()
+
+    def set_if_unchanged(self, counters, versions):
+        pks = list(counters)
+        if not pks:
+            return []
+        skipped = self._set_if_unchanged(
+            keys=self._keys(pks),
+            args=[counters[pk] for pk in pks] + [versions.get(pk, 0) for pk in pks],
+        )
+        return [pks[i - 1] for i in skipped]
+
+    def reserve(self, items):
+        pks = list(items)
+        result = self._reserve(keys=self._keys(pks), args=[items[pk] for pk in pks] + [INFLIGHT_TTL])
+        if result == 0:
+            return None
+        if result < 0:
+            return ('missing', pks[-result - 1])
+        return ('short', pks[result - 1])
+
+    def begin(self, pks):
+        pks = list(pks)
+        if pks:
+            self._begin(
+                keys=[f"{VERSION_KEY_PREFIX}{pk}" for pk in pks] + [f"{INFLIGHT_KEY_PREFIX}{pk}" for pk in pks],
+                args=[INFLIGHT_TTL],
+            )
+
+    def settle(self, pks):
+        pks = list(pks)
+        if pks:
+            self._settle(keys=[f"{VERSION_KEY_PREFIX}{pk}" for pk in pks] + [f"{INFLIGHT_KEY_PREFIX}{pk}" for pk in pks])
+
+    def release(self, items):
+        pks = list(items)
+        if pks:
+            self._release(keys=self._keys(pks, inflight=False), args=[items[pk] for pk in pks])
+
+    def clear(self):
+        for prefix in (COUNTER_KEY_PREFIX, VERSION_KEY_PREFIX, INFLIGHT_KEY_PREFIX):
+            keys = list(self._client.scan_iter(f"{prefix}*"))
+            if keys:
+                self._client.delete(*keys)
+
+
+def is_enabled():
+    return bool(getattr(settings, "INVENTORY_BACKEND", ""))
+
+
+def get_store():
+    """Store counter sesuai settings.INVENTORY_BACKEND (dibuat sekali per proses)."""
+    global _store
+    backend = getattr(settings, "INVENTORY_BACKEND", "")
+    with _store_lock:
+        if _store is None or _store[0] != backend:
+            if backend == "redis":
+                _store = (backend, RedisCounterStore(settings.REDIS_URL))
+            elif backend == "local":
+                _store = (backend, LocalCounterStore())
+            else:
+                raise ValueError(f"INVENTORY_BACKEND tidak dikenal: {backend!r}")
+        return _store[1]
+
+
+def reset_store():
+    """Buang store aktif (dipakai test agar counter tidak bocor antar kasus)."""
+    global _store
+    with _store_lock:
+        _store = None
+
+
+def _current_stock(pks=None):
+    """
+    Stok sebenarnya per TicketPrice: nilai di DB dikurangi item yang belum
+    di-flush. Satu query, sehingga flush yang berjalan bersamaan tidak
+    terhitung dua kali.
+    """
+    from matches.models import TicketPrice
+
+    ticket_prices = TicketPrice.objects.all()
+    if pks is not None:
+        ticket_prices = ticket_prices.filter(pk__in=pks)
+    pending = Coalesce(Sum('bookingitem__quantity', filter=Q(bookingitem__stock_committed=False)), 0)
+    return dict(ticket_prices.annotate(stock=F('quantity_available') - pending).values_list('pk', 'stock'))
+
+
+def reserve(items):
+    """
+    Kurangi counter untuk {ticket_price_pk: jumlah}. Counter yang belum ada
+    dimuat dari DB terlebih dahulu. Mengembalikan None jika berhasil, atau pk
+    TicketPrice yang stoknya tidak cukup. Reservasi yang berhasil harus
+    diakhiri dengan settle() (setelah commit) atau release() + settle().
+    """
+    store = get_store()
+    result = store.reserve(items)
+    if result and result[0] == 'missing':
+        store.init_many(_current_stock(list(items)))
+        result = store.reserve(items)
+    if result is None:
+        return None
+    return result[1]
+
+
+def settle(items):
+    """Tandai reservasi {ticket_price_pk: jumlah} selesai (BookingItem sudah commit atau dibatalkan)."""
+    if items:
+        get_store().settle(list(items))
+
+
+def release(items):
+    """Kembalikan {ticket_price_pk: jumlah} ke counter sekarang (reservasi yang transaksinya gagal)."""
+    if items:
+        get_store().release(items)
+
+
+def release_on_commit(items):
+    """
+    Kembalikan {ticket_price_pk: jumlah} yang stoknya dikembalikan di DB oleh
+    transaksi aktif. Dipanggil di dalam transaksi tersebut: counter langsung
+    ditandai in-flight agar refresh tidak membaca stok DB yang sudah kembali
+    lalu ditambah lagi oleh release ini, dan counter baru ditambah setelah
+    commit (transaksi terluar). Bila transaksi di-rollback counter tidak
+    berubah dan penandanya kadaluarsa setelah INFLIGHT_TTL.
+    """
+    if not items:
+        return
+    store = get_store()
+    store.begin(list(items))
+
+    def _apply():
+        store.release(items)
+        store.settle(list(items))
+
+    transaction.on_commit(_apply)
+
+
+def _write_counters(pks):
+    """
+    Timpa counter dengan stok DB tanpa menghapus reserve/release yang terjadi
+    bersamaan: versi dibaca sebelum snapshot DB, lalu counter hanya ditimpa
+    bila versinya belum berubah dan tidak ada reservasi in-flight. Counter
+    yang dilewati dicoba lagi hingga REFRESH_ATTEMPTS kali; bila tetap sibuk,
+    nilainya dibiarkan (sudah mengikuti operasi atomik) sampai refresh berikutnya.
+    Mengembalikan jumlah counter yang ditulis.
+    """
+    store = get_store()
+    written = 0
+    for _ in range(REFRESH_ATTEMPTS):
+        if not pks:
+            break
+        versions = store.versions(pks)
+        counters = _current_stock(pks)
+        skipped = store.set_if_unchanged(counters, versions)
+        written += len(counters) - len(skipped)
+        pks = skipped
+    return written
+
+
+def refresh_counters(pks):
+    """Sinkronkan counter dengan stok terbaru dari DB (mis. setelah admin mengubah kuota)."""
+    return _write_counters(list(pks))
+
+
+def reconcile_counters(match_ids=None):
+    """
+    Bangun ulang counter dari DB. Dipanggil saat worker inventori mulai,
+    sebelum trafik reservasi diterima. Mengembalikan jumlah counter yang ditulis.
+    """
+    from matches.models import TicketPrice
+
+    ticket_prices = TicketPrice.objects.all()
+    if match_ids is not None:
+        ticket_prices = ticket_prices.filter(match_id__in=match_ids)
+    return _write_counters(list(ticket_prices.values_list('pk', flat=True)))
+
+
+def flush_pending_stock(batch_size=None):
+    """
+    Write-behind: terapkan pengurangan stok yang tertunda ke TicketPrice.
+    Tiap batch = satu UPDATE TicketPrice + satu UPDATE BookingItem dalam satu
+    transaksi. Mengembalikan jumlah BookingItem yang di-flush.
+    """
+    from matches.models import TicketPrice
+    from bookings.models import BookingItem
+
+    batch_size = batch_size or getattr(settings, "INVENTORY_FLUSH_BATCH_SIZE", 500)
+    flushed = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                BookingItem.objects.select_for_update(skip_locked=True)
+                .filter(stock_committed=False)
+                .order_by('pk')
+                .values_list('pk', 'ticket_type_id', 'quantity')[:batch_size]
+            )
+            if not rows:
+                return flushed
+
+            deltas = {}
+            for _, ticket_type_id, quantity in rows:
+                deltas[ticket_type_id] = deltas.get(ticket_type_id, 0) + quantity
+
+            TicketPrice.objects.filter(pk__in=deltas).update(
+                quantity_available=F('quantity_available') - Case(
+                    *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+                    output_field=IntegerField(),
+                )
+            )
+            BookingItem.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(stock_committed=True)
+        flushed += len(rows)
+
+
+def on_ticket_price_saved(sender, instance, raw=False, **kwargs):
+    """Sinkronkan counter ketika kuota TicketPrice diubah lewat save() (form admin, dsb.)."""
+    if raw or not is_enabled():
+        return
+    transaction.on_commit(lambda: refresh_counters([instance.pk]))
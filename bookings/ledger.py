@@ -0,0 +1,148 @@
+"""
+Ledger stok append-only (StockMovement).
+
+Setiap perubahan stok logis TicketPrice dicatat sebagai satu baris delta,
+ditulis dengan bulk INSERT di transaksi yang sama dengan perubahan stoknya:
+
+- INITIAL  TicketPrice baru dibuat (quantity_available awal)
+- ADJUST   kuota diubah lewat save() (form admin/match)
+- RESERVE  booking dibuat (delta negatif)
+- CANCEL / EXPIRE  booking dibatalkan/kadaluarsa dan stoknya kembali
+
+Stok logis = quantity_available dikurangi item tier inventori yang belum
+di-flush, sehingga flush_pending_stock() tidak menulis ledger. Total delta per
+TicketPrice (satu query SUM) selalu sama dengan stok logis tersebut.
+"""
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Sum, Value, When
+from django.utils import timezone
+from matches.models import TicketPrice
+from bookings import inventory, shards
+from bookings.models import BookingItem, StockMovement
+
+REASON_FOR_STATUS = {'CANCELLED': 'CANCEL', 'EXPIRED': 'EXPIRE'}
+
+
+# --- PENCATATAN ---
+def record_reservation(booking, reserved):
+    """Satu RESERVE per kategori untuk booking baru; reserved = [(TicketPrice, jumlah), ...]."""
+    StockMovement.objects.bulk_create([
+        StockMovement(ticket_price_id=tp.pk, booking=booking, delta=-qty, reason='RESERVE')
+        for tp, qty in reserved
+    ])
+
+
+def record_release(items, status):
+    """Movement pengembalian stok untuk item [(booking_id, ticket_type_id, jumlah), ...]."""
+    reason = REASON_FOR_STATUS.get(status, 'CANCEL')
+    StockMovement.objects.bulk_create([
+        StockMovement(ticket_price_id=ticket_type_id, booking_id=booking_id, delta=quantity, reason=reason)
+        for booking_id, ticket_type_id, quantity in items
+    ])
+
+
+# --- STOK DARI LEDGER ---
+def ledger_stock(ticket_price_ids=None):
+    """{ticket_price_pk: total delta} dengan satu query agregat."""
+    movements = StockMovement.objects.all()
+    if ticket_price_ids is not None:
+        movements = movements.filter(ticket_price_id__in=ticket_price_ids)
+    return dict(movements.values_list('ticket_price_id').annotate(total=Sum('delta')).order_by())
+
+
+def _pending(ticket_prices):
+    """{pk: jumlah item tier inventori yang belum di-flush ke TicketPrice}."""
+    return dict(
+        BookingItem.objects.filter(ticket_type__in=ticket_prices, stock_committed=False)
+        .values_list('ticket_type_id').annotate(total=Sum('quantity')).order_by()
+    )
+
+
+def expected_stock(ticket_prices):
+    """Stok logis saat ini {pk: quantity_available - item yang belum di-flush} untuk queryset TicketPrice."""
+    pending = _pending(ticket_prices)
+    return {pk: quantity - pending.get(pk, 0) for pk, quantity in ticket_prices.values_list('pk', 'quantity_available')}
+
+
+def on_ticket_price_saved(sender, instance, created=False, raw=False, **kwargs):
+    """Signal post_save TicketPrice: INITIAL untuk baris baru, ADJUST bila kuota berubah di luar booking."""
+    if raw:
+        return
+    if created:
+        StockMovement.objects.create(ticket_price=instance, delta=instance.quantity_available, reason='INITIAL')
+        return
+    expected = expected_stock(TicketPrice.objects.filter(pk=instance.pk)).get(instance.pk, 0)
+    delta = expected - ledger_stock([instance.pk]).get(instance.pk, 0)
+    if delta:
+        StockMovement.objects.create(ticket_price=instance, delta=delta, reason='ADJUST')
+
+
+# --- REKONSILIASI ---
+def reconcile(match_ids=None, apply=False):
+    """
+    Bandingkan stok dari ledger dengan stok logis TicketPrice. TicketPrice yang
+    belum punya INITIAL (mis. dibuat lewat bulk_create) diberi INITIAL lebih dulu.
+    Dengan apply=True, quantity_available ditulis ulang dari ledger.
+    Mengembalikan {'checked', 'seeded', 'drift': [(pk, ledger, expected), ...]}.
+    """
+    ticket_prices = TicketPrice.objects.all()
+    if match_ids is not None:
+        ticket_prices = ticket_prices.filter(match_id__in=match_ids)
+
+    with transaction.atomic():
+        expected = expected_stock(ticket_prices)
+        ledger = ledger_stock(list(expected))
+        seeded = set(expected) - set(
+            StockMovement.objects.filter(ticket_price_id__in=list(expected), reason='INITIAL')
+            .values_list('ticket_price_id', flat=True)
+        )
+        if seeded:
+            StockMovement.objects.bulk_create([
+                StockMovement(ticket_price_id=pk, delta=expected[pk] - ledger.get(pk, 0), reason='INITIAL')
+                for pk in seeded
+            ])
+            for pk in seeded:
+                ledger[pk] = expected[pk]
+
+        drift = [(pk, ledger.get(pk, 0), stock) for pk, stock in expected.items() if ledger.get(pk, 0) != stock]
+        if apply and drift:
+            pending = _pending(ticket_prices)
+            TicketPrice.objects.filter(pk__in=[pk for pk, *_ in drift]).update(quantity_available=Case(
+                *[When(pk=pk, then=Value(max(value + pending.get(pk, 0), 0))) for pk, value, _ in drift],
+                output_field=IntegerField(),
+            ))
+            if inventory.is_enabled():
+                transaction.on_commit(lambda: inventory.refresh_counters([pk for pk, *_ in drift]))
+            elif shards.is_enabled():
+                shards.rebalance(shards.sharded(pk for pk, *_ in drift))
+    return {'checked': len(expected), 'seeded': len(seeded), 'drift': drift}
+
+
+# --- KECEPATAN PENJUALAN ---
+def sales_velocity(match_id, minutes=60, now=None):
+    """
+    Ringkasan per kategori untuk dashboard admin dari ledger (satu query):
+    stok ledger, tiket terjual bersih dalam jendela `minutes`, dan laju per menit.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(minutes=minutes)
+    in_window = Q(stock_movements__created_at__gte=since)
+    rows = (
+        TicketPrice.objects.filter(match_id=match_id)
+        .annotate(
+            stock=Sum('stock_movements__delta'),
+            reserved=Sum('stock_movements__delta', filter=in_window & Q(stock_movements__reason='RESERVE')),
+            returned=Sum('stock_movements__delta', filter=in_window & Q(stock_movements__reason__in=('CANCEL', 'EXPIRE'))),
+        )
+        .values_list('seat_category', 'stock', 'reserved', 'returned')
+    )
+    summary = {}
+    for seat_category, stock, reserved, returned in rows:
+        sold = -(reserved or 0) - (returned or 0)
+        summary[seat_category] = {
+            'stock': stock or 0,
+            'sold': sold,
+            'per_minute': round(sold / minutes, 2) if minutes else 0.0,
+        }
+    return summary
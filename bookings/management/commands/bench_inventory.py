@@ -0,0 +1,78 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from authentication.models import User
+from matches.models import Match, Team, Venue, TicketPrice
+from bookings import inventory
+from bookings.models import Booking
+from bookings.services import InsufficientStock, reserve_tickets
+
+
+class Command(BaseCommand):
+    help = 'Membandingkan throughput reservasi tiket: langsung ke DB vs tier inventori (write-behind).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Jumlah reservasi per skenario.')
+        parser.add_argument('--workers', type=int, default=16, help='Jumlah thread paralel.')
+        parser.add_argument('--backend', choices=['local', 'redis'], default='local', help='Backend tier inventori.')
+
+    def handle(self, *args, **options):
+        total, workers = options['requests'], options['workers']
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f'bench-{tag}', email=f'bench-{tag}@example.com', role='user')
+        home = Team.objects.create(name=f'Bench Home {tag}')
+        away = Team.objects.create(name=f'Bench Away {tag}')
+        venue = Venue.objects.create(name=f'Bench Stadium {tag}', city='Bench City')
+        match = Match.objects.create(
+            home_team=home, away_team=away, venue=venue, date=timezone.now() + timezone.timedelta(days=1)
+        )
+
+        try:
+            db_rps = self._run(match, user, total, workers, backend='')
+            tier_rps = self._run(match, user, total, workers, backend=options['backend'])
+            self.stdout.write(f"-> DB langsung   : {db_rps:,.0f} req/s")
+            self.stdout.write(f"-> Tier {options['backend']:<9}: {tier_rps:,.0f} req/s ({tier_rps / db_rps:.1f}x)")
+        finally:
+            Booking.objects.filter(user=user).delete()
+            match.delete()
+            home.delete()
+            away.delete()
+            venue.delete()
+            user.delete()
+
+    def _run(self, match, user, total, workers, backend):
+        ticket_price, _ = TicketPrice.objects.update_or_create(
+            match=match, seat_category='REGULAR',
+            defaults={'price': Decimal('150000'), 'quantity_available': total},
+        )
+
+        def attempt(_):
+            try:
+                reserve_tickets(user, match, {'REGULAR': 1})
+            except InsufficientStock:
+                pass
+            finally:
+                connection.close()
+
+        with override_settings(INVENTORY_BACKEND=backend):
+            if backend:
+                inventory.reset_store()
+                inventory.reconcile_counters(match_ids=[match.id])
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(attempt, range(total)))
+            elapsed = time.perf_counter() - start
+
+            if backend:
+                inventory.flush_pending_stock()
+
+        ticket_price.refresh_from_db()
+        if ticket_price.quantity_available != 0:
+            self.stderr.write(f"!!! Stok akhir {ticket_price.quantity_available}, seharusnya 0")
+        return total / elapsed
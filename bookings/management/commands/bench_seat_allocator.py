@@ -0,0 +1,116 @@
+import random
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from matches.models import Match, Team, Venue
+from bookings import seating
+from bookings.models import SeatSection
+
+# Stadion contoh: 30.000 kursi (kategori, jumlah section, baris, kursi per baris)
+LAYOUT = (
+    ('VVIP', 2, 20, 25),
+    ('VIP', 4, 25, 40),
+    ('REGULAR', 10, 50, 50),
+)
+
+
+class Command(BaseCommand):
+    help = 'Mengisi stadion 30 ribu kursi dengan grup pembeli 1-6 orang dan mengukur waktu alokasi kursi berdampingan.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-group', type=int, default=6, help='Ukuran grup pembeli terbesar.')
+        parser.add_argument('--db-groups', type=int, default=500, help='Jumlah alokasi lewat database (dengan lock).')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        venue = Venue.objects.create(name=f'Bench Stadium {tag}', city='Bench City')
+        home = Team.objects.create(name=f'Bench Home {tag}')
+        away = Team.objects.create(name=f'Bench Away {tag}')
+        match = Match.objects.create(
+            home_team=home, away_team=away, venue=venue, date=timezone.now() + timezone.timedelta(days=1)
+        )
+        try:
+            sections = SeatSection.objects.bulk_create([
+                SeatSection(
+                    venue=venue, name=f'{category[:3]}{i + 1}', seat_category=category,
+                    rows=rows, seats_per_row=width, order=order,
+                )
+                for order, (category, count, rows, width) in enumerate(LAYOUT)
+                for i in range(count)
+            ])
+            capacity = sum(section.capacity for section in sections)
+            self.stdout.write(f"{capacity:,} kursi di {len(sections)} section")
+
+            self._bench_memory(sections, random.Random(options['seed']), options['max_group'])
+            self._bench_db(match, random.Random(options['seed']), options['max_group'], options['db_groups'])
+        finally:
+            match.delete()
+            venue.delete()
+            home.delete()
+            away.delete()
+
+    def _bench_memory(self, sections, rng, max_group):
+        """Isi stadion sampai penuh hanya dengan bitmap di memori (biaya algoritma murni)."""
+        by_category = {}
+        for section in sections:
+            by_category.setdefault(section.seat_category, []).append(section)
+        occupied = {section.pk: 0 for section in sections}
+        widths = {section.pk: section.seats_per_row for section in sections}
+
+        timings, together, seated = [], 0, 0
+        open_categories = list(by_category)
+        while open_categories:
+            category = rng.choice(open_categories)
+            size = rng.randint(1, max_group)
+            start = time.perf_counter()
+            picked = seating.pick_seats(by_category[category], occupied, size)
+            timings.append(time.perf_counter() - start)
+            if picked is None:
+                # Sisa kursi kategori ini lebih sedikit dari ukuran grup: isi satu per satu lalu tutup
+                while seating.pick_seats(by_category[category], occupied, 1):
+                    seated += 1
+                open_categories.remove(category)
+                continue
+            seated += size
+            together += _seated_together(picked, widths)
+
+        timings.sort()
+        groups = len(timings)
+        self.stdout.write(
+            f"-> Memori  : {seated:,} kursi terisi lewat {groups:,} grup, "
+            f"rata-rata {sum(timings) / groups * 1e6:,.1f} µs, p99 {timings[int(groups * 0.99)] * 1e6:,.1f} µs, "
+            f"maks {timings[-1] * 1e6:,.1f} µs; {together / groups:.1%} grup duduk berdampingan"
+        )
+
+    def _bench_db(self, match, rng, max_group, groups):
+        """Alokasi lewat seating.allocate(): lock SeatOccupancy, hitung, tulis bitmap, commit."""
+        seating_categories = [category for category, *_ in LAYOUT]
+        timings = []
+        for _ in range(groups):
+            category = rng.choice(seating_categories)
+            start = time.perf_counter()
+            try:
+                with transaction.atomic():
+                    seating.allocate(match.pk, {category: rng.randint(1, max_group)})
+            except seating.SeatsUnavailable:
+                pass
+            timings.append(time.perf_counter() - start)
+
+        timings.sort()
+        self.stdout.write(
+            f"-> Database: {groups:,} alokasi, rata-rata {sum(timings) / groups * 1000:,.2f} ms, "
+            f"p99 {timings[int(groups * 0.99)] * 1000:,.2f} ms (termasuk lock dan commit)"
+        )
+
+
+def _seated_together(picked, widths):
+    """True bila semua kursi grup berurutan di satu baris yang sama."""
+    section_pk, first = picked[0]
+    width = widths[section_pk]
+    return all(
+        pk == section_pk and index == first + i and index // width == first // width
+        for i, (pk, index) in enumerate(picked)
+    )
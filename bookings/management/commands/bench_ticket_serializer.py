@@ -0,0 +1,116 @@
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from authentication.models import User
+from matches.models import Match, Team, Venue, TicketPrice
+from bookings.models import Booking, BookingItem, Ticket
+from bookings.serializers import TicketSerializer, ticket_rows
+from bookings.services import issue_tickets
+
+
+def _legacy_serialize(request, queryset):
+    """Cara lama: instance model + reverse()/build_absolute_uri() per tiket."""
+    results = []
+    for ticket in queryset.select_related(
+        'booking', 'ticket_type', 'ticket_type__match', 'ticket_type__match__home_team',
+        'ticket_type__match__away_team', 'ticket_type__match__venue',
+    ):
+        match = ticket.ticket_type.match
+        results.append({
+            'id': str(ticket.ticket_id),
+            'booking_id': str(ticket.booking.booking_id),
+            'seat_category': ticket.ticket_type.seat_category,
+            'match_title': f"{match.home_team.name} vs {match.away_team.name}",
+            'home_team_logo': request.build_absolute_uri(
+                reverse('matches:flutter_team_logo_proxy', args=[match.home_team.id])
+            ),
+            'away_team_logo': request.build_absolute_uri(
+                reverse('matches:flutter_team_logo_proxy', args=[match.away_team.id])
+            ),
+            'home_logo': match.home_team.display_logo_url,
+            'away_logo': match.away_team.display_logo_url,
+            'match_date': match.date.isoformat(),
+            'venue': match.venue.name if match.venue else None,
+            'is_used': ticket.is_used,
+            'generated_at': ticket.generated_at.isoformat(),
+        })
+    return results
+
+
+def _shared_serialize(request, queryset):
+    serializer = TicketSerializer(request)
+    results = []
+    for row in ticket_rows(queryset):
+        data = serializer.flutter(row)
+        data['home_logo'] = serializer.display_logo_url(row.home_id, row.home_name, row.home_logo_url, row.home_league)
+        data['away_logo'] = serializer.display_logo_url(row.away_id, row.away_name, row.away_logo_url, row.away_league)
+        results.append(data)
+    return results
+
+
+class Command(BaseCommand):
+    help = 'Mengukur biaya serialisasi per tiket untuk user dengan ratusan tiket: cara lama vs serializer bersama.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=500, help='Jumlah tiket milik user.')
+        parser.add_argument('--matches', type=int, default=20, help='Jumlah match tempat tiket tersebar.')
+        parser.add_argument('--repeat', type=int, default=5, help='Jumlah pengulangan per skenario.')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f'bench-{tag}', email=f'bench-{tag}@example.com', role='user')
+        venue = Venue.objects.create(name=f'Bench Stadium {tag}', city='Bench City')
+        teams, matches = [], []
+        per_match = max(1, options['tickets'] // options['matches'])
+
+        try:
+            for i in range(options['matches']):
+                home = Team.objects.create(name=f'Bench Home {tag} {i}')
+                away = Team.objects.create(name=f'Bench Away {tag} {i}')
+                teams += [home, away]
+                match = Match.objects.create(
+                    home_team=home, away_team=away, venue=venue, date=timezone.now() + timezone.timedelta(days=i + 1)
+                )
+                matches.append(match)
+                ticket_price = TicketPrice.objects.create(
+                    match=match, seat_category='REGULAR', price=Decimal('100000'), quantity_available=per_match
+                )
+                booking = Booking.objects.create(user=user, total_price=Decimal('100000') * per_match, status='CONFIRMED')
+                BookingItem.objects.create(booking=booking, ticket_type=ticket_price, quantity=per_match)
+                issue_tickets(booking)
+
+            request = RequestFactory().get('/bookings/flutter-user-tickets/', HTTP_HOST='localhost')
+            queryset = Ticket.objects.filter(user=user).order_by('-generated_at')
+            total = queryset.count()
+            self.stdout.write(f"{total} tiket di {len(matches)} match")
+
+            for label, serialize in (('Cara lama', _legacy_serialize), ('Serializer', _shared_serialize)):
+                elapsed, queries = self._measure(serialize, request, queryset, options['repeat'])
+                self.stdout.write(
+                    f"-> {label:<10}: {elapsed * 1e6 / total:,.1f} µs/tiket, "
+                    f"{elapsed * 1000:,.1f} ms/request, {queries} query"
+                )
+        finally:
+            Booking.objects.filter(user=user).delete()
+            for match in matches:
+                match.delete()
+            for team in teams:
+                team.delete()
+            venue.delete()
+            user.delete()
+
+    def _measure(self, serialize, request, queryset, repeat):
+        best = None
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                serialize(request, queryset)
+                elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, len(ctx.captured_queries)
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings.services import expire_stale_bookings
+
+
+class Command(BaseCommand):
+    help = 'Mengembalikan stok booking PENDING yang melewati masa tahan (hold TTL) dan menandainya EXPIRED.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Jalan terus sebagai worker periodik.')
+        parser.add_argument('--interval', type=float, default=60.0, help='Jeda antar sweep saat --loop (detik).')
+        parser.add_argument('--batch-size', type=int, default=None, help='Jumlah booking per transaksi.')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                reclaimed = expire_stale_bookings(batch_size=options['batch_size'])
+                self.stdout.write(
+                    f"Sweep selesai: {reclaimed['bookings']} hold direklamasi ({reclaimed['tickets']} tiket dikembalikan)."
+                )
+            except Exception as e:
+                self.stderr.write(f"Terjadi error pada sweeper: {e}")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,268 @@
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from authentication.models import User
+from matches.models import Match, Team, Venue, TicketPrice
+from bookings import inventory, midtrans, shards
+from bookings.models import Booking, BookingItem, Ticket
+from bookings.services import RELEASED_STATUSES, process_payment_notifications
+
+STEPS = ('create_booking', 'payment', 'notification')
+SERVER_KEY = 'loadtest-server-key'
+
+
+class _StubMidtransHandler(BaseHTTPRequestHandler):
+    """Midtrans palsu: setiap charge dibalas 'pending' dengan action QRIS setelah jeda server.latency."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        time.sleep(self.server.latency)
+        order_id = body.get('transaction_details', {}).get('order_id')
+        payload = json.dumps({
+            'status_code': '201',
+            'order_id': order_id,
+            'transaction_status': 'pending',
+            'actions': [{'name': 'generate-qr-code', 'method': 'GET', 'url': f'http://stub/qr/{order_id}'}],
+        }).encode()
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test alur booking: create_booking -> payment (Midtrans palsu) -> midtrans_notification '
+        'dari banyak worker paralel, lalu verifikasi stok tidak oversell.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=300, help='Jumlah pembeli (satu alur booking per pembeli).')
+        parser.add_argument('--workers', type=int, default=32, help='Jumlah thread paralel.')
+        parser.add_argument('--stock', type=int, default=250, help='Stok awal per kategori (VIP dan REGULAR).')
+        parser.add_argument('--max-quantity', type=int, default=4, help='Jumlah tiket maksimum per booking.')
+        parser.add_argument('--expire-rate', type=float, default=0.2, help='Porsi notifikasi expire (sisanya settlement).')
+        parser.add_argument('--midtrans-latency-ms', type=int, default=50, help='Jeda response Midtrans palsu.')
+        parser.add_argument('--backend', choices=['db', 'local', 'redis', 'shards'], default='db',
+                            help='Backend stok (tier inventori, atau shard StockShard di DB).')
+        parser.add_argument('--shards', type=int, default=8, help='Jumlah shard per kategori untuk --backend shards.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Jangan hapus data hasil load test.')
+        parser.add_argument('--force', action='store_true',
+                            help='Tetap jalan walau PRODUCTION aktif atau database bukan SQLite/test.')
+
+    def _check_database(self):
+        """Load test membuat dan menghapus user/match/booking: tolak database production tanpa --force."""
+        db = connection.settings_dict
+        if getattr(settings, 'PRODUCTION', False):
+            raise CommandError('PRODUCTION aktif; load test menulis dan menghapus data. Pakai --force bila memang disengaja.')
+        if db['ENGINE'] != 'django.db.backends.sqlite3' and not str(db['NAME']).startswith('test_'):
+            raise CommandError(
+                f"Database {db['NAME']!r} bukan SQLite maupun database test. Pakai --force bila memang disengaja."
+            )
+
+    def handle(self, *args, **options):
+        if not options['force']:
+            self._check_database()
+        tag = uuid.uuid4().hex[:8]
+        stub = ThreadingHTTPServer(('127.0.0.1', 0), _StubMidtransHandler)
+        stub.latency = options['midtrans_latency_ms'] / 1000
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+        backend = '' if options['backend'] in ('db', 'shards') else options['backend']
+        overrides = override_settings(
+            MIDTRANS_BASE_URL=f'http://127.0.0.1:{stub.server_port}/v2',
+            MIDTRANS_SERVER_KEY=SERVER_KEY,
+            MIDTRANS_POOL_SIZE=options['workers'],
+            INVENTORY_BACKEND=backend,
+            INVENTORY_SHARDS=options['shards'] if options['backend'] == 'shards' else 0,
+        )
+        overrides.enable()
+        midtrans.reset_client()
+        match, users = self._seed(tag, options)
+        try:
+            if backend:
+                inventory.reset_store()
+                inventory.reconcile_counters(match_ids=[match.id])
+            elif shards.is_enabled():
+                shards.rebalance(TicketPrice.objects.filter(match=match).values_list('pk', flat=True))
+            self._run(match, users, options)
+            self._verify(match, options['stock'])
+        finally:
+            if not options['keep']:
+                self._cleanup(match, users, tag)
+            midtrans.reset_client()
+            overrides.disable()
+            stub.shutdown()
+            stub.server_close()
+
+    # --- SEED ---
+    def _seed(self, tag, options):
+        venue = Venue.objects.create(name=f'Loadtest Stadium {tag}', city='Loadtest City')
+        match = Match.objects.create(
+            home_team=Team.objects.create(name=f'Loadtest Home {tag}'),
+            away_team=Team.objects.create(name=f'Loadtest Away {tag}'),
+            venue=venue, date=timezone.now() + timezone.timedelta(days=7),
+        )
+        for seat_category, price in (('VIP', Decimal('250000')), ('REGULAR', Decimal('75000'))):
+            TicketPrice.objects.create(match=match, seat_category=seat_category, price=price, quantity_available=options['stock'])
+
+        users = [User(username=f'loadtest-{tag}-{i}', email=f'loadtest-{tag}-{i}@example.com', role='user') for i in range(options['users'])]
+        for user in users:
+            user.set_unusable_password()
+        User.objects.bulk_create(users)
+        self.stdout.write(f"Seed: match {match.id}, {len(users)} pembeli, stok {options['stock']} per kategori")
+        return match, users
+
+    # --- LOAD ---
+    def _run(self, match, users, options):
+        rng = random.Random(options['seed'])
+        plans = [
+            (user, {rng.choice(('VIP', 'REGULAR')): rng.randint(1, options['max_quantity'])}, rng.random() < options['expire_rate'])
+            for user in users
+        ]
+        samples = {step: [] for step in STEPS}
+        outcomes = {'confirmed': 0, 'expired': 0, 'sold_out': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def record(step, elapsed, queries):
+            with lock:
+                samples[step].append((elapsed, queries))
+
+        def call(step, client, url, payload):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = client.post(url, json.dumps(payload), content_type='application/json')
+                elapsed = time.perf_counter() - start
+            record(step, elapsed, len(ctx.captured_queries))
+            return response
+
+        def flow(plan):
+            user, ticket_types, expire = plan
+            client = Client(HTTP_HOST='localhost')
+            client.force_login(user)
+            try:
+                response = call('create_booking', client, reverse('bookings:create_booking', args=[match.id]),
+                                {'types': ticket_types, 'method': 'gopay'})
+                if response.status_code == 400 and 'Not enough' in response.json().get('error', ''):
+                    return 'sold_out'
+                if response.status_code != 201:
+                    return 'errors'
+                booking_id = response.json()['booking_id']
+                total = response.json()['total_price']
+
+                response = call('payment', client, reverse('bookings:payment', args=[booking_id]), {'method': 'gopay'})
+                if response.status_code != 200:
+                    return 'errors'
+                order_id = response.json()['order_id']
+
+                gross_amount = f"{int(total)}.00"
+                status_code = '407' if expire else '200'
+                notification = {
+                    'order_id': order_id,
+                    'transaction_status': 'expire' if expire else 'settlement',
+                    'status_code': status_code,
+                    'gross_amount': gross_amount,
+                    'signature_key': hashlib.sha512(f"{order_id}{status_code}{gross_amount}{SERVER_KEY}".encode()).hexdigest(),
+                }
+                response = call('notification', Client(HTTP_HOST='localhost'), reverse('bookings:midtrans_notification'), notification)
+                if response.status_code != 200:
+                    return 'errors'
+                return 'expired' if expire else 'confirmed'
+            except Exception as e:
+                self.stderr.write(f"!!! {user.username}: {e}")
+                return 'errors'
+            finally:
+                connection.close()
+
+        # Response 400 "stok habis" memang diharapkan; jangan banjiri output dengan warning django.request
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                for outcome in pool.map(flow, plans):
+                    outcomes[outcome] += 1
+        finally:
+            request_logger.setLevel(level)
+        elapsed = time.perf_counter() - start
+
+        drain_start = time.perf_counter()
+        processed = process_payment_notifications()
+        drain_elapsed = time.perf_counter() - drain_start
+        if inventory.is_enabled() or shards.is_enabled():
+            inventory.flush_pending_stock()
+
+        self.stdout.write(
+            f"{len(plans)} alur dalam {elapsed:.2f} s ({len(plans) / elapsed:,.1f} alur/s, {options['workers']} worker): "
+            + ", ".join(f"{key} {value}" for key, value in outcomes.items())
+        )
+        self.stdout.write(f"{'step':<15}{'n':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'query':>7}")
+        for step in STEPS:
+            timings = sorted(elapsed_s for elapsed_s, _ in samples[step])
+            queries = [count for _, count in samples[step]]
+            if not timings:
+                continue
+            self.stdout.write(
+                f"{step:<15}{len(timings):>6}{len(timings) / elapsed:>9,.1f}"
+                f"{_percentile(timings, 50) * 1000:>9.1f}{_percentile(timings, 95) * 1000:>9.1f}"
+                f"{_percentile(timings, 99) * 1000:>9.1f}{sum(queries) / len(queries):>7.1f}"
+            )
+        self.stdout.write(f"Worker notifikasi: {processed} notifikasi dalam {drain_elapsed * 1000:,.0f} ms")
+
+    # --- VERIFIKASI ---
+    def _verify(self, match, stock):
+        failures = []
+        for ticket_price in TicketPrice.objects.filter(match=match):
+            held = BookingItem.objects.filter(ticket_type=ticket_price).exclude(
+                booking__status__in=RELEASED_STATUSES
+            ).aggregate(total=Sum('quantity'))['total'] or 0
+            line = f"{ticket_price.seat_category}: stok awal {stock} = sisa {ticket_price.quantity_available} + terjual {held}"
+            if stock != ticket_price.quantity_available + held:
+                failures.append(line)
+            self.stdout.write(('OK  ' if stock == ticket_price.quantity_available + held else 'GAGAL ') + line)
+
+        confirmed = BookingItem.objects.filter(
+            booking__status='CONFIRMED', ticket_type__match=match
+        ).aggregate(total=Sum('quantity'))['total'] or 0
+        issued = Ticket.objects.filter(ticket_type__match=match).count()
+        self.stdout.write(f"{'OK  ' if confirmed == issued else 'GAGAL '}Tiket terbit {issued} = kursi CONFIRMED {confirmed}")
+        if confirmed != issued:
+            failures.append(f"tiket terbit {issued} != kursi CONFIRMED {confirmed}")
+        if failures:
+            raise CommandError("Invarian stok dilanggar: " + "; ".join(failures))
+
+    def _cleanup(self, match, users, tag):
+        Booking.objects.filter(user__in=users).delete()
+        User.objects.filter(username__startswith=f'loadtest-{tag}-').delete()
+        home, away, venue = match.home_team, match.away_team, match.venue
+        match.delete()
+        home.delete()
+        away.delete()
+        venue.delete()
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings.services import process_payment_notifications
+
+
+class Command(BaseCommand):
+    help = 'Memproses inbox notifikasi Midtrans: konfirmasi booking, terbitkan tiket, atau kembalikan stok.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Jalan terus sebagai worker periodik.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Jeda saat inbox kosong (detik).')
+        parser.add_argument('--batch-size', type=int, default=None, help='Jumlah notifikasi per transaksi.')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = 0
+            try:
+                processed = process_payment_notifications(batch_size=options['batch_size'])
+                if processed or not options['loop']:
+                    self.stdout.write(f"{processed} notifikasi Midtrans diproses.")
+            except Exception as e:
+                self.stderr.write(f"Terjadi error pada worker notifikasi: {e}")
+
+            if not options['loop']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
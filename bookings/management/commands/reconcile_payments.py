@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings.services import reconcile_pending_payments
+
+
+class Command(BaseCommand):
+    help = 'Mencocokkan status booking PENDING dengan status transaksi di Midtrans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Jalan terus sebagai worker periodik.')
+        parser.add_argument('--interval', type=float, default=30.0, help='Jeda antar rekonsiliasi saat --loop (detik).')
+        parser.add_argument('--batch-size', type=int, default=None, help='Jumlah booking per batch.')
+        parser.add_argument('--workers', type=int, default=None, help='Jumlah request status Midtrans paralel.')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                summary = reconcile_pending_payments(batch_size=options['batch_size'], workers=options['workers'])
+                self.stdout.write(
+                    f"Rekonsiliasi selesai: {summary['checked']} dicek, {summary['confirmed']} terkonfirmasi, "
+                    f"{summary['released']} dibatalkan/kadaluarsa, {summary['errors']} gagal."
+                )
+            except Exception as e:
+                self.stderr.write(f"Terjadi error pada rekonsiliasi pembayaran: {e}")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings import ledger
+
+
+class Command(BaseCommand):
+    help = 'Mencocokkan stok TicketPrice dengan total ledger StockMovement (opsional menulis ulang stok dari ledger).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--match', action='append', dest='matches', help='Batasi ke match tertentu (boleh berulang).')
+        parser.add_argument('--apply', action='store_true', help='Tulis ulang quantity_available dari ledger untuk baris yang selisih.')
+        parser.add_argument('--loop', action='store_true', help='Jalan terus sebagai worker periodik.')
+        parser.add_argument('--interval', type=float, default=300.0, help='Jeda antar rekonsiliasi saat --loop (detik).')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                summary = ledger.reconcile(match_ids=options['matches'], apply=options['apply'])
+                self.stdout.write(
+                    f"Rekonsiliasi ledger: {summary['checked']} TicketPrice dicek, "
+                    f"{summary['seeded']} diberi INITIAL, {len(summary['drift'])} selisih."
+                )
+                for pk, ledger_stock, expected in summary['drift']:
+                    action = 'diperbaiki' if options['apply'] else 'dilaporkan'
+                    self.stdout.write(f"  TicketPrice {pk}: ledger {ledger_stock}, stok {expected} ({action})")
+            except Exception as e:
+                self.stderr.write(f"Terjadi error pada rekonsiliasi ledger: {e}")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
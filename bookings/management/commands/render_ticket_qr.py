@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings.ticket_codes import render_pending_qr
+
+
+class Command(BaseCommand):
+    help = 'Merender gambar QR tiket yang belum ada ke MEDIA_ROOT/tickets/qr secara batch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Jalan terus sebagai worker periodik.')
+        parser.add_argument('--interval', type=float, default=10.0, help='Jeda saat tidak ada tiket baru (detik).')
+        parser.add_argument('--batch-size', type=int, default=None, help='Jumlah QR per batch.')
+
+    def handle(self, *args, **options):
+        while True:
+            rendered = 0
+            try:
+                rendered = render_pending_qr(batch_size=options['batch_size'])
+                if rendered or not options['loop']:
+                    self.stdout.write(f"{rendered} QR tiket dirender.")
+            except Exception as e:
+                self.stderr.write(f"Terjadi error saat render QR: {e}")
+
+            if not options['loop']:
+                break
+            if not rendered:
+                time.sleep(options['interval'])
@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from bookings import inventory, shards
+
+
+class Command(BaseCommand):
+    help = (
+        'Menjalankan worker tier inventori / shard stok: rekonsiliasi counter, lalu flush write-behind '
+        'ke TicketPrice secara periodik.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=2.0, help='Jeda antar flush (detik).')
+        parser.add_argument('--once', action='store_true', help='Rekonsiliasi dan flush sekali lalu berhenti.')
+        parser.add_argument('--skip-reconcile', action='store_true', help='Jangan bangun ulang counter saat mulai.')
+
+    def handle(self, *args, **options):
+        if not inventory.is_enabled() and not shards.is_enabled():
+            raise CommandError("INVENTORY_BACKEND/INVENTORY_SHARDS belum diaktifkan; tidak ada stok tertunda untuk dikelola.")
+
+        self.stdout.write("Memulai Inventory Worker...")
+        if not options['skip_reconcile'] and inventory.is_enabled():
+            # Flush dulu supaya counter dibangun dari DB yang sudah up to date
+            flushed = inventory.flush_pending_stock()
+            count = inventory.reconcile_counters()
+            self.stdout.write(f"Rekonsiliasi selesai: {count} counter dibangun ulang ({flushed} item di-flush).")
+
+        while True:
+            try:
+                flushed = inventory.flush_pending_stock()
+                if flushed:
+                    self.stdout.write(f"Flush {flushed} item ke TicketPrice.")
+            except Exception as e:
+                self.stderr.write(f"Terjadi error pada worker: {e}")
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from matches.models import TicketPrice
+from bookings import inventory, shards
+
+
+class Command(BaseCommand):
+    help = (
+        'Membagi stok kategori bervolume tinggi ke beberapa baris StockShard '
+        '(atau membagi ulang / menghapus shard yang sudah ada).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--match', action='append', dest='matches', help='Batasi ke match tertentu (boleh berulang).')
+        parser.add_argument('--shards', type=int, default=None, help='Jumlah shard (default INVENTORY_SHARDS); 0 = hapus shard.')
+        parser.add_argument('--min-quantity', type=int, default=None,
+                            help='Kuota minimal kategori yang di-shard (default INVENTORY_SHARD_MIN_QUANTITY).')
+
+    def handle(self, *args, **options):
+        count = shards.shard_count() if options['shards'] is None else options['shards']
+        if count < 0:
+            raise CommandError("--shards tidak boleh negatif.")
+        minimum = options['min_quantity']
+        if minimum is None:
+            minimum = getattr(settings, "INVENTORY_SHARD_MIN_QUANTITY", 500)
+
+        ticket_prices = TicketPrice.objects.annotate(shard_rows=Count('stock_shards'))
+        if options['matches']:
+            ticket_prices = ticket_prices.filter(match_id__in=options['matches'])
+        if count:
+            # Kategori yang sudah punya shard selalu dibagi ulang walau kuotanya kini di bawah minimum
+            targets = [
+                pk for pk, quantity, shard_rows in ticket_prices.values_list('pk', 'quantity_available', 'shard_rows')
+                if shard_rows or quantity >= minimum
+            ]
+        else:
+            targets = list(ticket_prices.filter(shard_rows__gt=0).values_list('pk', flat=True))
+            # Pengurangan dari shard yang belum di-flush harus sudah ada di TicketPrice sebelum shard dihapus
+            inventory.flush_pending_stock()
+
+        done = shards.rebalance(targets, count=count)
+        if count:
+            self.stdout.write(f"{done} TicketPrice dibagi ke {count} shard.")
+        else:
+            self.stdout.write(f"Shard {done} TicketPrice dihapus.")
@@ -0,0 +1,185 @@
+"""
+Client HTTP Midtrans yang dipakai bersama oleh semua view pembayaran.
+
+- Satu requests.Session per proses (connection pool + keep-alive ke Midtrans).
+- Timeout connect/read selalu dipasang sehingga gateway yang lambat tidak
+  menahan worker.
+- Panggilan idempoten (status, cancel) di-retry terbatas dengan backoff saat
+  terjadi error jaringan atau 5xx. Charge tidak pernah di-retry.
+- Circuit breaker: setelah MIDTRANS_BREAKER_THRESHOLD kegagalan berturut-turut,
+  semua panggilan langsung gagal (MidtransUnavailable) selama
+  MIDTRANS_BREAKER_RESET_SECONDS, lalu satu panggilan percobaan diizinkan.
+- Latensi per operasi dicatat dan bisa dibaca lewat metrics().
+"""
+import base64
+import logging
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+logger = logging.getLogger(__name__)
+
+
+class MidtransUnavailable(requests.exceptions.RequestException):
+    """Midtrans sedang dianggap down (circuit breaker terbuka)."""
+
+
+class CircuitBreaker:
+    def __init__(self, threshold, reset_seconds):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        """True jika panggilan boleh dikirim. Saat half-open hanya satu panggilan percobaan."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+class MidtransClient:
+
+    def __init__(self, base_url, server_key, connect_timeout=3, read_timeout=10,
+                 max_retries=2, backoff=0.2, pool_size=20, breaker=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker(5, 30)
+
+        auth = base64.b64encode(f"{server_key or ''}:".encode()).decode()
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Basic {auth}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        })
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._metrics = {}
+        self._metrics_lock = threading.Lock()
+
+    def charge(self, payload):
+        return self._request("charge", "POST", "/charge", json=payload)
+
+    def status(self, order_id):
+        return self._request("status", "GET", f"/{order_id}/status", idempotent=True)
+
+    def cancel(self, order_id):
+        return self._request("cancel", "POST", f"/{order_id}/cancel", idempotent=True)
+
+    def _request(self, operation, method, path, json=None, idempotent=False):
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                self._record(operation, 0.0, "rejected")
+                raise MidtransUnavailable(f"Midtrans circuit open, {operation} dibatalkan")
+
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, self.base_url + path, json=json, timeout=self.timeout)
+            except requests.exceptions.RequestException:
+                self._record(operation, time.perf_counter() - started, "error")
+                self.breaker.record_failure()
+                if attempt == attempts - 1:
+                    raise
+            else:
+                elapsed = time.perf_counter() - started
+                if response.status_code not in RETRY_STATUSES:
+                    self._record(operation, elapsed, "ok")
+                    self.breaker.record_success()
+                    return response
+                self._record(operation, elapsed, "error")
+                self.breaker.record_failure()
+                if attempt == attempts - 1:
+                    return response
+            time.sleep(self.backoff * (2 ** attempt))
+
+    def _record(self, operation, elapsed, outcome):
+        with self._metrics_lock:
+            stats = self._metrics.setdefault(operation, {
+                'calls': 0, 'errors': 0, 'rejected': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            })
+            if outcome == "rejected":
+                stats['rejected'] += 1
+                return
+            elapsed_ms = elapsed * 1000
+            stats['calls'] += 1
+            stats['errors'] += outcome == "error"
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        if elapsed_ms >= getattr(settings, "MIDTRANS_SLOW_CALL_MS", 2000):
+            logger.warning("Midtrans %s lambat: %.0f ms (%s)", operation, elapsed_ms, outcome)
+
+    def metrics(self):
+        """Snapshot latensi per operasi: calls, errors, rejected, avg_ms, max_ms."""
+        with self._metrics_lock:
+            snapshot = {}
+            for operation, stats in self._metrics.items():
+                snapshot[operation] = dict(stats, avg_ms=stats['total_ms'] / stats['calls'] if stats['calls'] else 0.0)
+            snapshot['breaker'] = self.breaker.state
+            return snapshot
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Client Midtrans bersama untuk proses ini, dikonfigurasi dari settings."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MidtransClient(
+                settings.MIDTRANS_BASE_URL,
+                settings.MIDTRANS_SERVER_KEY,
+                connect_timeout=settings.MIDTRANS_CONNECT_TIMEOUT,
+                read_timeout=settings.MIDTRANS_READ_TIMEOUT,
+                max_retries=settings.MIDTRANS_MAX_RETRIES,
+                pool_size=settings.MIDTRANS_POOL_SIZE,
+                breaker=CircuitBreaker(settings.MIDTRANS_BREAKER_THRESHOLD, settings.MIDTRANS_BREAKER_RESET_SECONDS),
+            )
+        return _client
+
+
+def reset_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.session.close()
+        _client = None
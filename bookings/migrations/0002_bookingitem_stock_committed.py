@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingitem',
+            name='stock_committed',
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 11:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_bookingitem_stock_committed'),
+        ('matches', '0005_alter_match_away_goals_alter_match_home_goals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitingRoom',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_active', models.BooleanField(default=True)),
+                ('release_rate_per_minute', models.PositiveIntegerField(default=300, help_text='Jumlah pengunjung yang dipersilakan masuk per menit')),
+                ('initial_release', models.PositiveIntegerField(default=100, help_text='Jumlah pengunjung pertama yang langsung masuk saat antrean dibuka')),
+                ('opened_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('match', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='waiting_room', to='matches.match')),
+            ],
+        ),
+    ]
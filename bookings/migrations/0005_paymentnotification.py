@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_booking_status_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.CharField(max_length=100)),
+                ('transaction_status', models.CharField(max_length=30)),
+                ('fraud_status', models.CharField(blank=True, max_length=30, null=True)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['received_at'], name='payment_notification_todo_idx')],
+                'constraints': [models.UniqueConstraint(fields=('order_id', 'transaction_status'), name='payment_notification_dedup')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:08
+
+from django.db import migrations, models
+
+from bookings.ticket_codes import make_ticket_code
+
+
+def backfill_ticket_codes(apps, schema_editor):
+    Ticket = apps.get_model('bookings', 'Ticket')
+    batch = []
+    for ticket in Ticket.objects.filter(code__isnull=True).only('ticket_id').iterator(chunk_size=1000):
+        ticket.code = make_ticket_code(ticket.ticket_id)
+        batch.append(ticket)
+        if len(batch) >= 1000:
+            Ticket.objects.bulk_update(batch, ['code'])
+            batch = []
+    if batch:
+        Ticket.objects.bulk_update(batch, ['code'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_paymentnotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='code',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='qr_rendered',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(backfill_ticket_codes, migrations.RunPython.noop),
+    ]
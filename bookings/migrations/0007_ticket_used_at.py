@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_ticket_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='used_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
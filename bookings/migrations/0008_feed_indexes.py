@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_ticket_used_at'),
+        ('matches', '0005_alter_match_away_goals_alter_match_home_goals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-created_at', '-booking_id'], name='booking_user_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['-generated_at', '-ticket_id'], name='ticket_feed_idx'),
+        ),
+    ]
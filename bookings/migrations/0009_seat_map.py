@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_feed_indexes'),
+        ('matches', '0005_alter_match_away_goals_alter_match_home_goals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingitem',
+            name='seats',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='seat',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.CreateModel(
+            name='SeatSection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30)),
+                ('seat_category', models.CharField(choices=[('VVIP', 'VVIP'), ('VIP', 'VIP'), ('REGULAR', 'Regular')], max_length=10)),
+                ('rows', models.PositiveIntegerField()),
+                ('seats_per_row', models.PositiveIntegerField()),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_sections', to='matches.venue')),
+            ],
+            options={
+                'ordering': ['order', 'pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SeatOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bitmap', models.BinaryField(default=b'')),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_occupancy', to='matches.match')),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='bookings.seatsection')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='seatsection',
+            constraint=models.UniqueConstraint(fields=('venue', 'name'), name='seat_section_venue_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='seatoccupancy',
+            constraint=models.UniqueConstraint(fields=('match', 'section'), name='seat_occupancy_match_section'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_seat_map'),
+        ('matches', '0005_alter_match_away_goals_alter_match_home_goals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='discount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('code', models.CharField(blank=True, db_index=True, max_length=30, null=True)),
+                ('seat_category', models.CharField(blank=True, choices=[('VVIP', 'VVIP'), ('VIP', 'VIP'), ('REGULAR', 'Regular')], default='', max_length=10)),
+                ('kind', models.CharField(choices=[('PERCENT', 'Diskon persen'), ('AMOUNT', 'Potongan per tiket'), ('BUNDLE', 'Bundle (tiap min_quantity tiket, free_quantity gratis)')], default='PERCENT', max_length=10)),
+                ('value', models.DecimalField(decimal_places=2, default=0, help_text='Persen (PERCENT) atau rupiah per tiket (AMOUNT)', max_digits=10)),
+                ('min_quantity', models.PositiveIntegerField(default=1, help_text='Jumlah tiket minimum yang memenuhi syarat; ukuran bundle untuk BUNDLE')),
+                ('free_quantity', models.PositiveIntegerField(default=0, help_text='Tiket gratis per bundle (BUNDLE)')),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('per_user_limit', models.PositiveIntegerField(default=0, help_text='Maksimum booking per user dengan promo ini (0 = tanpa batas)')),
+                ('is_active', models.BooleanField(default=True)),
+                ('match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='matches.match')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='promotion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='bookings.promotion'),
+        ),
+    ]
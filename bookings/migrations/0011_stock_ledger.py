@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_ledger(apps, schema_editor):
+    """
+    Ledger awal dari data yang ada: RESERVE untuk setiap item booking yang
+    masih aktif, dan INITIAL sehingga total ledger = quantity_available dikurangi
+    item yang belum di-flush ke TicketPrice.
+    """
+    TicketPrice = apps.get_model('matches', 'TicketPrice')
+    BookingItem = apps.get_model('bookings', 'BookingItem')
+    StockMovement = apps.get_model('bookings', 'StockMovement')
+
+    committed = {}
+    movements = []
+    for ticket_type_id, booking_id, quantity, is_committed, created_at in (
+        BookingItem.objects.exclude(booking__status__in=('CANCELLED', 'EXPIRED'))
+        .values_list('ticket_type_id', 'booking_id', 'quantity', 'stock_committed', 'booking__created_at')
+        .iterator(chunk_size=2000)
+    ):
+        movements.append(StockMovement(
+            ticket_price_id=ticket_type_id, booking_id=booking_id, delta=-quantity, reason='RESERVE', created_at=created_at,
+        ))
+        if is_committed:
+            committed[ticket_type_id] = committed.get(ticket_type_id, 0) + quantity
+
+    for pk, quantity_available in TicketPrice.objects.values_list('pk', 'quantity_available').iterator(chunk_size=2000):
+        movements.append(StockMovement(
+            ticket_price_id=pk, delta=quantity_available + committed.get(pk, 0), reason='INITIAL',
+        ))
+    StockMovement.objects.bulk_create(movements, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_promotion'),
+        ('matches', '0005_alter_match_away_goals_alter_match_home_goals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('reason', models.CharField(choices=[('INITIAL', 'Stok awal'), ('ADJUST', 'Penyesuaian'), ('RESERVE', 'Reservasi'), ('CANCEL', 'Pembatalan'), ('EXPIRE', 'Kadaluarsa')], max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='bookings.booking')),
+                ('ticket_price', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='matches.ticketprice')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ticket_price', 'created_at'], name='stock_movement_tp_created_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
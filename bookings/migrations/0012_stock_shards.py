@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_stock_ledger'),
+        ('matches', '0005_alter_match_away_goals_alter_match_home_goals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('ticket_price', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_shards', to='matches.ticketprice')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ticket_price', 'shard'), name='stock_shard_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0012_stock_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='refund_required',
+            field=models.BooleanField(default=False),
+        ),
+    ]
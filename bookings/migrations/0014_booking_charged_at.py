@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0013_booking_refund_required'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='charged_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0014_booking_charged_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='midtrans_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='midtrans_status',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
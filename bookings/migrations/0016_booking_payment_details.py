@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0015_booking_midtrans_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='payment_details',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_ticket_user(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    Ticket = apps.get_model('bookings', 'Ticket')
+    Ticket.objects.update(
+        user_id=models.Subquery(Booking.objects.filter(pk=models.OuterRef('booking_id')).values('user_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0016_booking_payment_details'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ticket',
+            name='ticket_feed_idx',
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='user',
+            field=models.ForeignKey(
+                db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE,
+                related_name='tickets', to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(backfill_ticket_user, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='ticket',
+            name='user',
+            field=models.ForeignKey(
+                db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE,
+                related_name='tickets', to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['user', '-generated_at', '-ticket_id'], name='ticket_user_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0017_ticket_user_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentnotification',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
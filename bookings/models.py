@@ -1,8 +1,11 @@
-import datetime
 import uuid
 from django.db import models
 from django.conf import settings
-from matches.models import TicketPrice
+from django.core.cache import cache
+from django.utils import timezone
+from matches.models import Match, TicketPrice, Venue
+from bookings.ticket_codes import make_ticket_code
+from bookings.waiting_room import config_cache_key
 
 class Booking(models.Model):
     booking_status = [
@@ -14,12 +17,32 @@ class Booking(models.Model):
     booking_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     midtrans_order_id = models.CharField(max_length=100, blank=True, null=True)
     midtrans_actions = models.JSONField(blank=True, null=True)
+    # Field halaman pembayaran dari response charge (nomor VA, URL QR, expiry_time, ...); lihat store_payment_response
+    payment_details = models.JSONField(blank=True, null=True)
+    # Waktu charge Midtrans; masa bayar (BOOKING_PAYMENT_TTL_MINUTES) dihitung dari sini
+    charged_at = models.DateTimeField(blank=True, null=True)
+    # Status transaksi Midtrans terakhir dari worker reconcile_payments (dibaca endpoint status aplikasi)
+    midtrans_status = models.CharField(max_length=20, blank=True, default='')
+    midtrans_checked_at = models.DateTimeField(blank=True, null=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='bookings')
     status = models.CharField(max_length=10, choices=booking_status, default='PENDING')
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Promo yang dipakai saat checkout (lihat bookings/pricing.py); total_price sudah dipotong discount
+    promotion = models.ForeignKey('Promotion', on_delete=models.SET_NULL, blank=True, null=True, related_name='bookings')
+    discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # True bila pembayaran Midtrans masuk setelah booking EXPIRED/CANCELLED (stok sudah dilepas): dana harus direfund
+    refund_required = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Dipakai sweeper untuk mencari hold PENDING yang sudah kadaluarsa
+            models.Index(fields=['status', 'created_at'], name='booking_status_created_idx'),
+            # Feed riwayat booking user (keyset pagination)
+            models.Index(fields=['user', '-created_at', '-booking_id'], name='booking_user_feed_idx'),
+        ]
+
     def __str__(self):
         return f"Booking {self.booking_id} by {self.user.username}"
 
@@ -32,16 +55,212 @@ class BookingItem(models.Model):
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='items')
     ticket_type = models.ForeignKey(TicketPrice, choices=ticket_type, on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField(default=1)
+    # False selama pengurangan stok item ini baru tercatat di tier inventori (belum di-flush ke TicketPrice)
+    stock_committed = models.BooleanField(default=True)
+    # Kursi yang dialokasikan untuk item ini: [[section_id, index kursi], ...] (lihat bookings/seating.py)
+    seats = models.JSONField(blank=True, null=True)
 
     def __str__(self):
         return f"{self.quantity}x {self.ticket_type.seat_category} for {self.booking}"
 
+class SeatSection(models.Model):
+    """Satu tribun/section di Venue: rows baris x seats_per_row kursi, semuanya satu kategori."""
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name='seat_sections')
+    name = models.CharField(max_length=30)
+    seat_category = models.CharField(max_length=10, choices=TicketPrice.SEAT_CATEGORIES)
+    rows = models.PositiveIntegerField()
+    seats_per_row = models.PositiveIntegerField()
+    # Urutan pengisian: section dengan nilai lebih kecil diisi lebih dulu
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['order', 'pk']
+        constraints = [
+            models.UniqueConstraint(fields=['venue', 'name'], name='seat_section_venue_name'),
+        ]
+
+    @property
+    def capacity(self):
+        return self.rows * self.seats_per_row
+
+    def seat_label(self, index):
+        row, seat = divmod(index, self.seats_per_row)
+        return f"{self.name}-{row + 1}-{seat + 1}"
+
+    def __str__(self):
+        return f"{self.venue.name} {self.name} ({self.seat_category}, {self.capacity} kursi)"
+
+class SeatOccupancy(models.Model):
+    """Bitmap keterisian kursi satu section untuk satu match; bit 1 = kursi terisi."""
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='seat_occupancy')
+    section = models.ForeignKey(SeatSection, on_delete=models.CASCADE, related_name='occupancy')
+    bitmap = models.BinaryField(default=b'')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['match', 'section'], name='seat_occupancy_match_section'),
+        ]
+
+    def __str__(self):
+        return f"Occupancy {self.section} untuk {self.match}"
+
+class WaitingRoom(models.Model):
+    match = models.OneToOneField(Match, on_delete=models.CASCADE, related_name='waiting_room')
+    is_active = models.BooleanField(default=True)
+    release_rate_per_minute = models.PositiveIntegerField(default=300, help_text="Jumlah pengunjung yang dipersilakan masuk per menit")
+    initial_release = models.PositiveIntegerField(default=100, help_text="Jumlah pengunjung pertama yang langsung masuk saat antrean dibuka")
+    opened_at = models.DateTimeField(default=timezone.now)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(config_cache_key(self.match_id))
+
+    def delete(self, *args, **kwargs):
+        cache.delete(config_cache_key(self.match_id))
+        return super().delete(*args, **kwargs)
+
+    def __str__(self):
+        return f"Waiting room {self.match} ({self.release_rate_per_minute}/menit)"
+
+class Promotion(models.Model):
+    """Aturan promo checkout. Tanpa code = otomatis berlaku; tanpa match = berlaku untuk semua match."""
+    KINDS = [
+        ('PERCENT', 'Diskon persen'),
+        ('AMOUNT', 'Potongan per tiket'),
+        ('BUNDLE', 'Bundle (tiap min_quantity tiket, free_quantity gratis)'),
+    ]
+
+    name = models.CharField(max_length=100)
+    code = models.CharField(max_length=30, blank=True, null=True, db_index=True)
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, blank=True, null=True, related_name='promotions')
+    seat_category = models.CharField(max_length=10, choices=TicketPrice.SEAT_CATEGORIES, blank=True, default='')
+    kind = models.CharField(max_length=10, choices=KINDS, default='PERCENT')
+    value = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Persen (PERCENT) atau rupiah per tiket (AMOUNT)")
+    min_quantity = models.PositiveIntegerField(default=1, help_text="Jumlah tiket minimum yang memenuhi syarat; ukuran bundle untuk BUNDLE")
+    free_quantity = models.PositiveIntegerField(default=0, help_text="Tiket gratis per bundle (BUNDLE)")
+    # Jendela waktu berlaku (mis. early-bird); kosong = tanpa batas
+    starts_at = models.DateTimeField(blank=True, null=True)
+    ends_at = models.DateTimeField(blank=True, null=True)
+    per_user_limit = models.PositiveIntegerField(default=0, help_text="Maksimum booking per user dengan promo ini (0 = tanpa batas)")
+    is_active = models.BooleanField(default=True)
+
+    def save(self, *args, **kwargs):
+        self.code = self.code.strip().upper() if self.code else None
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.name} ({self.code or 'otomatis'})"
+
+class StockShard(models.Model):
+    """Potongan stok satu TicketPrice (lihat bookings/shards.py); total semua shard = stok logis."""
+    ticket_price = models.ForeignKey(TicketPrice, on_delete=models.CASCADE, related_name='stock_shards')
+    shard = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ticket_price', 'shard'], name='stock_shard_unique'),
+        ]
+
+    def __str__(self):
+        return f"Shard {self.shard} {self.ticket_price}: {self.quantity}"
+
+class StockMovement(models.Model):
+    """Ledger append-only perubahan stok TicketPrice (lihat bookings/ledger.py); delta negatif = stok berkurang."""
+    REASONS = [
+        ('INITIAL', 'Stok awal'),
+        ('ADJUST', 'Penyesuaian'),
+        ('RESERVE', 'Reservasi'),
+        ('CANCEL', 'Pembatalan'),
+        ('EXPIRE', 'Kadaluarsa'),
+    ]
+
+    ticket_price = models.ForeignKey(TicketPrice, on_delete=models.CASCADE, related_name='stock_movements')
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, blank=True, null=True, related_name='stock_movements')
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=10, choices=REASONS)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Rekonsiliasi (SUM per ticket_price) dan kecepatan penjualan per jendela waktu
+            models.Index(fields=['ticket_price', 'created_at'], name='stock_movement_tp_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("StockMovement bersifat append-only")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.reason} {self.delta:+d} {self.ticket_price}"
+
+class TicketQuerySet(models.QuerySet):
+    def with_effective_status(self, now=None):
+        """Anotasi effective_status ('active'/'used'/'expired') dihitung di SQL, sama dengan Ticket.effective_status."""
+        now = now or timezone.now()
+        return self.annotate(effective_status=models.Case(
+            models.When(is_used=True, then=models.Value('used')),
+            models.When(ticket_type__match__date__lt=now, then=models.Value('expired')),
+            default=models.Value('active'),
+            output_field=models.CharField(),
+        ))
+
+    def with_status(self, status, now=None):
+        """Filter tiket: active (belum dipakai, match belum mulai), used, atau expired."""
+        # Kondisi ditulis langsung (bukan filter pada anotasi) agar tetap bisa memakai index
+        now = now or timezone.now()
+        if status == 'used':
+            return self.filter(is_used=True)
+        if status == 'active':
+            return self.filter(is_used=False, ticket_type__match__date__gte=now)
+        if status == 'expired':
+            return self.filter(is_used=False, ticket_type__match__date__lt=now)
+        return self
+
+    def status_counts(self, now=None):
+        """Jumlah tiket per effective_status dalam satu query agregat."""
+        now = now or timezone.now()
+        unused = models.Q(is_used=False)
+        return self.aggregate(
+            active=models.Count('pk', filter=unused & models.Q(ticket_type__match__date__gte=now)),
+            used=models.Count('pk', filter=models.Q(is_used=True)),
+            expired=models.Count('pk', filter=unused & models.Q(ticket_type__match__date__lt=now)),
+        )
+
 class Ticket(models.Model):
     ticket_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='tickets')
+    # Salinan booking.user agar feed tiket user bisa seek langsung lewat ticket_user_feed_idx tanpa join
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tickets', db_index=False, editable=False
+    )
     ticket_type = models.ForeignKey(TicketPrice, on_delete=models.PROTECT)
     is_used = models.BooleanField(default=False)
+    used_at = models.DateTimeField(blank=True, null=True)
     generated_at = models.DateTimeField(auto_now_add=True)
+    # Kode HMAC untuk barcode/QR (lihat bookings/ticket_codes.py), dibuat saat tiket diterbitkan
+    code = models.CharField(max_length=32, unique=True, blank=True, null=True, editable=False)
+    qr_rendered = models.BooleanField(default=False)
+    # Label kursi (section-baris-kursi) bila venue punya peta kursi
+    seat = models.CharField(max_length=50, blank=True, null=True)
+
+    STATUSES = ('active', 'used', 'expired')
+
+    objects = TicketQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Feed tiket user (keyset pagination): seek per user, urut generated_at lalu ticket_id
+            models.Index(fields=['user', '-generated_at', '-ticket_id'], name='ticket_user_feed_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.code:
+            self.code = make_ticket_code(self.ticket_id)
+        if self.user_id is None:
+            self.user_id = self.booking.user_id
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Ticket {self.ticket_id} ({self.ticket_type.seat_category} for match {self.ticket_type.match.id}) for Booking {self.booking.booking_id}"
@@ -52,14 +271,48 @@ class Ticket(models.Model):
 
     @property
     def is_match_finished(self):
-        return self.ticket_type.match.date < datetime.datetime.now()
+        return self.ticket_type.match.date < timezone.now()
 
     @property
     def effective_status(self):
-
+        # Pakai nilai anotasi with_effective_status() bila ada, tanpa query match per tiket
+        annotated = self.__dict__.get('_effective_status')
+        if annotated is not None:
+            return annotated
         if self.is_used:
             return 'used'
         elif self.is_match_finished:
             return 'expired'
         else:
-            return 'active'
\ No newline at end of file
+            return 'active'
+
+    @effective_status.setter
+    def effective_status(self, value):
+        self.__dict__['_effective_status'] = value
+
+class PaymentNotification(models.Model):
+    """Inbox notifikasi Midtrans; diproses oleh worker process_payment_notifications."""
+    order_id = models.CharField(max_length=100)
+    transaction_status = models.CharField(max_length=30)
+    fraud_status = models.CharField(max_length=30, blank=True, null=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    # Percobaan yang gagal ditunda (backoff eksponensial) sebelum diambil worker lagi
+    next_attempt_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            # Midtrans me-retry notifikasi yang sama; cukup disimpan sekali per status
+            models.UniqueConstraint(fields=['order_id', 'transaction_status'], name='payment_notification_dedup'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['received_at'], name='payment_notification_todo_idx', condition=models.Q(processed_at__isnull=True)
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} {self.transaction_status}"
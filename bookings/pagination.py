@@ -0,0 +1,69 @@
+"""
+Keyset (cursor) pagination untuk feed tiket dan booking milik user.
+
+Urutan selalu terbaru dulu berdasarkan (waktu, pk). Cursor menyimpan
+(waktu, pk) baris terakhir halaman sebelumnya, sehingga halaman berikutnya
+cukup WHERE (waktu, pk) < cursor tanpa OFFSET: biaya tiap halaman tetap sama
+berapa pun jumlah tiket user.
+"""
+import base64
+import json
+import uuid
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(timestamp, pk):
+    raw = json.dumps([timestamp.isoformat(), str(pk)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        timestamp, pk = json.loads(raw)
+        timestamp = parse_datetime(timestamp)
+        pk = uuid.UUID(pk)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if timestamp is None:
+        raise InvalidCursor("Invalid cursor")
+    return timestamp, pk
+
+
+def page_params(request):
+    """(cursor, limit) dari query string ?cursor=...&limit=...; limit dibatasi PAGE_SIZE_MAX."""
+    try:
+        limit = int(request.GET.get('limit') or settings.PAGE_SIZE_DEFAULT)
+    except ValueError:
+        limit = settings.PAGE_SIZE_DEFAULT
+    limit = max(1, min(limit, settings.PAGE_SIZE_MAX))
+    return request.GET.get('cursor') or None, limit
+
+
+def keyset_page(queryset, time_field, pk_field, cursor=None, limit=None):
+    """
+    Satu halaman queryset terurut (time_field, pk_field) menurun.
+    Mengembalikan (list baris, next_cursor atau None). Baris boleh berupa
+    instance model maupun named values_list.
+    """
+    limit = limit or settings.PAGE_SIZE_DEFAULT
+    queryset = queryset.order_by(f'-{time_field}', f'-{pk_field}')
+    if cursor:
+        timestamp, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f'{time_field}__lt': timestamp}) | Q(**{time_field: timestamp, f'{pk_field}__lt': pk})
+        )
+
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, time_field), getattr(last, pk_field))
+    return rows, next_cursor
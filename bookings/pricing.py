@@ -0,0 +1,170 @@
+"""
+Mesin harga promo checkout: kode promo, bundle kuantitas, early-bird, dan
+batas pemakaian per user.
+
+Promotion aktif untuk satu match (ditambah promo global tanpa match)
+dikompilasi sekali menjadi tuple Rule dan disimpan di cache. Saat checkout
+rules dibaca dari cache lalu diskon dihitung di memori, sehingga jumlah promo
+tidak menambah query di jalur booking. Query tambahan hanya dijalankan untuk
+promo terpilih yang punya batas per user; batas itu dicek ulang di bawah row
+lock Promotion saat booking disimpan (services._claim_promotion).
+
+Cache rules berada di cache bersama (Redis di production), sehingga
+invalidate() saat Promotion berubah langsung berlaku di semua worker.
+
+Hanya satu promo yang dipakai per booking: promo dengan potongan terbesar di
+antara promo otomatis dan promo dengan kode yang dikirim pembeli.
+"""
+from collections import namedtuple
+from decimal import ROUND_DOWN, Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+GENERATION_KEY = "bookings:promo_rules:generation"
+
+Rule = namedtuple(
+    'Rule',
+    'pk code kind value seat_category min_quantity free_quantity starts_at ends_at per_user_limit',
+)
+Line = namedtuple('Line', 'seat_category unit_price quantity')
+Quote = namedtuple('Quote', 'subtotal discount total promotion_id per_user_limit')
+
+
+class PromoError(Exception):
+    pass
+
+
+# --- KOMPILASI RULES ---
+def _generation():
+    return cache.get(GENERATION_KEY, 0)
+
+
+def rules_cache_key(match_id, generation=None):
+    generation = _generation() if generation is None else generation
+    return f"bookings:promo_rules:{generation}:{match_id}"
+
+
+def compile_rules(match_id, now=None):
+    from bookings.models import Promotion
+
+    now = now or timezone.now()
+    promotions = (
+        Promotion.objects.filter(Q(match_id=match_id) | Q(match__isnull=True), is_active=True)
+        .exclude(ends_at__lt=now)
+        .order_by('pk')
+    )
+    return tuple(
+        Rule(
+            p.pk, p.code, p.kind, p.value, p.seat_category, p.min_quantity, p.free_quantity,
+            p.starts_at, p.ends_at, p.per_user_limit,
+        )
+        for p in promotions
+    )
+
+
+def get_rules(match_id):
+    """Rules promo match dari cache; dikompilasi ulang bila belum ada."""
+    key = rules_cache_key(match_id)
+    rules = cache.get(key)
+    if rules is None:
+        rules = compile_rules(match_id)
+        cache.set(key, rules, getattr(settings, "PROMO_RULES_CACHE_TTL", 300))
+    return rules
+
+
+def invalidate(match_id=None):
+    """Hapus rules satu match; promo global (match_id None) menaikkan generation semua match."""
+    def _drop():
+        if match_id is None:
+            if not cache.add(GENERATION_KEY, 1, None):
+                cache.incr(GENERATION_KEY)
+        else:
+            cache.delete(rules_cache_key(match_id))
+
+    transaction.on_commit(_drop)
+
+
+def on_promotion_changed(sender, instance, raw=False, **kwargs):
+    """Signal post_save/post_delete Promotion."""
+    if not raw:
+        invalidate(instance.match_id)
+
+
+# --- EVALUASI ---
+def _is_open(rule, now):
+    return (rule.starts_at is None or rule.starts_at <= now) and (rule.ends_at is None or now < rule.ends_at)
+
+
+def rule_discount(rule, lines):
+    """Potongan (Decimal, dibulatkan ke rupiah penuh ke bawah) dari satu rule untuk lines."""
+    eligible = [line for line in lines if not rule.seat_category or line.seat_category == rule.seat_category]
+    quantity = sum(line.quantity for line in eligible)
+    if not quantity or quantity < rule.min_quantity:
+        return Decimal('0')
+
+    if rule.kind == 'PERCENT':
+        subtotal = sum((line.unit_price * line.quantity for line in eligible), Decimal('0'))
+        discount = subtotal * min(rule.value, Decimal('100')) / 100
+    elif rule.kind == 'AMOUNT':
+        discount = sum((min(rule.value, line.unit_price) * line.quantity for line in eligible), Decimal('0'))
+    elif rule.kind == 'BUNDLE':
+        # Tiket gratis diambil dari yang termurah
+        free = (quantity // max(rule.min_quantity, 1)) * rule.free_quantity
+        discount = Decimal('0')
+        for line in sorted(eligible, key=lambda line: line.unit_price):
+            take = min(free, line.quantity)
+            discount += line.unit_price * take
+            free -= take
+    else:
+        return Decimal('0')
+    return discount.quantize(Decimal('1'), rounding=ROUND_DOWN)
+
+
+def quote(rules, lines, code=None, now=None, usage=None):
+    """
+    Hitung harga lines [Line, ...] dengan rules. code opsional (kode promo
+    pembeli); usage(rule) mengembalikan jumlah pemakaian promo oleh user dan
+    hanya dipanggil untuk rule dengan per_user_limit. PromoError bila kode
+    tidak dikenal atau tidak memenuhi syarat.
+    """
+    now = now or timezone.now()
+    code = code.strip().upper() if code else None
+    subtotal = sum((line.unit_price * line.quantity for line in lines), Decimal('0'))
+
+    candidates = [
+        (rule_discount(rule, lines), rule)
+        for rule in rules
+        if (rule.code is None or rule.code == code) and _is_open(rule, now)
+    ]
+    if code and not any(rule.code == code for _, rule in candidates):
+        raise PromoError("Invalid promo code")
+
+    used = {}
+
+    def within_limit(rule):
+        if not rule.per_user_limit or usage is None:
+            return True
+        if rule.pk not in used:
+            used[rule.pk] = usage(rule)
+        return used[rule.pk] < rule.per_user_limit
+
+    best = None
+    for discount, rule in sorted(candidates, key=lambda pair: pair[0], reverse=True):
+        if discount <= 0:
+            break
+        if within_limit(rule):
+            best = (min(discount, subtotal), rule)
+            break
+
+    # Kode yang valid boleh kalah dari promo otomatis yang lebih besar, tapi harus memenuhi syarat
+    if code and not (best and best[1].code == code) and not any(
+        discount > 0 and rule.code == code and within_limit(rule) for discount, rule in candidates
+    ):
+        raise PromoError("Promo code is not applicable to this order")
+    if best is None:
+        return Quote(subtotal, Decimal('0'), subtotal, None, 0)
+    discount, rule = best
+    return Quote(subtotal, discount, subtotal - discount, rule.pk, rule.per_user_limit)
@@ -0,0 +1,186 @@
+"""
+Peta kursi per Venue dan alokasi kursi berdampingan.
+
+Venue dibagi menjadi SeatSection (kategori, jumlah baris, kursi per baris).
+Keterisian kursi per match disimpan di SeatOccupancy sebagai bitmap: bit ke
+(baris * seats_per_row + kursi) bernilai 1 bila kursi sudah terisi. Stadion
+30 ribu kursi cukup ~3,7 KB per match.
+
+Pencarian N kursi berdampingan memakai operasi bit pada int Python untuk
+seluruh section sekaligus (tanpa loop per kursi):
+
+    runs = free & (free >> 1) & ... & (free >> N-1)
+
+dihitung dengan penggandaan (log2 N langkah), lalu dibatasi ke posisi awal
+yang tidak melewati ujung baris. Bit terendah yang tersisa adalah kursi awal
+di baris paling depan.
+
+Alokasi dijalankan di dalam transaksi booking dengan baris SeatOccupancy
+terkunci (select_for_update), sehingga kursi yang sama tidak pernah terjual
+dua kali dan ikut batal bila booking gagal.
+"""
+from functools import lru_cache
+from bookings.models import SeatOccupancy, SeatSection
+
+
+class SeatsUnavailable(Exception):
+    def __init__(self, seat_category):
+        self.seat_category = seat_category
+        super().__init__(f"Not enough seats available for {seat_category}")
+
+
+# --- BITMAP ---
+def to_int(bitmap):
+    return int.from_bytes(bytes(bitmap or b''), 'little')
+
+
+def to_bytes(value, capacity):
+    return value.to_bytes((capacity + 7) // 8, 'little')
+
+
+@lru_cache(maxsize=512)
+def _row_starts(rows, width, n):
+    """Mask posisi awal yang valid: kursi awal s di baris dengan s + n <= width."""
+    if n > width:
+        return 0
+    each_row = ((1 << (rows * width)) - 1) // ((1 << width) - 1)  # bit 0 tiap baris
+    return ((1 << (width - n + 1)) - 1) * each_row
+
+
+def find_contiguous(occupied, rows, width, n):
+    """Index kursi awal dari n kursi kosong berdampingan dalam satu baris, atau None."""
+    starts = _row_starts(rows, width, n)
+    if not starts:
+        return None
+    runs = ~occupied & ((1 << (rows * width)) - 1)
+    covered = 1
+    while covered < n and runs:
+        step = min(covered, n - covered)
+        runs &= runs >> step
+        covered += step
+    runs &= starts
+    if not runs:
+        return None
+    return (runs & -runs).bit_length() - 1
+
+
+def first_free(occupied, capacity, n):
+    """Index n kursi kosong pertama (tidak harus berdampingan)."""
+    free = ~occupied & ((1 << capacity) - 1)
+    seats = []
+    while free and len(seats) < n:
+        low = free & -free
+        seats.append(low.bit_length() - 1)
+        free ^= low
+    return seats
+
+
+def pick_seats(sections, occupied, n):
+    """
+    Pilih n kursi dari sections (urut sesuai prioritas) dengan bitmap occupied
+    {section_pk: int}. Utamakan satu blok berdampingan; bila tidak ada, isi
+    kursi kosong pertama. Mengembalikan [(section_pk, index), ...] atau None.
+    Bitmap di occupied ikut diperbarui.
+    """
+    for section in sections:
+        start = find_contiguous(occupied[section.pk], section.rows, section.seats_per_row, n)
+        if start is not None:
+            occupied[section.pk] |= ((1 << n) - 1) << start
+            return [(section.pk, index) for index in range(start, start + n)]
+
+    picked = []
+    for section in sections:
+        for index in first_free(occupied[section.pk], section.capacity, n - len(picked)):
+            picked.append((section.pk, index))
+        if len(picked) == n:
+            break
+    if len(picked) < n:
+        return None
+    for section_pk, index in picked:
+        occupied[section_pk] |= 1 << index
+    return picked
+
+
+# --- DATABASE ---
+def _lock_occupancy(match_id, sections):
+    """Kunci (dan buat bila belum ada) baris SeatOccupancy untuk sections; urut pk agar bebas deadlock."""
+    section_pks = sorted(section.pk for section in sections)
+    rows = SeatOccupancy.objects.select_for_update().filter(match_id=match_id, section_id__in=section_pks)
+    locked = {row.section_id: row for row in rows.order_by('section_id')}
+    if len(locked) < len(section_pks):
+        SeatOccupancy.objects.bulk_create(
+            [SeatOccupancy(match_id=match_id, section_id=pk) for pk in section_pks if pk not in locked],
+            ignore_conflicts=True,
+        )
+        locked = {row.section_id: row for row in rows.order_by('section_id')}
+    return locked
+
+
+def allocate(match_id, quantities):
+    """
+    Alokasikan kursi untuk {seat_category: jumlah} pada match. Harus dipanggil
+    di dalam transaksi booking. Kategori tanpa peta kursi di venue dilewati.
+    Mengembalikan {seat_category: [[section_pk, index], ...]}; SeatsUnavailable
+    bila kursi kosong tidak cukup.
+    """
+    sections = list(SeatSection.objects.filter(venue__match=match_id, seat_category__in=list(quantities)))
+    if not sections:
+        return {}
+
+    locked = _lock_occupancy(match_id, sections)
+    occupied = {pk: to_int(row.bitmap) for pk, row in locked.items()}
+    allocated = {}
+    for seat_category, quantity in quantities.items():
+        candidates = [section for section in sections if section.seat_category == seat_category]
+        if not candidates:
+            continue
+        picked = pick_seats(candidates, occupied, quantity)
+        if picked is None:
+            raise SeatsUnavailable(seat_category)
+        allocated[seat_category] = [list(seat) for seat in picked]
+
+    by_pk = {section.pk: section for section in sections}
+    changed = {pk for seats in allocated.values() for pk, _ in seats}
+    for pk in changed:
+        locked[pk].bitmap = to_bytes(occupied[pk], by_pk[pk].capacity)
+    SeatOccupancy.objects.bulk_update([locked[pk] for pk in changed], ['bitmap'])
+    return allocated
+
+
+def release(match_seats):
+    """Kosongkan kursi {match_id: [[section_pk, index], ...]} (dipanggil di dalam transaksi)."""
+    for match_id, seats in match_seats.items():
+        if not seats:
+            continue
+        clear = {}
+        for section_pk, index in seats:
+            clear[section_pk] = clear.get(section_pk, 0) | (1 << index)
+        rows = list(
+            SeatOccupancy.objects.select_for_update()
+            .filter(match_id=match_id, section_id__in=clear)
+            .select_related('section')
+            .order_by('section_id')
+        )
+        for row in rows:
+            row.bitmap = to_bytes(to_int(row.bitmap) & ~clear[row.section_id], row.section.capacity)
+        SeatOccupancy.objects.bulk_update(rows, ['bitmap'])
+
+
+def seat_labels(seats):
+    """Label kursi untuk [[section_pk, index], ...] dengan satu query section."""
+    sections = SeatSection.objects.in_bulk({section_pk for section_pk, _ in seats})
+    return [sections[section_pk].seat_label(index) for section_pk, index in seats]
+
+
+def free_seats(match_id, venue_id):
+    """Jumlah kursi kosong per kategori untuk match (admin/laporan)."""
+    occupancy = {
+        section_id: to_int(bitmap)
+        for section_id, bitmap in SeatOccupancy.objects.filter(match_id=match_id).values_list('section_id', 'bitmap')
+    }
+    counts = {}
+    for section in SeatSection.objects.filter(venue_id=venue_id):
+        taken = occupancy.get(section.pk, 0).bit_count()
+        counts[section.seat_category] = counts.get(section.seat_category, 0) + section.capacity - taken
+    return counts
+
@@ -0,0 +1,151 @@
+"""
+Serializer tiket bersama untuk daftar tiket (Flutter dan halaman profil).
+
+Tiket dibaca sebagai baris values_list (tanpa membuat instance model) dan
+semua URL dibangun dari prefix yang di-resolve sekali per request. URL logo
+tim di-memo per team id, sehingga reverse()/static() tidak dipanggil per tiket.
+"""
+import uuid
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from matches.models import Team
+
+TICKET_COLUMNS = {
+    'seat_category': F('ticket_type__seat_category'),
+    'match_pk': F('ticket_type__match_id'),
+    'match_date': F('ticket_type__match__date'),
+    'home_id': F('ticket_type__match__home_team_id'),
+    'home_name': F('ticket_type__match__home_team__name'),
+    'home_logo_url': F('ticket_type__match__home_team__logo_url'),
+    'home_league': F('ticket_type__match__home_team__league'),
+    'away_id': F('ticket_type__match__away_team_id'),
+    'away_name': F('ticket_type__match__away_team__name'),
+    'away_logo_url': F('ticket_type__match__away_team__logo_url'),
+    'away_league': F('ticket_type__match__away_team__league'),
+    'venue_name': F('ticket_type__match__venue__name'),
+    'venue_city': F('ticket_type__match__venue__city'),
+}
+TICKET_FIELDS = ('ticket_id', 'booking_id', 'code', 'seat', 'is_used', 'generated_at', 'effective_status', *TICKET_COLUMNS)
+
+_PLACEHOLDER = str(uuid.UUID(int=0))
+
+
+def ticket_rows(queryset, now=None):
+    """Baris ringkas (namedtuple) untuk queryset Ticket, satu query dengan JOIN."""
+    return queryset.with_effective_status(now).annotate(**TICKET_COLUMNS).values_list(*TICKET_FIELDS, named=True)
+
+
+def _url_template(request, viewname, placeholder=_PLACEHOLDER):
+    url = reverse(viewname, args=[placeholder])
+    if request is not None:
+        url = request.build_absolute_uri(url)
+    return url.split(placeholder)
+
+
+class TicketSerializer:
+    """Dibuat sekali per request; method flutter()/profile() dipanggil per baris tiket."""
+
+    def __init__(self, request=None):
+        self._logo_proxy = _url_template(request, 'matches:flutter_team_logo_proxy')
+        self._qr = _url_template(request, 'bookings:ticket_qr', placeholder='CODE')
+        self._proxy_logos = {}
+        self._display_logos = {}
+        self.now = timezone.now()
+
+    def logo_proxy_url(self, team_id):
+        if team_id is None:
+            return None
+        url = self._proxy_logos.get(team_id)
+        if url is None:
+            url = self._proxy_logos[team_id] = f"{self._logo_proxy[0]}{team_id}{self._logo_proxy[1]}"
+        return url
+
+    def display_logo_url(self, team_id, name, logo_url, league):
+        if team_id is None:
+            return None
+        url = self._display_logos.get(team_id)
+        if url is None:
+            url = self._display_logos[team_id] = Team(name=name, logo_url=logo_url, league=league).display_logo_url
+        return url
+
+    def qr_url(self, code):
+        return f"{self._qr[0]}{code}{self._qr[1]}" if code else None
+
+    def flutter(self, row):
+        home = row.home_name if row.home_id else 'TBD'
+        away = row.away_name if row.away_id else 'TBD'
+        return {
+            'id': str(row.ticket_id),
+            'booking_id': str(row.booking_id),
+            'match_id': str(row.match_pk),
+            'seat_category': row.seat_category,
+            'seat': row.seat,
+            'match_title': f"{home} vs {away}",
+            'home_team': home,
+            'away_team': away,
+            'home_team_logo': self.logo_proxy_url(row.home_id),
+            'away_team_logo': self.logo_proxy_url(row.away_id),
+            'match_date': row.match_date.isoformat() if row.match_date else None,
+            'venue': row.venue_name,
+            'city': row.venue_city,
+            'is_used': row.is_used,
+            'is_match_finished': bool(row.match_date and row.match_date < self.now),
+            'effective_status': row.effective_status,
+            'generated_at': row.generated_at.isoformat() if row.generated_at else None,
+            'ticket_code': row.code,
+            'qr_code': self.qr_url(row.code),
+        }
+
+    def profile(self, row):
+        match_date = row.match_date
+        return {
+            "ticket_id": str(row.ticket_id),
+            "match_id": str(row.match_pk),
+            "seat_category": row.seat_category,
+            "seat": row.seat,
+            "match_home": row.home_name or "-",
+            "match_away": row.away_name or "-",
+            "home_logo": self.display_logo_url(row.home_id, row.home_name, row.home_logo_url, row.home_league),
+            "away_logo": self.display_logo_url(row.away_id, row.away_name, row.away_logo_url, row.away_league),
+            "venue": row.venue_name or "-",
+            "date": match_date.strftime("%d %b %Y, %H:%M") if match_date else "-",
+            "match_iso": match_date.isoformat() if match_date else None,
+            "barcode_code": row.code,
+            "is_used": row.is_used,
+            "effective_status": row.effective_status,
+            "generated_at": row.generated_at.strftime("%Y-%m-%d %H:%M"),
+        }
+
+
+def booking_rows(bookings):
+    """Serialisasi satu halaman Booking; item + match dimuat dengan satu query untuk semua booking."""
+    from bookings.models import BookingItem
+
+    items = {}
+    for booking_id, seat_category, quantity, match_pk, home, away, match_date in (
+        BookingItem.objects.filter(booking_id__in=[b.pk for b in bookings])
+        .order_by('pk')
+        .values_list(
+            'booking_id', 'ticket_type__seat_category', 'quantity', 'ticket_type__match_id',
+            'ticket_type__match__home_team__name', 'ticket_type__match__away_team__name', 'ticket_type__match__date',
+        )
+    ):
+        entry = items.setdefault(booking_id, {
+            'match_id': str(match_pk),
+            'match_title': f"{home or 'TBD'} vs {away or 'TBD'}",
+            'match_date': match_date.isoformat() if match_date else None,
+            'items': [],
+        })
+        entry['items'].append({'seat_category': seat_category, 'quantity': quantity})
+
+    return [
+        {
+            'booking_id': str(booking.booking_id),
+            'status': booking.status,
+            'total_price': float(booking.total_price),
+            'created_at': booking.created_at.isoformat(),
+            **items.get(booking.pk, {'match_id': None, 'match_title': None, 'match_date': None, 'items': []}),
+        }
+        for booking in bookings
+    ]
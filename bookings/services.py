@@ -0,0 +1,640 @@
+import hashlib
+import hmac
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+from matches.models import TicketPrice
+from bookings import availability, inventory, ledger, midtrans, pricing, seating, shards
+from bookings.models import Booking, BookingItem, PaymentNotification, Promotion, Ticket
+from bookings.ticket_codes import make_ticket_code
+
+logger = logging.getLogger(__name__)
+
+# Status booking yang stoknya sudah dikembalikan
+RELEASED_STATUSES = ('CANCELLED', 'EXPIRED')
+
+
+# --- ERROR RESERVASI ---
+class ReservationError(Exception):
+    """Error dasar ketika reservasi tiket tidak dapat diproses."""
+    status_code = 400
+
+
+class TicketTypeNotFound(ReservationError):
+    status_code = 404
+
+    def __init__(self, seat_category):
+        self.seat_category = seat_category
+        super().__init__(f"Ticket type {seat_category} not found")
+
+
+class InsufficientStock(ReservationError):
+    def __init__(self, seat_category):
+        self.seat_category = seat_category
+        super().__init__(f"Not enough tickets available for {seat_category}")
+
+
+class EmptyReservation(ReservationError):
+    def __init__(self):
+        super().__init__("No valid tickets selected")
+
+
+class InvalidPromoCode(ReservationError):
+    pass
+
+
+# --- RESERVASI STOK ---
+def _normalize_quantities(ticket_types):
+    """Mengubah payload {kategori: jumlah} menjadi dict berisi jumlah positif saja."""
+    quantities = {}
+    for seat_category, quantity in ticket_types.items():
+        quantity = int(quantity)
+        if quantity > 0:
+            quantities[seat_category] = quantity
+    return quantities
+
+
+def reserve_tickets(user, match, ticket_types, promo_code=None):
+    """
+    Membuat Booking PENDING sekaligus mengurangi stok tiket secara atomik.
+    Harga dihitung oleh mesin promo (bookings/pricing.py) sebelum stok disentuh.
+
+    Setiap kategori dikurangi dengan satu UPDATE bersyarat
+    (quantity_available >= jumlah), sehingga dua pembeli yang berebut baris
+    yang sama tidak pernah membuat stok negatif. Semua kategori dalam satu
+    pesanan diproses di satu transaksi: bila satu kategori gagal, seluruh
+    pengurangan dibatalkan dan tidak ada Booking yang tersimpan.
+    """
+    ticket_prices = {
+        tp.seat_category: tp
+        for tp in TicketPrice.objects.filter(match=match, seat_category__in=list(ticket_types))
+    }
+    for seat_category in ticket_types:
+        if seat_category not in ticket_prices:
+            raise TicketTypeNotFound(seat_category)
+
+    quantities = _normalize_quantities(ticket_types)
+    if not quantities:
+        raise EmptyReservation()
+
+    # Urutkan berdasarkan PK agar urutan lock antar transaksi konsisten (hindari deadlock)
+    reserved = sorted(
+        ((ticket_prices[seat_category], qty) for seat_category, qty in quantities.items()),
+        key=lambda pair: pair[0].pk,
+    )
+    quote = _quote(user, match.pk, reserved, promo_code)
+
+    if inventory.is_enabled():
+        return _reserve_with_inventory(user, reserved, quote)
+
+    sharded = shards.sharded(tp.pk for tp, _ in reserved) if shards.is_enabled() else {}
+    with transaction.atomic():
+        _claim_promotion(user, quote)
+        for tp, qty in reserved:
+            if tp.pk in sharded:
+                # Kategori besar: kurangi salah satu shard, TicketPrice diperbarui nanti oleh flush
+                if not shards.take(tp.pk, sharded[tp.pk], qty):
+                    raise InsufficientStock(tp.seat_category)
+                continue
+            updated = TicketPrice.objects.filter(
+                pk=tp.pk, quantity_available__gte=qty
+            ).update(quantity_available=F('quantity_available') - qty)
+            if not updated:
+                raise InsufficientStock(tp.seat_category)
+
+        return _create_booking(user, reserved, quote, pending=set(sharded))
+
+
+def _promo_usage(user, promotion_id):
+    return Booking.objects.filter(user=user, promotion_id=promotion_id).exclude(status__in=RELEASED_STATUSES).count()
+
+
+def _quote(user, match_id, reserved, promo_code):
+    lines = [pricing.Line(tp.seat_category, tp.price, qty) for tp, qty in reserved]
+    try:
+        return pricing.quote(
+            pricing.get_rules(match_id), lines, code=promo_code, usage=lambda rule: _promo_usage(user, rule.pk),
+        )
+    except pricing.PromoError as e:
+        raise InvalidPromoCode(str(e))
+
+
+def _claim_promotion(user, quote):
+    """
+    Cek ulang batas per user promo terpilih di dalam transaksi booking.
+    Baris Promotion dikunci (SELECT ... FOR UPDATE) sebelum pemakaian dihitung,
+    sehingga booking bersamaan oleh user yang sama tidak bisa sama-sama lolos
+    dari hasil hitungan _quote. Promo tanpa batas tidak menambah query.
+    """
+    if not quote.per_user_limit:
+        return
+    limit = (
+        Promotion.objects.select_for_update().filter(pk=quote.promotion_id)
+        .values_list('per_user_limit', flat=True).first()
+    )
+    if limit and _promo_usage(user, quote.promotion_id) >= limit:
+        raise InvalidPromoCode("Promo usage limit reached")
+
+
+def _reserve_with_inventory(user, reserved, quote):
+    """Reservasi lewat counter tier inventori; TicketPrice diperbarui nanti oleh flush."""
+    items = {tp.pk: qty for tp, qty in reserved}
+    short_pk = inventory.reserve(items)
+    if short_pk is not None:
+        seat_category = next(tp.seat_category for tp, _ in reserved if tp.pk == short_pk)
+        raise InsufficientStock(seat_category)
+
+    try:
+        with transaction.atomic():
+            _claim_promotion(user, quote)
+            booking = _create_booking(user, reserved, quote, pending=set(items))
+            # Selama BookingItem belum commit, refresh counter tidak boleh menimpa pengurangan ini
+            transaction.on_commit(lambda: inventory.settle(items))
+            return booking
+    except Exception:
+        inventory.release(items)
+        inventory.settle(items)
+        raise
+
+
+def _create_booking(user, reserved, quote, pending=()):
+    """Simpan Booking + BookingItem; item untuk TicketPrice di `pending` menunggu flush (stock_committed=False)."""
+    # Kursi berdampingan untuk kategori yang punya peta kursi; gagal = seluruh transaksi batal
+    try:
+        seats = seating.allocate(reserved[0][0].match_id, {tp.seat_category: qty for tp, qty in reserved})
+    except seating.SeatsUnavailable as e:
+        raise InsufficientStock(e.seat_category)
+    booking = Booking.objects.create(
+        user=user, total_price=quote.total, discount=quote.discount, promotion_id=quote.promotion_id, status='PENDING'
+    )
+    BookingItem.objects.bulk_create([
+        BookingItem(
+            booking=booking, ticket_type=tp, quantity=qty, stock_committed=tp.pk not in pending,
+            seats=seats.get(tp.seat_category),
+        )
+        for tp, qty in reserved
+    ])
+    ledger.record_reservation(booking, reserved)
+    availability.invalidate([tp.match_id for tp, _ in reserved])
+    return booking
+
+
+# --- PENGEMBALIAN STOK ---
+def _restore_stock(booking_pks, status):
+    """
+    Kembalikan stok semua item milik booking_pks yang berubah menjadi status
+    CANCELLED/EXPIRED (dipanggil di dalam transaksi) dan catat di ledger.
+    Item yang sudah di-flush dikembalikan ke TicketPrice dengan satu UPDATE
+    F() + Case/When; item yang belum di-flush cukup ditandai selesai. Stok
+    kategori yang di-shard juga dikembalikan ke shardnya.
+    Mengembalikan total {ticket_price_pk: jumlah} untuk dikembalikan ke counter.
+    """
+    items = list(
+        BookingItem.objects.select_for_update()
+        .filter(booking_id__in=booking_pks)
+        .values_list('pk', 'ticket_type_id', 'quantity', 'stock_committed', 'ticket_type__match_id', 'seats', 'booking_id')
+    )
+    released, committed, seats = {}, {}, {}
+    for _, ticket_type_id, quantity, is_committed, match_id, item_seats, _ in items:
+        released[ticket_type_id] = released.get(ticket_type_id, 0) + quantity
+        if is_committed:
+            committed[ticket_type_id] = committed.get(ticket_type_id, 0) + quantity
+        if item_seats:
+            seats.setdefault(match_id, []).extend(item_seats)
+
+    if committed:
+        TicketPrice.objects.filter(pk__in=committed).update(
+            quantity_available=F('quantity_available') + Case(
+                *[When(pk=pk, then=Value(qty)) for pk, qty in committed.items()],
+                output_field=IntegerField(),
+            )
+        )
+    # Item yang belum di-flush belum pernah mengurangi TicketPrice; cukup tandai selesai
+    pending_pks = [pk for pk, _, _, is_committed, *_ in items if not is_committed]
+    if pending_pks:
+        BookingItem.objects.filter(pk__in=pending_pks).update(stock_committed=True)
+    if shards.is_enabled():
+        # Shard selalu ikut dikurangi saat reservasi, baik item sudah di-flush maupun belum
+        shards.give_back(released)
+    seating.release(seats)
+    ledger.record_release([(booking_id, ticket_type_id, quantity) for _, ticket_type_id, quantity, *_, booking_id in items], status)
+    availability.invalidate([match_id for *_, match_id, _, _ in items])
+    return released
+
+
+def release_tickets(booking, status):
+    """
+    Mengubah status booking menjadi CANCELLED/EXPIRED dan mengembalikan stoknya.
+
+    Transisi status memakai UPDATE bersyarat, sehingga stok hanya kembali
+    sekali walaupun pembatalan user, notifikasi Midtrans, dan sync status
+    datang bersamaan. Mengembalikan True jika stok dikembalikan.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        changed = Booking.objects.filter(pk=booking.pk).exclude(
+            status__in=RELEASED_STATUSES
+        ).update(status=status, updated_at=now)
+        if not changed:
+            booking.refresh_from_db(fields=['status', 'updated_at'])
+            return False
+        released = _restore_stock([booking.pk], status)
+        if inventory.is_enabled():
+            inventory.release_on_commit(released)
+
+    booking.status = status
+    booking.updated_at = now
+    return True
+
+
+def _cancel_midtrans_order(order_id):
+    """
+    Batalkan transaksi Midtrans sebelum booking-nya dikadaluarsakan. True bila
+    transaksi sudah tidak bisa dibayar (dibatalkan, kadaluarsa, atau tidak ada);
+    False bila gagal atau transaksi sudah dibayar (412) sehingga booking harus tetap PENDING.
+    """
+    try:
+        response = midtrans.get_client().cancel(order_id)
+        code = str(response.json().get('status_code') or response.status_code)
+    except Exception as e:
+        logger.warning("Gagal membatalkan transaksi Midtrans %s: %s", order_id, e)
+        return False
+    return code in ('200', '404', '407')
+
+
+def expire_stale_bookings(batch_size=None, now=None):
+    """
+    Sweeper hold: ubah booking PENDING yang melewati TTL menjadi EXPIRED dan
+    kembalikan stoknya. Booking tanpa transaksi Midtrans kadaluarsa setelah
+    BOOKING_HOLD_TTL_MINUTES; yang sudah punya transaksi kadaluarsa
+    BOOKING_PAYMENT_TTL_MINUTES setelah charged_at (sama dengan custom_expiry
+    yang dikirim ke Midtrans). Transaksinya dibatalkan di Midtrans lebih dulu;
+    booking yang gagal dibatalkan (atau ternyata sudah dibayar) dibiarkan
+    PENDING untuk notifikasi/reconcile_payments.
+
+    Tiap batch diproses dalam satu transaksi. Mengembalikan
+    {'bookings': jumlah booking, 'tickets': jumlah tiket} yang direklamasi.
+    """
+    batch_size = batch_size or getattr(settings, "BOOKING_SWEEP_BATCH_SIZE", 200)
+    workers = getattr(settings, "PAYMENT_RECONCILE_WORKERS", 8)
+    now = now or timezone.now()
+    hold_cutoff = now - timedelta(minutes=settings.BOOKING_HOLD_TTL_MINUTES)
+    payment_cutoff = now - timedelta(minutes=settings.BOOKING_PAYMENT_TTL_MINUTES)
+    # charged_at >= created_at, jadi filter created_at tetap memakai booking_status_created_idx;
+    # booking lama tanpa charged_at memakai created_at
+    stale = Booking.objects.filter(status='PENDING', created_at__lt=hold_cutoff).filter(
+        Q(midtrans_order_id__isnull=True) | Q(midtrans_order_id='')
+        | Q(charged_at__lt=payment_cutoff) | Q(charged_at__isnull=True, created_at__lt=payment_cutoff)
+    )
+
+    reclaimed = {'bookings': 0, 'tickets': 0}
+    skipped = set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            candidates = list(
+                stale.exclude(pk__in=skipped).order_by('created_at').values_list('pk', 'midtrans_order_id')[:batch_size]
+            )
+            if not candidates:
+                return reclaimed
+            # HTTP ke Midtrans di luar transaksi agar row lock tidak ditahan selama request
+            charged = [(pk, order_id) for pk, order_id in candidates if order_id]
+            cancelled = pool.map(_cancel_midtrans_order, [order_id for _, order_id in charged])
+            skipped.update(pk for (pk, _), ok in zip(charged, cancelled) if not ok)
+            expirable = [pk for pk, _ in candidates if pk not in skipped]
+
+            with transaction.atomic():
+                booking_pks = list(
+                    Booking.objects.select_for_update(skip_locked=True)
+                    .filter(pk__in=expirable, status='PENDING')
+                    .values_list('pk', flat=True)
+                )
+                # Yang sedang dikunci proses lain dilewati pada sweep ini
+                skipped.update(set(expirable) - set(booking_pks))
+                if not booking_pks:
+                    continue
+                Booking.objects.filter(pk__in=booking_pks).update(status='EXPIRED', updated_at=now)
+                released = _restore_stock(booking_pks, 'EXPIRED')
+                if inventory.is_enabled():
+                    inventory.release_on_commit(released)
+
+            reclaimed['bookings'] += len(booking_pks)
+            reclaimed['tickets'] += sum(released.values())
+
+
+# --- PENERBITAN TIKET ---
+def _new_ticket(booking_id, user_id, ticket_type_id, seat=None):
+    """Ticket baru lengkap dengan kode HMAC dan user-nya (bulk_create tidak memanggil save())."""
+    ticket = Ticket(booking_id=booking_id, user_id=user_id, ticket_type_id=ticket_type_id, seat=seat)
+    ticket.code = make_ticket_code(ticket.ticket_id)
+    return ticket
+
+
+def _new_tickets(items):
+    """Satu Ticket per kursi untuk baris item (booking_id, user_id, ticket_type_id, quantity, seats)."""
+    items = list(items)
+    labels = iter(seating.seat_labels([seat for *_, seats in items for seat in seats or []]))
+    return [
+        _new_ticket(booking_id, user_id, ticket_type_id, next(labels) if seats else None)
+        for booking_id, user_id, ticket_type_id, quantity, seats in items
+        for _ in range(quantity)
+    ]
+
+
+def issue_tickets(booking):
+    """
+    Menerbitkan satu Ticket per kursi untuk booking dengan satu bulk INSERT.
+
+    Berjalan di bawah row lock booking dan idempotent: jika tiket booking ini
+    sudah pernah diterbitkan (notifikasi Midtrans yang di-retry, sync dari
+    aplikasi, dsb.), tidak ada tiket baru yang dibuat.
+    Mengembalikan list tiket yang baru dibuat.
+    """
+    with transaction.atomic():
+        Booking.objects.select_for_update().only('pk').get(pk=booking.pk)
+        if Ticket.objects.filter(booking_id=booking.pk).exists():
+            return []
+
+        tickets = _new_tickets(
+            booking.items.values_list('booking_id', 'booking__user_id', 'ticket_type_id', 'quantity', 'seats')
+        )
+        return Ticket.objects.bulk_create(tickets)
+
+
+# --- RESPONSE CHARGE MIDTRANS ---
+# Field response charge yang dibutuhkan halaman pembayaran (QR, nomor VA, batas waktu, dll.)
+PAYMENT_DETAIL_FIELDS = (
+    'status_code', 'status_message', 'order_id', 'transaction_id', 'transaction_status', 'transaction_time',
+    'payment_type', 'gross_amount', 'currency', 'actions', 'va_numbers', 'permata_va_number', 'bill_key',
+    'biller_code', 'qr_string', 'redirect_url', 'expiry_time',
+)
+
+
+def store_payment_response(booking, data):
+    """Simpan field halaman pembayaran dari response charge Midtrans di Booking.payment_details."""
+    booking.payment_details = {field: data[field] for field in PAYMENT_DETAIL_FIELDS if field in data}
+    Booking.objects.filter(pk=booking.pk).update(payment_details=booking.payment_details)
+
+
+def get_payment_response(booking):
+    """
+    Response charge yang tersimpan untuk booking. Booking lama tanpa
+    payment_details dibangun ulang dari midtrans_actions; None jika tidak ada keduanya.
+    Detail yang lebih tua dari PAYMENT_RESPONSE_TTL_MINUTES sejak charge
+    (charged_at, atau created_at untuk booking lama) dianggap kadaluarsa dan dihapus,
+    sehingga jalur tulis yang lupa memanggil clear_payment_response() tidak
+    meninggalkan detail basi selamanya.
+    """
+    ttl = getattr(settings, "PAYMENT_RESPONSE_TTL_MINUTES", settings.BOOKING_PAYMENT_TTL_MINUTES)
+    if (booking.charged_at or booking.created_at) < timezone.now() - timedelta(minutes=ttl):
+        if booking.payment_details:
+            clear_payment_response(booking)
+        return None
+    if booking.payment_details:
+        return booking.payment_details
+    if booking.midtrans_actions:
+        return {
+            "order_id": booking.midtrans_order_id,
+            "transaction_status": booking.status.lower(),
+            "actions": booking.midtrans_actions,
+        }
+    return None
+
+
+def clear_payment_response(booking):
+    booking.payment_details = None
+    Booking.objects.filter(pk=booking.pk).update(payment_details=None)
+
+
+# --- NOTIFIKASI MIDTRANS ---
+def verify_notification_signature(payload):
+    """
+    Cek signature_key notifikasi: SHA512(order_id + status_code + gross_amount + server key).
+    Jika MIDTRANS_SERVER_KEY belum dikonfigurasi (dev/test), verifikasi dilewati.
+    """
+    server_key = settings.MIDTRANS_SERVER_KEY
+    if not server_key:
+        return True
+    raw = f"{payload.get('order_id', '')}{payload.get('status_code', '')}{payload.get('gross_amount', '')}{server_key}"
+    expected = hashlib.sha512(raw.encode()).hexdigest()
+    return hmac.compare_digest(expected, str(payload.get('signature_key', '')))
+
+
+def enqueue_payment_notification(payload):
+    """
+    Simpan notifikasi ke inbox dengan satu INSERT. Notifikasi dengan
+    (order_id, transaction_status) yang sudah ada diabaikan.
+    """
+    PaymentNotification.objects.bulk_create([
+        PaymentNotification(
+            order_id=payload['order_id'],
+            transaction_status=payload.get('transaction_status') or '',
+            fraud_status=payload.get('fraud_status'),
+            payload=payload,
+        )
+    ], ignore_conflicts=True)
+
+
+def _flag_late_payments(booking_pks, now):
+    """
+    Tandai refund_required untuk booking yang dibayar setelah stoknya dilepas
+    (EXPIRED/CANCELLED): uang pelanggan masuk tetapi tiket tidak diterbitkan.
+    Mengembalikan jumlah booking yang baru ditandai.
+    """
+    late = list(
+        Booking.objects.filter(pk__in=booking_pks, status__in=RELEASED_STATUSES, refund_required=False)
+        .values_list('pk', 'midtrans_order_id', 'status')
+    )
+    if not late:
+        return 0
+    Booking.objects.filter(pk__in=[pk for pk, _, _ in late]).update(refund_required=True, updated_at=now)
+    for pk, order_id, status in late:
+        logger.warning("Pembayaran %s masuk setelah booking %s berstatus %s; ditandai untuk refund", order_id, pk, status)
+    return len(late)
+
+
+def apply_payment_status(booking, transaction_status, fraud_status=None):
+    """
+    Terapkan status transaksi Midtrans ke booking (konfirmasi + tiket, atau kembalikan stok).
+
+    Konfirmasi memakai UPDATE bersyarat status='PENDING', sehingga booking yang
+    stoknya sudah dilepas (EXPIRED/CANCELLED) tidak pernah menjadi CONFIRMED.
+    Pembayaran yang terlambat untuk booking seperti itu ditandai refund_required.
+    """
+    if transaction_status in ('settlement', 'capture') and fraud_status in (None, 'accept'):
+        with transaction.atomic():
+            now = timezone.now()
+            if Booking.objects.filter(pk=booking.pk, status='PENDING').update(status='CONFIRMED', updated_at=now):
+                booking.status = 'CONFIRMED'
+                booking.updated_at = now
+                issue_tickets(booking)
+                return
+            _flag_late_payments([booking.pk], now)
+            booking.refresh_from_db(fields=['status', 'refund_required', 'updated_at'])
+    elif transaction_status in ('expire', 'cancel', 'deny'):
+        release_tickets(booking, 'EXPIRED' if transaction_status == 'expire' else 'CANCELLED')
+
+
+def process_payment_notifications(batch_size=None):
+    """
+    Worker inbox: ambil notifikasi yang belum diproses (urut waktu diterima)
+    per batch dan terapkan ke booking. Tiap notifikasi berjalan dalam savepoint
+    sendiri. Yang gagal, termasuk notifikasi yang booking-nya belum terlihat
+    (mis. replica tertinggal), dicatat di last_error dan dicoba lagi setelah
+    backoff (PAYMENT_NOTIFICATION_RETRY_SECONDS, dua kali lipat tiap percobaan).
+    Setelah PAYMENT_NOTIFICATION_MAX_ATTEMPTS notifikasi tidak diambil lagi
+    (dead letter: processed_at kosong, last_error terisi) dan tinggal
+    reconcile_pending_payments yang bisa menanganinya.
+    Mengembalikan jumlah notifikasi yang selesai.
+    """
+    batch_size = batch_size or getattr(settings, "PAYMENT_NOTIFICATION_BATCH_SIZE", 100)
+    max_attempts = getattr(settings, "PAYMENT_NOTIFICATION_MAX_ATTEMPTS", 5)
+    retry_seconds = getattr(settings, "PAYMENT_NOTIFICATION_RETRY_SECONDS", 30)
+    pending = PaymentNotification.objects.filter(processed_at__isnull=True, attempts__lt=max_attempts)
+
+    processed = 0
+    failed = set()
+    while True:
+        with transaction.atomic():
+            now = timezone.now()
+            notifications = list(
+                pending.filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+                .exclude(pk__in=failed).select_for_update(skip_locked=True).order_by('received_at', 'pk')[:batch_size]
+            )
+            if not notifications:
+                return processed
+
+            bookings = {
+                booking.midtrans_order_id: booking
+                for booking in Booking.objects.filter(midtrans_order_id__in={n.order_id for n in notifications})
+            }
+            for notification in notifications:
+                notification.attempts += 1
+                booking = bookings.get(notification.order_id)
+                # Booking yang belum terlihat (replica tertinggal) dicoba lagi, bukan dibuang
+                error = 'Booking not found' if booking is None else None
+                if booking is not None:
+                    try:
+                        with transaction.atomic():
+                            apply_payment_status(booking, notification.transaction_status, notification.fraud_status)
+                    except Exception as e:
+                        error = str(e)
+                if error is not None:
+                    notification.last_error = error
+                    notification.next_attempt_at = now + timedelta(seconds=retry_seconds * 2 ** (notification.attempts - 1))
+                    failed.add(notification.pk)
+                    if notification.attempts >= max_attempts:
+                        logger.warning(
+                            "Notifikasi Midtrans %s (%s) gagal %d kali, tidak dicoba lagi: %s",
+                            notification.order_id, notification.transaction_status, notification.attempts, error,
+                        )
+                    continue
+                notification.last_error = ''
+                notification.processed_at = now
+                processed += 1
+
+            PaymentNotification.objects.bulk_update(
+                notifications, ['attempts', 'last_error', 'processed_at', 'next_attempt_at']
+            )
+
+
+# --- REKONSILIASI STATUS PEMBAYARAN ---
+def _fetch_transaction_status(order_id):
+    """(transaction_status, fraud_status) dari Midtrans, atau None jika belum ada/gagal."""
+    try:
+        response = midtrans.get_client().status(order_id)
+    except Exception as e:
+        logger.warning("Gagal cek status Midtrans %s: %s", order_id, e)
+        return None
+    if response.status_code != 200:
+        return None
+    data = response.json()
+    return data.get('transaction_status', ''), data.get('fraud_status')
+
+
+def _confirm_bookings(booking_pks, now):
+    """
+    Konfirmasi booking PENDING secara bulk dan terbitkan tiketnya dengan satu
+    INSERT. Booking yang ternyata sudah EXPIRED/CANCELLED ditandai refund_required.
+    """
+    with transaction.atomic():
+        pks = list(
+            Booking.objects.select_for_update().filter(pk__in=booking_pks, status='PENDING').values_list('pk', flat=True)
+        )
+        _flag_late_payments(set(booking_pks) - set(pks), now)
+        if not pks:
+            return 0
+        issued = set(Ticket.objects.filter(booking_id__in=pks).values_list('booking_id', flat=True))
+        Ticket.objects.bulk_create(_new_tickets(
+            BookingItem.objects.filter(booking_id__in=pks).exclude(booking_id__in=issued)
+            .values_list('booking_id', 'booking__user_id', 'ticket_type_id', 'quantity', 'seats')
+        ))
+        Booking.objects.filter(pk__in=pks).update(status='CONFIRMED', updated_at=now)
+    return len(pks)
+
+
+def _release_bookings(booking_pks, status, now):
+    """Ubah booking PENDING menjadi CANCELLED/EXPIRED secara bulk dan kembalikan stoknya."""
+    with transaction.atomic():
+        pks = list(
+            Booking.objects.select_for_update().filter(pk__in=booking_pks, status='PENDING').values_list('pk', flat=True)
+        )
+        if not pks:
+            return 0
+        Booking.objects.filter(pk__in=pks).update(status=status, updated_at=now)
+        released = _restore_stock(pks, status)
+        if inventory.is_enabled():
+            inventory.release_on_commit(released)
+    return len(pks)
+
+
+def reconcile_pending_payments(batch_size=None, workers=None):
+    """
+    Cek status Midtrans semua booking PENDING yang sudah punya transaksi.
+    Status di-query paralel (thread pool terbatas, hanya HTTP tanpa DB), lalu
+    transisi diterapkan secara bulk per batch. Status Midtrans terakhir
+    disimpan di Booking (midtrans_status, midtrans_checked_at) agar endpoint
+    status aplikasi di worker mana pun cukup membaca DB.
+    Mengembalikan {'checked', 'confirmed', 'released', 'errors'}.
+    """
+    batch_size = batch_size or getattr(settings, "PAYMENT_RECONCILE_BATCH_SIZE", 200)
+    workers = workers or getattr(settings, "PAYMENT_RECONCILE_WORKERS", 8)
+    candidates = list(
+        Booking.objects.filter(status='PENDING', midtrans_order_id__isnull=False)
+        .exclude(midtrans_order_id='')
+        .order_by('created_at')
+        .values_list('pk', 'midtrans_order_id')
+    )
+
+    summary = {'checked': 0, 'confirmed': 0, 'released': 0, 'errors': 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(candidates), batch_size):
+            batch = candidates[start:start + batch_size]
+            results = pool.map(_fetch_transaction_status, [order_id for _, order_id in batch])
+
+            now = timezone.now()
+            confirm, release, statuses = [], {'CANCELLED': [], 'EXPIRED': []}, []
+            for (booking_pk, _), result in zip(batch, results):
+                if result is None:
+                    summary['errors'] += 1
+                    continue
+                transaction_status, fraud_status = result
+                statuses.append(Booking(
+                    pk=booking_pk, midtrans_status=transaction_status[:20], midtrans_checked_at=now,
+                ))
+                if transaction_status in ('settlement', 'capture') and fraud_status in (None, 'accept'):
+                    confirm.append(booking_pk)
+                elif transaction_status in ('cancel', 'deny'):
+                    release['CANCELLED'].append(booking_pk)
+                elif transaction_status == 'expire':
+                    release['EXPIRED'].append(booking_pk)
+
+            summary['checked'] += len(statuses)
+            summary['confirmed'] += _confirm_bookings(confirm, now)
+            for status, pks in release.items():
+                summary['released'] += _release_bookings(pks, status, now)
+            Booking.objects.bulk_update(statuses, ['midtrans_status', 'midtrans_checked_at'])
+    return summary
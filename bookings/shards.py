@@ -0,0 +1,157 @@
+"""
+Shard stok di database untuk kategori dengan volume tinggi.
+
+Alternatif tier inventori (bookings/inventory.py) tanpa Redis: stok logis satu
+TicketPrice dipecah ke INVENTORY_SHARDS baris StockShard. Reservasi memilih
+shard secara acak dan meng-UPDATE shard itu saja dengan syarat
+quantity >= jumlah, sehingga pembeli yang bersamaan mengunci baris berbeda dan
+tidak antre di satu baris TicketPrice.
+
+- Bila shard terpilih kurang, shard lain dicoba berurutan. Bila tidak ada
+  satu shard yang cukup, semua shard dikunci (urut nomor shard) lalu jumlahnya
+  diambil sebagian-sebagian dari beberapa shard.
+- BookingItem disimpan dengan stock_committed=False, lalu flush_pending_stock()
+  memindahkan pengurangannya ke TicketPrice secara batch (write-behind yang
+  sama dengan tier inventori). Karena itu ledger dan stok logis
+  (quantity_available - item yang belum di-flush) tidak berubah maknanya.
+- Pembacaan stok = SUM semua shard (satu query).
+
+Kategori di-shard bila kuotanya minimal INVENTORY_SHARD_MIN_QUANTITY, baik saat
+TicketPrice dibuat lewat save() maupun lewat command shard_inventory. Shard
+hanya dipakai ketika tier inventori tidak aktif.
+"""
+import random
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from bookings import inventory
+from bookings.models import StockShard
+
+
+def shard_count():
+    return getattr(settings, "INVENTORY_SHARDS", 0)
+
+
+def is_enabled():
+    return shard_count() > 0 and not inventory.is_enabled()
+
+
+def split(total, count):
+    """Bagi total serata mungkin ke count shard (sisa pembagian ke shard awal)."""
+    base, extra = divmod(max(total, 0), count)
+    return [base + (1 if i < extra else 0) for i in range(count)]
+
+
+# --- RESERVASI ---
+def sharded(ticket_price_ids):
+    """{ticket_price_pk: [nomor shard, ...]} untuk TicketPrice yang punya shard (satu query)."""
+    shards = {}
+    for ticket_price_id, shard in StockShard.objects.filter(ticket_price_id__in=list(ticket_price_ids)).values_list(
+        'ticket_price_id', 'shard'
+    ):
+        shards.setdefault(ticket_price_id, []).append(shard)
+    return shards
+
+
+def take(ticket_price_id, shard_numbers, quantity):
+    """
+    Kurangi stok TicketPrice sebanyak quantity dari shard-shardnya (dipanggil
+    di dalam transaksi booking). Mengembalikan False bila total stok kurang.
+    """
+    order = list(shard_numbers)
+    random.shuffle(order)
+    for shard in order:
+        if StockShard.objects.filter(
+            ticket_price_id=ticket_price_id, shard=shard, quantity__gte=quantity
+        ).update(quantity=F('quantity') - quantity):
+            return True
+
+    # Tidak ada satu shard yang cukup: kunci semua shard lalu ambil sebagian dari masing-masing
+    rows = list(
+        StockShard.objects.select_for_update().filter(ticket_price_id=ticket_price_id)
+        .order_by('shard').values_list('pk', 'quantity')
+    )
+    if sum(available for _, available in rows) < quantity:
+        return False
+    taken, remaining = {}, quantity
+    for pk, available in rows:
+        if remaining <= 0:
+            break
+        if available:
+            taken[pk] = min(available, remaining)
+            remaining -= taken[pk]
+    StockShard.objects.filter(pk__in=taken).update(quantity=F('quantity') - Case(
+        *[When(pk=pk, then=Value(qty)) for pk, qty in taken.items()],
+        output_field=IntegerField(),
+    ))
+    return True
+
+
+def give_back(released):
+    """Kembalikan {ticket_price_pk: jumlah} ke satu shard acak per TicketPrice yang di-shard."""
+    for ticket_price_id, shard_numbers in sharded(released).items():
+        StockShard.objects.filter(ticket_price_id=ticket_price_id, shard=random.choice(shard_numbers)).update(
+            quantity=F('quantity') + released[ticket_price_id]
+        )
+
+
+# --- PEMBACAAN ---
+def totals(ticket_price_ids):
+    """{ticket_price_pk: SUM quantity shard} untuk TicketPrice yang di-shard."""
+    return dict(
+        StockShard.objects.filter(ticket_price_id__in=list(ticket_price_ids))
+        .values_list('ticket_price_id').annotate(total=Sum('quantity')).order_by()
+    )
+
+
+# --- PEMBAGIAN ULANG ---
+def rebalance(ticket_price_ids, count=None):
+    """
+    Bagi ulang stok logis TicketPrice ke `count` shard (default INVENTORY_SHARDS).
+    Shard yang ada dikunci lebih dulu agar reservasi yang sedang berjalan
+    selesai atau menunggu. count=0 menghapus shard (kembali ke satu baris).
+    Mengembalikan jumlah TicketPrice yang dibagi ulang.
+    """
+    from matches.models import TicketPrice
+    from bookings import ledger
+
+    count = shard_count() if count is None else count
+    ticket_price_ids = sorted(ticket_price_ids)
+    if not ticket_price_ids:
+        return 0
+    with transaction.atomic():
+        existing = {
+            (row.ticket_price_id, row.shard): row
+            for row in StockShard.objects.select_for_update()
+            .filter(ticket_price_id__in=ticket_price_ids).order_by('ticket_price_id', 'shard')
+        }
+        if not count:
+            StockShard.objects.filter(ticket_price_id__in=ticket_price_ids).delete()
+            return len(ticket_price_ids)
+
+        stock = ledger.expected_stock(TicketPrice.objects.filter(pk__in=ticket_price_ids))
+        created, updated = [], []
+        for ticket_price_id, logical in stock.items():
+            for shard, quantity in enumerate(split(logical, count)):
+                row = existing.pop((ticket_price_id, shard), None)
+                if row is None:
+                    created.append(StockShard(ticket_price_id=ticket_price_id, shard=shard, quantity=quantity))
+                else:
+                    row.quantity = quantity
+                    updated.append(row)
+        StockShard.objects.bulk_create(created)
+        StockShard.objects.bulk_update(updated, ['quantity'])
+        if existing:
+            StockShard.objects.filter(pk__in=[row.pk for row in existing.values()]).delete()
+    return len(stock)
+
+
+def on_ticket_price_saved(sender, instance, created=False, raw=False, **kwargs):
+    """Signal post_save TicketPrice: shard kategori besar yang baru, bagi ulang shard bila kuota diubah."""
+    if raw or not is_enabled():
+        return
+    if created:
+        if instance.quantity_available >= getattr(settings, "INVENTORY_SHARD_MIN_QUANTITY", 500):
+            rebalance([instance.pk])
+    elif StockShard.objects.filter(ticket_price_id=instance.pk).exists():
+        rebalance([instance.pk])
@@ -1,15 +1,40 @@
+import hashlib
 import json
+import os
+import shutil
+import tempfile
+import threading
+import time
 import uuid
 import base64 # Import base64
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
 from unittest.mock import patch, MagicMock
-from django.test import TestCase, Client
+import requests
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from django.conf import settings
+from django.core.cache import cache
 from authentication.models import User
 from matches.models import Match, Team, Venue, TicketPrice
-from .models import Booking, BookingItem, Ticket
+from .models import (
+    Booking, BookingItem, PaymentNotification, Promotion, SeatOccupancy, SeatSection, StockMovement, StockShard, Ticket,
+    WaitingRoom,
+)
+from .serializers import ticket_rows
+from . import (
+    availability, gate, inventory, ledger, midtrans, pricing, seating, services, shards, ticket_codes, waiting_room,
+)
+from .services import (
+    InsufficientStock, InvalidPromoCode, apply_payment_status, expire_stale_bookings, issue_tickets,
+    process_payment_notifications, get_payment_response, reconcile_pending_payments, release_tickets, reserve_tickets, store_payment_response,
+)
 
 class BookingViewsTestCase(TestCase):
 
@@ -125,6 +150,23 @@ class BookingViewsTestCase(TestCase):
         self.assertEqual(self.ticket_price_regular.quantity_available, 1)
         self.assertFalse(Booking.objects.filter(user=self.user).exists())
 
+    def test_create_booking_post_partial_stock_rolls_back(self):
+        """Test multi-category order rolls back every category when one runs out."""
+        self.ticket_price_regular.quantity_available = 1
+        self.ticket_price_regular.save()
+
+        post_data = {"types": {"VIP": 2, "REGULAR": 2}, "method": "gopay"}
+        response = self.client.post(
+            self.create_booking_url, data=json.dumps(post_data), content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.ticket_price_vip.refresh_from_db()
+        self.ticket_price_regular.refresh_from_db()
+        self.assertEqual(self.ticket_price_vip.quantity_available, 20)
+        self.assertEqual(self.ticket_price_regular.quantity_available, 1)
+        self.assertFalse(BookingItem.objects.exists())
+
     def test_create_booking_post_invalid_data(self):
         """Test POST with missing data."""
         # No tickets selected
@@ -184,8 +226,8 @@ class BookingViewsTestCase(TestCase):
         # Check session still exists (using .get() in view)
         self.assertEqual(self.client.session.get('selected_method'), 'gopay')
 
-    # Mocking requests.post for Midtrans charge API
-    @patch('requests.post')
+    # Mocking charge API pada client Midtrans
+    @patch('bookings.midtrans.MidtransClient.charge')
     def test_payment_post_new_qris_success(self, mock_post):
         """Test successful POST to initiate a new QRIS payment."""
         booking = self._create_test_booking(self.user)
@@ -211,13 +253,12 @@ class BookingViewsTestCase(TestCase):
         self.assertEqual(json_response['transaction_status'], 'pending')
         self.assertIn('actions', json_response)
 
-        # Verify requests.post was called correctly
+        # Verify charge was called correctly
         mock_post.assert_called_once()
-        args, kwargs = mock_post.call_args
-        self.assertEqual(args[0], 'https://api.sandbox.midtrans.com/v2/charge')
-        self.assertEqual(kwargs['json']['payment_type'], 'qris')
-        self.assertEqual(kwargs['json']['qris']['acquirer'], 'gopay')
-        self.assertIn('item_details', kwargs['json'])
+        payload = mock_post.call_args.args[0]
+        self.assertEqual(payload['payment_type'], 'qris')
+        self.assertEqual(payload['qris']['acquirer'], 'gopay')
+        self.assertIn('item_details', payload)
 
         # Verify database update
         booking.refresh_from_db()
@@ -225,27 +266,46 @@ class BookingViewsTestCase(TestCase):
         self.assertTrue(booking.midtrans_order_id.startswith('book-gop-'))
         self.assertEqual(booking.status, 'PENDING') # Should be updated from Midtrans response
 
-        # Verify session update
-        self.assertIn('payment_responses', self.client.session)
-        self.assertIn(str(booking.booking_id), self.client.session['payment_responses'])
-        self.assertEqual(self.client.session['payment_responses'][str(booking.booking_id)]['status_code'], '201')
+        # Verify response stored on the booking, not in the session
+        self.assertNotIn('payment_responses', self.client.session)
+        self.assertEqual(get_payment_response(booking)['status_code'], '201')
 
-    def test_payment_post_refresh_with_session(self):
-        """Test POST when refreshing payment page and data exists in session."""
+    @patch('bookings.midtrans.MidtransClient.charge')
+    def test_bank_transfer_details_survive_cache_loss(self, mock_charge):
+        """Test a refresh after the cache is flushed still returns the VA number and expiry."""
+        booking = self._create_test_booking(self.user)
+        payment_url = reverse('bookings:payment', kwargs={'booking_id': booking.booking_id})
+        charge = {
+            "status_code": "201", "transaction_status": "pending", "payment_type": "bank_transfer",
+            "va_numbers": [{"bank": "bca", "va_number": "12345678901"}], "expiry_time": "2026-10-17 13:00:00",
+            "fraud_status": "accept",
+        }
+        mock_charge.return_value = MagicMock(status_code=201, json=MagicMock(return_value=charge))
+        self.client.post(payment_url, data=json.dumps({"method": "bank_bca"}), content_type='application/json')
+
+        cache.clear()
+        response = self.client.post(payment_url, data=json.dumps({"method": "bank_bca"}), content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['va_numbers'], charge['va_numbers'])
+        self.assertEqual(response.json()['expiry_time'], charge['expiry_time'])
+        self.assertNotIn('fraud_status', response.json())
+        mock_charge.assert_called_once()
+
+    def test_payment_post_refresh_with_stored_response(self):
+        """Test POST when refreshing payment page and the charge response is stored."""
         booking = self._create_test_booking(self.user)
         booking.midtrans_order_id = "test-order-123" # Set existing order ID
         booking.save()
         payment_url = reverse('bookings:payment', kwargs={'booking_id': booking.booking_id})
         post_data = {"method": "gopay"} # Method doesn't really matter here
 
-        # Store mock response in session
+        # Store mock response
         mock_stored_response = {
             "status_code": "201", "transaction_status": "pending", "order_id": "test-order-123",
             "actions": [{"name": "generate-qr-code", "url": "http://example.com/qr_from_session.png"}]
         }
-        session = self.client.session
-        session['payment_responses'] = {str(booking.booking_id): mock_stored_response}
-        session.save()
+        store_payment_response(booking, mock_stored_response)
 
         response = self.client.post(payment_url, data=json.dumps(post_data), content_type='application/json')
 
@@ -253,6 +313,35 @@ class BookingViewsTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertJSONEqual(response.content, mock_stored_response)
 
+    @override_settings(PAYMENT_RESPONSE_TTL_MINUTES=60)
+    def test_stored_payment_response_expires_after_ttl(self):
+        booking = self._create_test_booking(self.user)
+        booking.midtrans_order_id = "test-order-ttl"
+        booking.charged_at = timezone.now() - timezone.timedelta(minutes=61)
+        booking.save()
+        store_payment_response(booking, {"order_id": "test-order-ttl", "actions": []})
+        payment_url = reverse('bookings:payment', kwargs={'booking_id': booking.booking_id})
+
+        response = self.client.post(payment_url, data=json.dumps({"method": "gopay"}), content_type='application/json')
+
+        self.assertEqual(response.status_code, 410)
+        self.assertIsNone(Booking.objects.get(pk=booking.pk).payment_details)
+
+    def test_payment_post_refresh_falls_back_to_saved_actions(self):
+        """Test POST refresh rebuilds the response from midtrans_actions for bookings without payment_details."""
+        actions = [{"name": "generate-qr-code", "url": "http://example.com/qr.png"}]
+        booking = self._create_test_booking(self.user)
+        booking.midtrans_order_id = "test-order-actions"
+        booking.midtrans_actions = actions
+        booking.save()
+        payment_url = reverse('bookings:payment', kwargs={'booking_id': booking.booking_id})
+
+        response = self.client.post(payment_url, data=json.dumps({"method": "gopay"}), content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['actions'], actions)
+        self.assertEqual(response.json()['order_id'], "test-order-actions")
+
     @patch('requests.get')
     def test_payment_post_refresh_without_session_fallback(self, mock_get):
         """Test POST refresh fallback: checks status API when session is empty."""
@@ -308,7 +397,7 @@ class BookingViewsTestCase(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertIn("already processed or expired", response.json()['error'])
 
-    @patch('requests.post')
+    @patch('bookings.midtrans.MidtransClient.cancel')
     def test_cancel_booking_success(self, mock_cancel_post):
         """Test successful booking cancellation."""
         booking = self._create_test_booking(self.user)
@@ -322,10 +411,8 @@ class BookingViewsTestCase(TestCase):
         mock_cancel_response.status_code = 200
         mock_cancel_post.return_value = mock_cancel_response
 
-        # Store something in session to check if it gets cleared
-        session = self.client.session
-        session['payment_responses'] = {str(booking.booking_id): {"data": "test"}}
-        session.save()
+        # Store something to check if it gets cleared
+        store_payment_response(booking, {"data": "test"})
 
 
         # Assuming POST request for cancellation
@@ -342,10 +429,10 @@ class BookingViewsTestCase(TestCase):
         self.assertEqual(self.ticket_price_regular.quantity_available, initial_qty + 1)
 
         # Check Midtrans API call (optional)
-        mock_cancel_post.assert_called_once()
+        mock_cancel_post.assert_called_once_with("order-to-cancel")
 
-        # Check session cleared
-        self.assertNotIn(str(booking.booking_id), self.client.session.get('payment_responses', {}))
+        # Check stored response cleared
+        self.assertIsNone(get_payment_response(booking))
 
     def test_cancel_booking_already_confirmed(self):
         """Test cancelling an already confirmed booking."""
@@ -389,10 +476,48 @@ class BookingViewsTestCase(TestCase):
 
         self.assertEqual(response.status_code, 200)
         booking.refresh_from_db()
+        self.assertEqual(booking.status, 'PENDING')  # baru masuk inbox
+        self.assertEqual(process_payment_notifications(), 1)
+        booking.refresh_from_db()
         self.assertEqual(booking.status, 'CONFIRMED')
         self.assertTrue(Ticket.objects.filter(booking=booking).exists())
         self.assertEqual(Ticket.objects.filter(booking=booking).count(), 1)
 
+    def test_midtrans_notification_retry_does_not_duplicate_tickets(self):
+        """Test Midtrans retries and app sync issue tickets only once."""
+        booking = self._create_test_booking(self.user)
+        booking.items.update(quantity=3)
+        booking.midtrans_order_id = "settlement-retry-123"
+        booking.save()
+        notification_url = reverse('bookings:midtrans_notification')
+        payload = {
+            "order_id": booking.midtrans_order_id,
+            "transaction_status": "settlement",
+            "fraud_status": "accept",
+        }
+
+        for _ in range(3):
+            response = self.client.post(notification_url, data=json.dumps(payload), content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(PaymentNotification.objects.filter(order_id=booking.midtrans_order_id).count(), 1)
+        self.assertEqual(process_payment_notifications(), 1)
+        self.assertEqual(Ticket.objects.filter(booking=booking).count(), 3)
+
+    def test_issue_tickets_uses_single_insert(self):
+        """Test a 10-ticket booking is issued with one INSERT and is idempotent."""
+        booking = self._create_test_booking(self.user)
+        booking.items.update(quantity=10)
+
+        with CaptureQueriesContext(connection) as ctx:
+            issued = issue_tickets(booking)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+
+        self.assertEqual(len(issued), 10)
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(issue_tickets(booking), [])
+        self.assertEqual(Ticket.objects.filter(booking=booking).count(), 10)
+
     def test_midtrans_notification_expire(self):
         """Test expire notification restores stock."""
         booking = self._create_test_booking(self.user)
@@ -411,12 +536,29 @@ class BookingViewsTestCase(TestCase):
         response = self.client.post(notification_url, data=json.dumps(payload), content_type='application/json')
 
         self.assertEqual(response.status_code, 200)
+        process_payment_notifications()
         booking.refresh_from_db()
         self.assertEqual(booking.status, 'EXPIRED')
         self.ticket_price_regular.refresh_from_db()
         self.assertEqual(self.ticket_price_regular.quantity_available, initial_qty + 1)
         self.assertFalse(Ticket.objects.filter(booking=booking).exists())
 
+    def test_late_settlement_on_expired_booking_is_marked_for_refund(self):
+        """Test a payment that arrives after the hold expired never confirms the booking."""
+        booking = self._create_test_booking(self.user)
+        booking.midtrans_order_id = "late-order-123"
+        booking.save()
+        release_tickets(booking, 'EXPIRED')
+        restored_qty = TicketPrice.objects.get(pk=self.ticket_price_regular.pk).quantity_available
+
+        apply_payment_status(booking, 'settlement', 'accept')
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'EXPIRED')
+        self.assertTrue(booking.refund_required)
+        self.assertFalse(Ticket.objects.filter(booking=booking).exists())
+        self.assertEqual(TicketPrice.objects.get(pk=self.ticket_price_regular.pk).quantity_available, restored_qty)
+
     def test_midtrans_notification_unknown_order(self):
         """Test notification for an order ID not in the database."""
         notification_url = reverse('bookings:midtrans_notification')
@@ -425,7 +567,32 @@ class BookingViewsTestCase(TestCase):
         response = self.client.post(notification_url, data=json.dumps(payload), content_type='application/json')
 
         self.assertEqual(response.status_code, 200)
-        self.assertIn("Booking not found", response.json()['message'])
+        self.assertEqual(process_payment_notifications(), 0)
+        notification = PaymentNotification.objects.get(order_id="unknown-order-id")
+        # Booking bisa belum terlihat (replica tertinggal): dicoba lagi setelah backoff, bukan dibuang
+        self.assertIsNone(notification.processed_at)
+        self.assertEqual((notification.attempts, notification.last_error), (1, "Booking not found"))
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+        self.assertEqual(process_payment_notifications(), 0)
+        self.assertEqual(PaymentNotification.objects.get(pk=notification.pk).attempts, 1)
+
+    @override_settings(PAYMENT_NOTIFICATION_RETRY_SECONDS=0, PAYMENT_NOTIFICATION_MAX_ATTEMPTS=3)
+    def test_notification_for_late_booking_is_retried_then_dead_lettered(self):
+        PaymentNotification.objects.create(order_id="late-order", transaction_status="settlement", payload={})
+        PaymentNotification.objects.create(order_id="never-order", transaction_status="settlement", payload={})
+        self.assertEqual(process_payment_notifications(), 0)
+
+        booking = self._create_test_booking(self.user)
+        booking.midtrans_order_id = "late-order"
+        booking.save()
+        self.assertEqual(process_payment_notifications(), 1)
+        self.assertEqual(Booking.objects.get(pk=booking.pk).status, 'CONFIRMED')
+
+        with self.assertLogs('bookings.services', level='WARNING'):
+            process_payment_notifications()
+        self.assertEqual(process_payment_notifications(), 0)
+        dead = PaymentNotification.objects.get(order_id="never-order")
+        self.assertEqual((dead.attempts, dead.processed_at, dead.last_error), (3, None, "Booking not found"))
 
     def test_midtrans_notification_wrong_method(self):
         """Test GET request to notification URL."""
@@ -433,6 +600,53 @@ class BookingViewsTestCase(TestCase):
         response = self.client.get(notification_url)
         self.assertEqual(response.status_code, 405)
 
+    @override_settings(MIDTRANS_SERVER_KEY='server-key')
+    def test_midtrans_notification_rejects_bad_signature(self):
+        """Test notification signature is verified before it is queued."""
+        notification_url = reverse('bookings:midtrans_notification')
+        payload = {"order_id": "signed-order", "status_code": "200", "gross_amount": "100000.00",
+                   "transaction_status": "settlement", "signature_key": "forged"}
+
+        response = self.client.post(notification_url, data=json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(PaymentNotification.objects.exists())
+
+        payload["signature_key"] = hashlib.sha512(b"signed-order200100000.00server-key").hexdigest()
+        response = self.client.post(notification_url, data=json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(PaymentNotification.objects.filter(order_id="signed-order").exists())
+
+    @override_settings(PAYMENT_NOTIFICATION_RETRY_SECONDS=0)
+    def test_payment_notification_failure_is_recorded_and_retried(self):
+        """Test a failing notification does not block the batch and is retried later."""
+        failing = self._create_test_booking(self.user)
+        failing.midtrans_order_id = "failing-order"
+        failing.save()
+        ok = self._create_test_booking(self.user)
+        ok.midtrans_order_id = "ok-order"
+        ok.save()
+        for order_id in ("failing-order", "ok-order"):
+            PaymentNotification.objects.create(
+                order_id=order_id, transaction_status="settlement", fraud_status="accept", payload={}
+            )
+
+        real_issue = issue_tickets
+        def flaky_issue(booking):
+            if booking.pk == failing.pk:
+                raise RuntimeError("db busy")
+            return real_issue(booking)
+
+        with patch('bookings.services.issue_tickets', side_effect=flaky_issue):
+            self.assertEqual(process_payment_notifications(), 1)
+
+        notification = PaymentNotification.objects.get(order_id="failing-order")
+        self.assertIsNone(notification.processed_at)
+        self.assertEqual((notification.attempts, notification.last_error), (1, "db busy"))
+        self.assertEqual(Booking.objects.get(pk=ok.pk).status, 'CONFIRMED')
+
+        self.assertEqual(process_payment_notifications(), 1)
+        self.assertEqual(Booking.objects.get(pk=failing.pk).status, 'CONFIRMED')
+
     def test_check_booking_status_success(self):
         """Test checking status of own booking."""
         booking = self._create_test_booking(self.user)
@@ -466,4 +680,1402 @@ class BookingViewsTestCase(TestCase):
 
         response = self.client.get(check_url)
 
-        self.assertEqual(response.status_code, 404)
\ No newline at end of file
+        self.assertEqual(response.status_code, 404)
+
+class ReservationConcurrencyTestCase(TransactionTestCase):
+    """Reservasi paralel pada baris TicketPrice yang sama tidak boleh oversell."""
+
+    WORKERS = 16
+    ATTEMPTS = 200
+    STOCK = 50
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'buyer{i}', password='password123', email=f'buyer{i}@example.com', role='user')
+            for i in range(self.WORKERS)
+        ]
+        home = Team.objects.create(name='Persija Jakarta', league='liga_1')
+        away = Team.objects.create(name='Persib Bandung', league='liga_1')
+        venue = Venue.objects.create(name='GBK', city='Jakarta')
+        self.match = Match.objects.create(
+            home_team=home, away_team=away, venue=venue,
+            date=timezone.now() + timezone.timedelta(days=7),
+        )
+        self.vvip = TicketPrice.objects.create(
+            match=self.match, seat_category='VVIP', price=Decimal('500000.00'), quantity_available=self.STOCK
+        )
+        self.vip = TicketPrice.objects.create(
+            match=self.match, seat_category='VIP', price=Decimal('300000.00'), quantity_available=self.STOCK * 2
+        )
+
+    def _attempt(self, index):
+        user = self.users[index % self.WORKERS]
+        try:
+            reserve_tickets(user, self.match, {'VVIP': 1, 'VIP': 1})
+            return True
+        except InsufficientStock:
+            return False
+        finally:
+            connection.close()
+
+    def test_parallel_reservations_never_oversell(self):
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            results = list(pool.map(self._attempt, range(self.ATTEMPTS)))
+
+        self.vvip.refresh_from_db()
+        self.vip.refresh_from_db()
+        self.assertEqual(sum(results), self.STOCK)
+        self.assertEqual(self.vvip.quantity_available, 0)
+        self.assertEqual(self.vip.quantity_available, self.STOCK)
+        self.assertEqual(Booking.objects.count(), self.STOCK)
+        self.assertEqual(BookingItem.objects.filter(ticket_type=self.vvip).count(), self.STOCK)
+
+    @override_settings(INVENTORY_BACKEND='local')
+    def test_parallel_reservations_never_oversell_with_inventory_tier(self):
+        inventory.reset_store()
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            results = list(pool.map(self._attempt, range(self.ATTEMPTS)))
+        inventory.flush_pending_stock()
+
+        self.vvip.refresh_from_db()
+        self.assertEqual(sum(results), self.STOCK)
+        self.assertEqual(self.vvip.quantity_available, 0)
+        self.assertFalse(BookingItem.objects.filter(stock_committed=False).exists())
+
+    def test_parallel_bookings_respect_per_user_promo_limit(self):
+        promo = Promotion.objects.create(name='Once', code='ONCE', kind='PERCENT', value=Decimal('10'), per_user_limit=1)
+        user = self.users[0]
+
+        def attempt(_):
+            try:
+                reserve_tickets(user, self.match, {'VIP': 1}, promo_code='ONCE')
+                return True
+            except InvalidPromoCode:
+                return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(attempt, range(8)))
+
+        self.assertEqual(sum(results), 1)
+        self.assertEqual(Booking.objects.filter(user=user, promotion=promo).count(), 1)
+
+
+@override_settings(INVENTORY_BACKEND='local')
+class InventoryTierTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tieruser', password='password123', email='tier@example.com', role='user')
+        home = Team.objects.create(name='Arema FC', league='liga_1')
+        away = Team.objects.create(name='PSM Makassar', league='liga_1')
+        cls.match = Match.objects.create(
+            home_team=home, away_team=away, date=timezone.now() + timezone.timedelta(days=3)
+        )
+        cls.regular = TicketPrice.objects.create(
+            match=cls.match, seat_category='REGULAR', price=Decimal('150000.00'), quantity_available=10
+        )
+
+    def setUp(self):
+        inventory.reset_store()
+
+    def test_reservation_is_written_behind(self):
+        booking = reserve_tickets(self.user, self.match, {'REGULAR': 3})
+
+        self.regular.refresh_from_db()
+        self.assertEqual(self.regular.quantity_available, 10)
+        self.assertEqual(inventory.get_store().get_many([self.regular.pk]), {self.regular.pk: 7})
+        self.assertFalse(booking.items.get().stock_committed)
+
+        self.assertEqual(inventory.flush_pending_stock(), 1)
+        self.regular.refresh_from_db()
+        self.assertEqual(self.regular.quantity_available, 7)
+        self.assertTrue(booking.items.get().stock_committed)
+
+    def test_counter_rejects_oversell(self):
+        reserve_tickets(self.user, self.match, {'REGULAR': 8})
+        with self.assertRaises(InsufficientStock):
+            reserve_tickets(self.user, self.match, {'REGULAR': 3})
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_release_before_flush_does_not_touch_ticket_price(self):
+        booking = reserve_tickets(self.user, self.match, {'REGULAR': 4})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(release_tickets(booking, 'CANCELLED'))
+        self.assertFalse(release_tickets(booking, 'EXPIRED'))
+        self.assertEqual(inventory.flush_pending_stock(), 0)
+
+        self.regular.refresh_from_db()
+        self.assertEqual(self.regular.quantity_available, 10)
+        self.assertEqual(inventory.get_store().get_many([self.regular.pk]), {self.regular.pk: 10})
+
+    def test_reconcile_rebuilds_counters_from_pending_items(self):
+        reserve_tickets(self.user, self.match, {'REGULAR': 2})
+        inventory.reset_store()
+
+        self.assertEqual(inventory.reconcile_counters(match_ids=[self.match.id]), 1)
+        self.assertEqual(inventory.get_store().get_many([self.regular.pk]), {self.regular.pk: 8})
+
+    def test_release_is_applied_after_commit_and_survives_refresh(self):
+        booking = reserve_tickets(self.user, self.match, {'REGULAR': 4})
+        inventory.settle({self.regular.pk: 4})
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertTrue(release_tickets(booking, 'CANCELLED'))
+        # Stok DB sudah kembali tetapi counter belum: refresh tidak boleh menimpanya
+        self.assertEqual(inventory.refresh_counters([self.regular.pk]), 0)
+        self.assertEqual(inventory.get_store().get_many([self.regular.pk]), {self.regular.pk: 6})
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(inventory.get_store().get_many([self.regular.pk]), {self.regular.pk: 10})
+        self.assertEqual(inventory.refresh_counters([self.regular.pk]), 1)
+        self.assertEqual(inventory.get_store().get_many([self.regular.pk]), {self.regular.pk: 10})
+
+    def test_rolled_back_release_leaves_counter_untouched(self):
+        booking = reserve_tickets(self.user, self.match, {'REGULAR': 4})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    release_tickets(booking, 'CANCELLED')
+                    raise RuntimeError("rollback")
+            except RuntimeError:
+                pass
+        self.assertEqual(inventory.get_store().get_many([self.regular.pk]), {self.regular.pk: 6})
+        self.assertEqual(Booking.objects.get(pk=booking.pk).status, 'PENDING')
+
+    def test_refresh_does_not_overwrite_in_flight_reservation(self):
+        inventory.refresh_counters([self.regular.pk])
+        # Counter sudah dikurangi tetapi BookingItem belum commit: DB masih menunjukkan 10
+        self.assertIsNone(inventory.reserve({self.regular.pk: 3}))
+
+        self.assertEqual(inventory.refresh_counters([self.regular.pk]), 0)
+        self.assertEqual(inventory.get_store().get_many([self.regular.pk]), {self.regular.pk: 7})
+
+        inventory.release({self.regular.pk: 3})
+        inventory.settle({self.regular.pk: 3})
+        self.assertEqual(inventory.refresh_counters([self.regular.pk]), 1)
+        self.assertEqual(inventory.get_store().get_many([self.regular.pk]), {self.regular.pk: 10})
+
+
+class WaitingRoomTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='fan1', password='password123', email='fan1@example.com', role='user')
+        cls.other_user = User.objects.create_user(username='fan2', password='password123', email='fan2@example.com', role='user')
+        home = Team.objects.create(name='Persija Jakarta', league='liga_1')
+        away = Team.objects.create(name='Persib Bandung', league='liga_1')
+        cls.match = Match.objects.create(
+            home_team=home, away_team=away, date=timezone.now() + timezone.timedelta(days=7)
+        )
+        TicketPrice.objects.create(match=cls.match, seat_category='VVIP', price=Decimal('500000.00'), quantity_available=50)
+        cls.room = WaitingRoom.objects.create(match=cls.match, release_rate_per_minute=1, initial_release=1)
+        cls.create_booking_url = reverse('bookings:create_booking', kwargs={'match_id': cls.match.id})
+        cls.flutter_booking_url = reverse('bookings:flutter_create_booking', kwargs={'match_id': cls.match.id})
+        cls.status_url = reverse('bookings:queue_status', kwargs={'match_id': cls.match.id})
+
+    def setUp(self):
+        cache.clear()
+        self.first = Client()
+        self.first.login(username='fan1', password='password123')
+        self.second = Client()
+        self.second.login(username='fan2', password='password123')
+        self.post_data = json.dumps({"types": {"VVIP": 1}, "method": "gopay"})
+
+    def test_visitors_beyond_release_wait_in_queue(self):
+        self.assertTemplateUsed(self.first.get(self.create_booking_url), 'create_booking.html')
+
+        response = self.second.get(self.create_booking_url)
+        self.assertTemplateUsed(response, 'waiting_room.html')
+        self.assertEqual(response.context['queue']['ahead'], 1)
+
+        response = self.second.post(self.create_booking_url, data=self.post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(Booking.objects.exists())
+
+        response = self.first.post(self.create_booking_url, data=self.post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_queue_status_releases_visitors_over_time(self):
+        self.first.get(self.create_booking_url)
+        self.second.get(self.create_booking_url)
+
+        response = self.second.get(self.status_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['queue']['admitted'])
+        self.assertIn('max-age', response['Cache-Control'])
+
+        with patch('bookings.waiting_room.time.time', return_value=self.room.opened_at.timestamp() + 61):
+            self.assertTrue(self.second.get(self.status_url).json()['queue']['admitted'])
+            response = self.second.post(self.create_booking_url, data=self.post_data, content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+
+    def test_queue_status_rejects_forged_token(self):
+        response = self.client.get(self.status_url, HTTP_X_QUEUE_TOKEN='forged-token')
+        self.assertEqual(response.status_code, 400)
+
+    def test_flutter_booking_requires_queue_token(self):
+        self.first.get(self.create_booking_url)
+
+        response = self.second.post(self.flutter_booking_url, data=self.post_data, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+
+        join_url = reverse('bookings:queue_join', kwargs={'match_id': self.match.id})
+        token = self.second.post(join_url).json()['token']
+        with patch('bookings.waiting_room.time.time', return_value=self.room.opened_at.timestamp() + 120):
+            response = self.second.post(
+                self.flutter_booking_url,
+                data=json.dumps({"ticket_types": {"VVIP": 1}, "payment_method": "gopay"}),
+                content_type='application/json',
+                HTTP_X_QUEUE_TOKEN=token,
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['status'])
+
+    def test_token_is_bound_to_its_user(self):
+        join_url = reverse('bookings:queue_join', kwargs={'match_id': self.match.id})
+        token = self.first.post(join_url).json()['token']
+        self.second.get(self.create_booking_url)
+
+        # Token fan1 (sudah mendapat giliran) tidak berlaku untuk akun fan2
+        response = self.second.post(
+            self.flutter_booking_url,
+            data=json.dumps({"ticket_types": {"VVIP": 1}, "payment_method": "gopay"}),
+            content_type='application/json',
+            HTTP_X_QUEUE_TOKEN=token,
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.second.get(self.status_url, HTTP_X_QUEUE_TOKEN=token).status_code, 400)
+        self.assertEqual(waiting_room.read_token(token, self.match.id, self.user.pk), 1)
+        self.assertIsNone(waiting_room.read_token(token, self.match.id, self.other_user.pk))
+
+    def test_inactive_room_does_not_queue(self):
+        self.room.is_active = False
+        self.room.save()
+        self.first.get(self.create_booking_url)
+        self.assertTemplateUsed(self.second.get(self.create_booking_url), 'create_booking.html')
+
+
+class ExpirySweeperTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='sweepuser', password='password123', email='sweep@example.com', role='user')
+        home = Team.objects.create(name='Persis Solo', league='liga_1')
+        away = Team.objects.create(name='Persik Kediri', league='liga_1')
+        cls.match = Match.objects.create(
+            home_team=home, away_team=away, date=timezone.now() + timezone.timedelta(days=2)
+        )
+        cls.regular = TicketPrice.objects.create(
+            match=cls.match, seat_category='REGULAR', price=Decimal('150000.00'), quantity_available=100
+        )
+
+    def _booking(self, minutes_ago, quantity=2, status='PENDING', order_id=None, charged_minutes_ago=None):
+        booking = reserve_tickets(self.user, self.match, {'REGULAR': quantity})
+        now = timezone.now()
+        Booking.objects.filter(pk=booking.pk).update(
+            status=status,
+            midtrans_order_id=order_id,
+            created_at=now - timezone.timedelta(minutes=minutes_ago),
+            charged_at=None if charged_minutes_ago is None else now - timezone.timedelta(minutes=charged_minutes_ago),
+        )
+        return booking
+
+    def _stub_cancel(self, status_code='200'):
+        response = MagicMock(status_code=200, json=MagicMock(return_value={'status_code': status_code}))
+        return patch('bookings.midtrans.MidtransClient.cancel', return_value=response)
+
+    def test_sweeper_expires_only_stale_holds(self):
+        stale = self._booking(minutes_ago=settings.BOOKING_HOLD_TTL_MINUTES + 5, quantity=3)
+        fresh = self._booking(minutes_ago=1)
+        confirmed = self._booking(minutes_ago=600, status='CONFIRMED')
+
+        reclaimed = expire_stale_bookings()
+
+        self.assertEqual(reclaimed, {'bookings': 1, 'tickets': 3})
+        self.assertEqual(Booking.objects.get(pk=stale.pk).status, 'EXPIRED')
+        self.assertEqual(Booking.objects.get(pk=fresh.pk).status, 'PENDING')
+        self.assertEqual(Booking.objects.get(pk=confirmed.pk).status, 'CONFIRMED')
+        self.regular.refresh_from_db()
+        self.assertEqual(self.regular.quantity_available, 100 - 2 - 2)
+
+    def test_sweeper_waits_for_midtrans_expiry_on_charged_bookings(self):
+        # Hold dibuat lama sebelum charge: masa bayar tetap dihitung dari charged_at
+        charged = self._booking(minutes_ago=120, order_id='book-gop-1234', charged_minutes_ago=5)
+        with self._stub_cancel() as mock_cancel:
+            self.assertEqual(expire_stale_bookings()['bookings'], 0)
+        mock_cancel.assert_not_called()
+
+        later = timezone.now() + timezone.timedelta(minutes=settings.BOOKING_PAYMENT_TTL_MINUTES)
+        with self._stub_cancel() as mock_cancel:
+            self.assertEqual(expire_stale_bookings(now=later)['bookings'], 1)
+        mock_cancel.assert_called_once_with('book-gop-1234')
+        self.assertEqual(Booking.objects.get(pk=charged.pk).status, 'EXPIRED')
+
+    def test_sweeper_keeps_booking_when_midtrans_cancel_fails(self):
+        minutes = settings.BOOKING_PAYMENT_TTL_MINUTES + 5
+        settled = self._booking(minutes_ago=minutes, order_id='book-gop-paid', charged_minutes_ago=minutes)
+        unreachable = self._booking(minutes_ago=minutes, order_id='book-gop-down', charged_minutes_ago=minutes)
+
+        # 412: transaksi sudah dibayar, tidak bisa dibatalkan
+        with self._stub_cancel(status_code='412'):
+            self.assertEqual(expire_stale_bookings(batch_size=1)['bookings'], 0)
+        with patch('bookings.midtrans.MidtransClient.cancel', side_effect=midtrans.MidtransUnavailable('open')):
+            self.assertEqual(expire_stale_bookings()['bookings'], 0)
+        self.assertEqual(Booking.objects.get(pk=settled.pk).status, 'PENDING')
+        self.assertEqual(Booking.objects.get(pk=unreachable.pk).status, 'PENDING')
+
+        with self._stub_cancel(status_code='407'):
+            self.assertEqual(expire_stale_bookings()['bookings'], 2)
+
+    def test_sweeper_processes_in_batches(self):
+        for _ in range(5):
+            self._booking(minutes_ago=settings.BOOKING_HOLD_TTL_MINUTES + 1, quantity=1)
+
+        self.assertEqual(expire_stale_bookings(batch_size=2), {'bookings': 5, 'tickets': 5})
+        self.regular.refresh_from_db()
+        self.assertEqual(self.regular.quantity_available, 100)
+        self.assertEqual(expire_stale_bookings(), {'bookings': 0, 'tickets': 0})
+
+
+class IdempotencyKeyTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='retrier', password='password123', email='retrier@example.com')
+        team1 = Team.objects.create(name='Team I', league='liga_1')
+        team2 = Team.objects.create(name='Team J', league='liga_1')
+        venue = Venue.objects.create(name='Stadium I', city='City I')
+        cls.match = Match.objects.create(
+            home_team=team1, away_team=team2, venue=venue, date=timezone.now() + timezone.timedelta(days=3)
+        )
+        cls.regular = TicketPrice.objects.create(
+            match=cls.match, seat_category='REGULAR', price=Decimal('100000.00'), quantity_available=10
+        )
+        cls.flutter_booking_url = reverse('bookings:flutter_create_booking', kwargs={'match_id': cls.match.id})
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.login(username='retrier', password='password123')
+
+    def _post(self, url, data, key):
+        return self.client.post(
+            url, data=json.dumps(data), content_type='application/json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retried_create_booking_replays_first_response(self):
+        data = {"ticket_types": {"REGULAR": 2}, "payment_method": "gopay"}
+        first = self._post(self.flutter_booking_url, data, 'key-1')
+        retry = self._post(self.flutter_booking_url, data, 'key-1')
+
+        self.assertTrue(first.json()['status'])
+        self.assertEqual(retry.json()['booking_id'], first.json()['booking_id'])
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 1)
+        self.regular.refresh_from_db()
+        self.assertEqual(self.regular.quantity_available, 8)
+
+        # Key baru = request baru
+        self.assertTrue(self._post(self.flutter_booking_url, data, 'key-2').json()['status'])
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 2)
+
+    def test_reused_key_with_different_body_is_rejected(self):
+        self._post(self.flutter_booking_url, {"ticket_types": {"REGULAR": 1}}, 'key-1')
+        response = self._post(self.flutter_booking_url, {"ticket_types": {"REGULAR": 3}}, 'key-1')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 1)
+
+    @patch('bookings.midtrans.MidtransClient.charge')
+    def test_retried_payment_charges_midtrans_once(self, mock_post):
+        booking = Booking.objects.create(user=self.user, total_price=Decimal('100000.00'))
+        BookingItem.objects.create(booking=booking, ticket_type=self.regular, quantity=1)
+        mock_post.return_value = MagicMock(status_code=201, json=MagicMock(return_value={
+            "status_code": "201", "transaction_status": "pending", "actions": [],
+        }))
+        url = reverse('bookings:flutter_payment', kwargs={'booking_id': booking.booking_id})
+
+        first = self._post(url, {"method": "gopay"}, 'pay-1')
+        retry = self._post(url, {"method": "gopay"}, 'pay-1')
+
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry.status_code, first.status_code)
+        mock_post.assert_called_once()
+
+    @patch('bookings.midtrans.MidtransClient.charge')
+    def test_gateway_failure_is_not_replayed(self, mock_post):
+        booking = Booking.objects.create(user=self.user, total_price=Decimal('100000.00'))
+        BookingItem.objects.create(booking=booking, ticket_type=self.regular, quantity=1)
+        url = reverse('bookings:flutter_payment', kwargs={'booking_id': booking.booking_id})
+        mock_post.side_effect = requests.exceptions.ConnectionError("gateway down")
+
+        first = self._post(url, {"method": "gopay"}, 'pay-1')
+        self.assertEqual(first.status_code, 502)
+        self.assertFalse(first.json()['status'])
+
+        mock_post.side_effect = None
+        mock_post.return_value = MagicMock(status_code=201, json=MagicMock(return_value={
+            "status_code": "201", "transaction_status": "pending", "actions": [],
+        }))
+        retry = self._post(url, {"method": "gopay"}, 'pay-1')
+        self.assertTrue(retry.json()['status'])
+        self.assertNotIn('Idempotent-Replayed', retry)
+        self.assertEqual(mock_post.call_count, 2)
+
+    def test_requests_without_key_are_not_cached(self):
+        data = {"ticket_types": {"REGULAR": 1}}
+        self.client.post(self.flutter_booking_url, data=json.dumps(data), content_type='application/json')
+        self.client.post(self.flutter_booking_url, data=json.dumps(data), content_type='application/json')
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 2)
+
+
+class _StubMidtransHandler(BaseHTTPRequestHandler):
+    """Stub Midtrans lokal: mengembalikan response dari antrean server.responses (status, body, delay)."""
+
+    def _reply(self):
+        self.server.hits.append((self.command, self.path, self.headers.get('Authorization')))
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        status, body, delay = self.server.responses.pop(0) if self.server.responses else (200, {}, 0)
+        time.sleep(delay)
+        payload = json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class MidtransClientTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubMidtransHandler)
+        self.server.responses = []
+        self.server.hits = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def _client(self, **kwargs):
+        options = dict(read_timeout=0.5, max_retries=2, backoff=0, breaker=midtrans.CircuitBreaker(3, 60))
+        options.update(kwargs)
+        client = midtrans.MidtransClient(f"http://127.0.0.1:{self.server.server_port}/v2", 'server-key', **options)
+        self.addCleanup(client.session.close)
+        return client
+
+    def test_status_retries_transient_errors(self):
+        self.server.responses = [(503, {}, 0), (200, {'transaction_status': 'settlement'}, 0)]
+        client = self._client()
+
+        response = client.status('order-1')
+
+        self.assertEqual(response.json()['transaction_status'], 'settlement')
+        self.assertEqual([hit[:2] for hit in self.server.hits], [('GET', '/v2/order-1/status')] * 2)
+        self.assertEqual(self.server.hits[0][2], 'Basic ' + base64.b64encode(b'server-key:').decode())
+        self.assertEqual(client.metrics()['status']['calls'], 2)
+        self.assertEqual(client.metrics()['status']['errors'], 1)
+
+    def test_charge_is_never_retried(self):
+        self.server.responses = [(503, {'status_message': 'down'}, 0)]
+        response = self._client().charge({'transaction_details': {'order_id': 'x'}})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.hits), 1)
+
+    def test_read_timeout_is_enforced(self):
+        self.server.responses = [(200, {}, 1)]
+        client = self._client(read_timeout=0.2)
+
+        started = time.monotonic()
+        with self.assertRaises(midtrans.requests.exceptions.Timeout):
+            client.charge({})
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_breaker_opens_and_fails_fast(self):
+        self.server.responses = [(500, {}, 0)] * 3
+        client = self._client(max_retries=0)
+        for _ in range(3):
+            client.status('order-2')
+
+        with self.assertRaises(midtrans.MidtransUnavailable):
+            client.status('order-2')
+        self.assertEqual(len(self.server.hits), 3)
+        self.assertEqual(client.metrics()['status']['rejected'], 1)
+        self.assertEqual(client.metrics()['breaker'], 'open')
+
+    def test_breaker_half_open_probe_closes_on_success(self):
+        client = self._client(max_retries=0, breaker=midtrans.CircuitBreaker(1, 0.05))
+        self.server.responses = [(500, {}, 0)]
+        client.status('order-3')
+        self.assertEqual(client.metrics()['breaker'], 'open')
+
+        time.sleep(0.1)
+        self.assertEqual(client.status('order-3').status_code, 200)
+        self.assertEqual(client.metrics()['breaker'], 'closed')
+
+    @override_settings(MIDTRANS_SLOW_CALL_MS=50)
+    def test_slow_calls_are_logged(self):
+        self.server.responses = [(200, {}, 0.1)]
+        with self.assertLogs('bookings.midtrans', level='WARNING') as logs:
+            self._client().status('order-4')
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('status lambat', logs.output[0])
+
+
+class PaymentReconcileTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='payer', password='password123', email='payer@example.com')
+        team1 = Team.objects.create(name='Team P', league='liga_1')
+        team2 = Team.objects.create(name='Team Q', league='liga_1')
+        venue = Venue.objects.create(name='Stadium P', city='City P')
+        match = Match.objects.create(
+            home_team=team1, away_team=team2, venue=venue, date=timezone.now() + timezone.timedelta(days=5)
+        )
+        cls.regular = TicketPrice.objects.create(
+            match=match, seat_category='REGULAR', price=Decimal('100000.00'), quantity_available=100
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.login(username='payer', password='password123')
+
+    def _booking(self, order_id, quantity=2):
+        booking = Booking.objects.create(user=self.user, total_price=Decimal('200000.00'), midtrans_order_id=order_id)
+        BookingItem.objects.create(booking=booking, ticket_type=self.regular, quantity=quantity)
+        return booking
+
+    def _stub_status(self, statuses):
+        def status(order_id):
+            if order_id not in statuses:
+                return MagicMock(status_code=404)
+            return MagicMock(status_code=200, json=MagicMock(return_value={'transaction_status': statuses[order_id]}))
+        return patch('bookings.midtrans.MidtransClient.status', side_effect=status)
+
+    def test_reconcile_applies_transitions_in_bulk(self):
+        paid = self._booking('mb-paid', quantity=3)
+        expired = self._booking('mb-expired')
+        waiting = self._booking('mb-waiting')
+        unknown = self._booking('mb-unknown')
+        no_charge = Booking.objects.create(user=self.user, total_price=Decimal('100000.00'))
+
+        with self._stub_status({'mb-paid': 'settlement', 'mb-expired': 'expire', 'mb-waiting': 'pending'}) as mock_status:
+            summary = reconcile_pending_payments(batch_size=2, workers=4)
+
+        self.assertEqual(summary, {'checked': 3, 'confirmed': 1, 'released': 1, 'errors': 1})
+        self.assertEqual(mock_status.call_count, 4)
+        self.assertEqual(Booking.objects.get(pk=paid.pk).status, 'CONFIRMED')
+        self.assertEqual(Ticket.objects.filter(booking=paid).count(), 3)
+        self.assertEqual(Booking.objects.get(pk=expired.pk).status, 'EXPIRED')
+        self.assertEqual(Booking.objects.get(pk=waiting.pk).status, 'PENDING')
+        self.assertEqual(Booking.objects.get(pk=unknown.pk).status, 'PENDING')
+        self.assertEqual(Booking.objects.get(pk=no_charge.pk).status, 'PENDING')
+        self.regular.refresh_from_db()
+        self.assertEqual(self.regular.quantity_available, 102)
+
+        # Putaran berikutnya hanya mengecek booking yang masih PENDING
+        with self._stub_status({'mb-waiting': 'pending'}) as mock_status:
+            reconcile_pending_payments()
+        self.assertEqual(mock_status.call_count, 2)
+
+    def test_late_settlement_found_by_reconcile_is_marked_for_refund(self):
+        late = self._booking('mb-late')
+        paid = self._booking('mb-paid-2')
+        # Sweeper melepas booking di antara pengambilan kandidat dan konfirmasi
+        release_tickets(late, 'EXPIRED')
+
+        with self.assertLogs('bookings.services', level='WARNING'):
+            confirmed = services._confirm_bookings([late.pk, paid.pk], timezone.now())
+
+        self.assertEqual(confirmed, 1)
+        late.refresh_from_db()
+        self.assertEqual((late.status, late.refund_required), ('EXPIRED', True))
+        self.assertFalse(Ticket.objects.filter(booking=late).exists())
+        self.assertFalse(Booking.objects.get(pk=paid.pk).refund_required)
+
+    def test_sync_status_reads_stored_status_without_midtrans(self):
+        booking = self._booking('mb-sync')
+        url = reverse('bookings:flutter_sync_status', kwargs={'booking_id': booking.booking_id})
+        with self._stub_status({'mb-sync': 'pending'}):
+            reconcile_pending_payments()
+        # Disimpan di Booking, bukan cache per proses: worker web lain tetap melihatnya
+        cache.clear()
+        booking.refresh_from_db()
+        self.assertEqual(booking.midtrans_status, 'pending')
+        self.assertIsNotNone(booking.midtrans_checked_at)
+
+        with patch('bookings.midtrans.MidtransClient.status') as mock_status:
+            response = self.client.post(url)
+        mock_status.assert_not_called()
+        self.assertEqual(response.json()['payment_status'], 'PENDING')
+        self.assertEqual(response.json()['midtrans_status'], 'pending')
+
+        check_url = reverse('bookings:flutter_check_status', kwargs={'booking_id': booking.booking_id})
+        self.assertEqual(self.client.get(check_url).json()['midtrans_status'], 'pending')
+
+
+class AvailabilitySnapshotTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='watcher', password='password123', email='watcher@example.com')
+        team1 = Team.objects.create(name='Team S', league='liga_1')
+        team2 = Team.objects.create(name='Team T', league='liga_1')
+        venue = Venue.objects.create(name='Stadium S', city='City S')
+        cls.match = Match.objects.create(
+            home_team=team1, away_team=team2, venue=venue, date=timezone.now() + timezone.timedelta(days=2)
+        )
+        cls.regular = TicketPrice.objects.create(
+            match=cls.match, seat_category='REGULAR', price=Decimal('100000.00'), quantity_available=10
+        )
+        cls.vip = TicketPrice.objects.create(
+            match=cls.match, seat_category='VIP', price=Decimal('250000.00'), quantity_available=5
+        )
+        cls.url = reverse('bookings:flutter_ticket_prices', kwargs={'match_id': cls.match.id})
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.login(username='watcher', password='password123')
+
+    def _quantities(self, response):
+        return {t['seat_category']: t['quantity_available'] for t in response.json()['tickets']}
+
+    def test_polling_with_etag_gets_304_without_ticket_queries(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['match']['title'], 'Team S vs Team T')
+        self.assertEqual(self._quantities(first), {'REGULAR': 10, 'VIP': 5})
+
+        with CaptureQueriesContext(connection) as ctx:
+            polled = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(polled.status_code, 304)
+        self.assertFalse([q for q in ctx.captured_queries if 'matches_' in q['sql']])
+
+    def test_stock_changes_invalidate_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = reserve_tickets(self.user, self.match, {'REGULAR': 3})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._quantities(response)['REGULAR'], 7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            release_tickets(booking, 'CANCELLED')
+        self.assertEqual(self._quantities(self.client.get(self.url))['REGULAR'], 10)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vip.quantity_available = 1
+            self.vip.save()
+        self.assertEqual(self._quantities(self.client.get(self.url))['VIP'], 1)
+
+    def test_etag_and_body_come_from_one_snapshot(self):
+        with patch('bookings.availability.get_snapshot', wraps=availability.get_snapshot) as mock_snapshot:
+            response = self.client.get(self.url)
+        mock_snapshot.assert_called_once()
+        self.assertEqual(response['ETag'], f'"{hashlib.sha1(response.content).hexdigest()}"')
+
+    def test_unknown_match_returns_404(self):
+        response = self.client.get(reverse('bookings:flutter_ticket_prices', kwargs={'match_id': uuid.uuid4()}))
+        self.assertEqual(response.status_code, 404)
+
+
+class TicketCodeTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='holder', password='password123', email='holder@example.com')
+        cls.other = User.objects.create_user(username='stranger', password='password123', email='stranger@example.com')
+        team1 = Team.objects.create(name='Team K', league='liga_1')
+        team2 = Team.objects.create(name='Team L', league='liga_1')
+        venue = Venue.objects.create(name='Stadium K', city='City K')
+        match = Match.objects.create(
+            home_team=team1, away_team=team2, venue=venue, date=timezone.now() + timezone.timedelta(days=4)
+        )
+        cls.regular = TicketPrice.objects.create(
+            match=match, seat_category='REGULAR', price=Decimal('100000.00'), quantity_available=100
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.booking = Booking.objects.create(user=self.user, total_price=Decimal('300000.00'), status='CONFIRMED')
+        BookingItem.objects.create(booking=self.booking, ticket_type=self.regular, quantity=3)
+        self.tickets = issue_tickets(self.booking)
+
+    def test_issued_tickets_carry_signed_codes(self):
+        codes = {ticket.code for ticket in Ticket.objects.filter(booking=self.booking)}
+        self.assertEqual(len(codes), 3)
+        for ticket in self.tickets:
+            self.assertEqual(ticket.code, ticket_codes.make_ticket_code(ticket.ticket_id))
+        with override_settings(TICKET_CODE_SECRET='rotated'):
+            self.assertNotEqual(ticket_codes.make_ticket_code(self.tickets[0].ticket_id), self.tickets[0].code)
+
+    def test_qr_rendered_in_batch_and_served_with_long_cache(self):
+        self.assertEqual(ticket_codes.render_pending_qr(batch_size=2), 3)
+        self.assertEqual(ticket_codes.render_pending_qr(), 0)
+        for ticket in self.tickets:
+            self.assertTrue(os.path.exists(ticket_codes.qr_path(ticket.code)))
+
+        url = reverse('bookings:ticket_qr', args=[self.tickets[0].code])
+        self.client.login(username='holder', password='password123')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'\x89PNG'))
+
+        self.client.login(username='stranger', password='password123')
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_ticket_listing_exposes_stored_code(self):
+        self.client.login(username='holder', password='password123')
+        response = self.client.get(reverse('bookings:flutter_get_booking_tickets', args=[self.booking.booking_id]))
+        ticket = response.json()['tickets'][0]
+        self.assertIn(ticket['ticket_code'], {t.code for t in self.tickets})
+        self.assertTrue(ticket['qr_code'].endswith(f"/tickets/{ticket['ticket_code']}/qr.png"))
+
+
+class GateScanTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fan = User.objects.create_user(username='fan', password='password123', email='fan@example.com')
+        cls.steward = User.objects.create_user(
+            username='steward', password='password123', email='steward@example.com', role='admin'
+        )
+        team1 = Team.objects.create(name='Team G', league='liga_1')
+        team2 = Team.objects.create(name='Team H', league='liga_1')
+        venue = Venue.objects.create(name='Stadium G', city='City G')
+        cls.match = Match.objects.create(
+            home_team=team1, away_team=team2, venue=venue, date=timezone.now() + timezone.timedelta(hours=2)
+        )
+        cls.other_match = Match.objects.create(
+            home_team=team2, away_team=team1, venue=venue, date=timezone.now() + timezone.timedelta(days=9)
+        )
+        cls.regular = TicketPrice.objects.create(
+            match=cls.match, seat_category='REGULAR', price=Decimal('100000.00'), quantity_available=100
+        )
+        cls.other_regular = TicketPrice.objects.create(
+            match=cls.other_match, seat_category='REGULAR', price=Decimal('100000.00'), quantity_available=100
+        )
+
+    def setUp(self):
+        self.tickets = self._issue(self.regular, 5)
+        self.other_ticket = self._issue(self.other_regular, 1)[0]
+        self.client.login(username='steward', password='password123')
+
+    def _issue(self, ticket_price, quantity):
+        booking = Booking.objects.create(user=self.fan, total_price=Decimal('100000.00'), status='CONFIRMED')
+        BookingItem.objects.create(booking=booking, ticket_type=ticket_price, quantity=quantity)
+        return issue_tickets(booking)
+
+    def _post(self, name, data):
+        url = reverse(f'bookings:{name}', kwargs={'match_id': self.match.id})
+        return self.client.post(url, data=json.dumps(data), content_type='application/json')
+
+    def test_scan_marks_ticket_used_once(self):
+        code = self.tickets[0].code
+        with CaptureQueriesContext(connection) as ctx:
+            first = gate.scan_ticket(self.match.id, code)
+        self.assertEqual(first['result'], gate.ACCEPTED)
+        # SELECT tiket + UPDATE bersyarat pada pk-nya (tanpa subquery)
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertNotIn('SELECT', ctx.captured_queries[1]['sql'])
+
+        response = self._post('gate_scan', {'code': code})
+        self.assertEqual(response.json()['result'], gate.ALREADY_USED)
+        self.assertFalse(response.json()['status'])
+        self.assertEqual(self._post('gate_scan', {'code': 'NOPE'}).json()['result'], gate.INVALID)
+        self.assertEqual(self._post('gate_scan', {'code': self.other_ticket.code}).json()['result'], gate.WRONG_MATCH)
+        self.assertTrue(Ticket.objects.get(pk=self.tickets[0].pk).is_used)
+
+    def test_bulk_sync_applies_earliest_scan(self):
+        gate.scan_ticket(self.match.id, self.tickets[0].code)
+        early = timezone.now() - timezone.timedelta(minutes=30)
+        scans = [
+            {'code': self.tickets[0].code},
+            {'code': self.tickets[1].code, 'scanned_at': timezone.now().isoformat()},
+            {'code': self.tickets[1].code, 'scanned_at': early.isoformat()},
+            {'code': self.tickets[2].code.lower()},
+            {'code': self.other_ticket.code},
+            {'code': 'UNKNOWN'},
+        ]
+
+        summary = gate.sync_scans(self.match.id, scans, chunk_size=2)
+
+        self.assertEqual(summary['accepted'], 2)
+        self.assertEqual(summary['already_used'], [self.tickets[0].code])
+        self.assertEqual(summary['wrong_match'], [self.other_ticket.code])
+        self.assertEqual(summary['invalid'], ['UNKNOWN'])
+        self.assertEqual(summary['duplicates'], 1)
+        self.assertEqual(Ticket.objects.get(pk=self.tickets[1].pk).used_at, early)
+
+    def test_manifest_lists_unused_ticket_hashes_sorted(self):
+        gate.scan_ticket(self.match.id, self.tickets[0].code)
+        response = self.client.get(reverse('bookings:gate_manifest', kwargs={'match_id': self.match.id}))
+        manifest = response.json()
+
+        raw = base64.b64decode(manifest['hashes'])
+        digests = [raw[i:i + 8] for i in range(0, len(raw), 8)]
+        self.assertEqual(manifest['count'], 4)
+        self.assertEqual(digests, sorted(gate.code_digest(t.code) for t in self.tickets[1:]))
+
+    def test_tickets_of_unconfirmed_bookings_are_rejected(self):
+        Booking.objects.filter(pk=self.tickets[0].booking_id).update(status='EXPIRED')
+
+        self.assertEqual(gate.scan_ticket(self.match.id, self.tickets[0].code)['result'], gate.INVALID)
+        summary = gate.sync_scans(self.match.id, [{'code': self.tickets[1].code}])
+        self.assertEqual(summary['invalid'], [self.tickets[1].code])
+        self.assertEqual(summary['accepted'], 0)
+        self.assertFalse(Ticket.objects.filter(booking_id=self.tickets[0].booking_id, is_used=True).exists())
+
+    def test_malformed_payloads_return_400_or_per_item_error(self):
+        self.assertEqual(self._post('gate_scan', [self.tickets[0].code]).status_code, 400)
+        self.assertEqual(self._post('gate_scan', {'code': 123}).status_code, 400)
+        self.assertEqual(self._post('gate_sync_scans', [{'code': self.tickets[0].code}]).status_code, 400)
+
+        response = self._post('gate_sync_scans', {'scans': ['oops', None, {'code': self.tickets[0].code}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['malformed'], 2)
+        self.assertEqual(response.json()['accepted'], 1)
+
+    def test_gate_endpoints_require_operator(self):
+        self.client.login(username='fan', password='password123')
+        self.assertEqual(self._post('gate_scan', {'code': self.tickets[0].code}).status_code, 403)
+        self.assertEqual(self._post('gate_sync_scans', {'scans': []}).status_code, 403)
+        self.assertFalse(Ticket.objects.get(pk=self.tickets[0].pk).is_used)
+
+
+class GateScanConcurrencyTestCase(TransactionTestCase):
+    """Scan bersamaan untuk kode yang sama hanya boleh diterima sekali."""
+
+    WORKERS = 8
+
+    def setUp(self):
+        fan = User.objects.create_user(username='racefan', password='password123', email='racefan@example.com')
+        home = Team.objects.create(name='Team R', league='liga_1')
+        away = Team.objects.create(name='Team S', league='liga_1')
+        self.match = Match.objects.create(home_team=home, away_team=away, date=timezone.now() + timezone.timedelta(hours=1))
+        regular = TicketPrice.objects.create(
+            match=self.match, seat_category='REGULAR', price=Decimal('100000.00'), quantity_available=10
+        )
+        booking = Booking.objects.create(user=fan, total_price=Decimal('100000.00'), status='CONFIRMED')
+        BookingItem.objects.create(booking=booking, ticket_type=regular, quantity=1)
+        self.code = issue_tickets(booking)[0].code
+
+    def _scan(self, barrier):
+        try:
+            barrier.wait()
+            return gate.scan_ticket(self.match.id, self.code)['result']
+        finally:
+            connection.close()
+
+    def test_concurrent_double_scan_is_accepted_once(self):
+        barrier = threading.Barrier(self.WORKERS)
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            results = list(pool.map(self._scan, [barrier] * self.WORKERS))
+
+        self.assertEqual(results.count(gate.ACCEPTED), 1)
+        self.assertEqual(results.count(gate.ALREADY_USED), self.WORKERS - 1)
+
+
+class TicketSerializerTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='collector', password='password123', email='collector@example.com')
+        cls.venue = Venue.objects.create(name='Stadium C', city='City C')
+
+    def setUp(self):
+        self.client.login(username='collector', password='password123')
+
+    def _confirmed_tickets(self, index, quantity):
+        home = Team.objects.create(name=f'Home {index}', league='liga_1')
+        away = Team.objects.create(name=f'Away {index}', league='liga_1')
+        match = Match.objects.create(
+            home_team=home, away_team=away, venue=self.venue, date=timezone.now() + timezone.timedelta(days=index + 1)
+        )
+        price = TicketPrice.objects.create(match=match, seat_category='VIP', price=Decimal('1'), quantity_available=quantity)
+        booking = Booking.objects.create(user=self.user, total_price=Decimal('1'), status='CONFIRMED')
+        BookingItem.objects.create(booking=booking, ticket_type=price, quantity=quantity)
+        issue_tickets(booking)
+        return match
+
+    def _list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('bookings:flutter_user_tickets'))
+        return response.json()['tickets'], len(ctx.captured_queries)
+
+    def test_listing_query_count_is_flat(self):
+        match = self._confirmed_tickets(0, 1)
+        tickets, few_queries = self._list()
+        self.assertEqual(tickets[0]['match_title'], 'Home 0 vs Away 0')
+        self.assertEqual(tickets[0]['match_id'], str(match.id))
+        self.assertTrue(tickets[0]['home_team_logo'].endswith(
+            reverse('matches:flutter_team_logo_proxy', args=[match.home_team_id])
+        ))
+        self.assertFalse(tickets[0]['has_reviewed'])
+
+        for index in range(1, 4):
+            self._confirmed_tickets(index, 10)
+        tickets, many_queries = self._list()
+        self.assertEqual(len(tickets), 31)
+        self.assertEqual(many_queries, few_queries)
+
+
+class TicketFeedFixture:
+    """2 tiket untuk match yang sudah lewat dan 5 tiket untuk match mendatang, plus satu booking PENDING."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='seasonfan', password='password123', email='seasonfan@example.com')
+        team1 = Team.objects.create(name='Team M', league='liga_1')
+        team2 = Team.objects.create(name='Team N', league='liga_1')
+        venue = Venue.objects.create(name='Stadium M', city='City M')
+        cls.past_match = Match.objects.create(
+            home_team=team1, away_team=team2, venue=venue, date=timezone.now() - timezone.timedelta(days=3)
+        )
+        cls.next_match = Match.objects.create(
+            home_team=team2, away_team=team1, venue=venue, date=timezone.now() + timezone.timedelta(days=3)
+        )
+        cls.bookings = []
+        for match, quantity in ((cls.past_match, 2), (cls.next_match, 5)):
+            price = TicketPrice.objects.create(match=match, seat_category='REGULAR', price=Decimal('1'), quantity_available=10)
+            booking = Booking.objects.create(user=cls.user, total_price=Decimal('1'), status='CONFIRMED')
+            BookingItem.objects.create(booking=booking, ticket_type=price, quantity=quantity)
+            issue_tickets(booking)
+            cls.bookings.append(booking)
+        # Tiket bulk_create berbagi generated_at yang sama; cursor harus tetap memecah seri via ticket_id
+        Ticket.objects.update(generated_at=timezone.now())
+        cls.bookings.append(Booking.objects.create(user=cls.user, total_price=Decimal('1'), status='PENDING'))
+
+    def setUp(self):
+        self.client.login(username='seasonfan', password='password123')
+
+
+class FeedPaginationTestCase(TicketFeedFixture, TestCase):
+
+    def _walk(self, url, key, **params):
+        seen, cursor, pages = [], None, 0
+        while True:
+            query = dict(params, **({'cursor': cursor} if cursor else {}))
+            data = self.client.get(url, query).json()
+            seen += data[key]
+            pages += 1
+            cursor = data['next_cursor']
+            if not cursor:
+                return seen, pages
+
+    def test_ticket_feed_pages_without_gaps_or_duplicates(self):
+        tickets, pages = self._walk(reverse('bookings:flutter_user_tickets'), 'tickets', limit=3)
+        ids = [t['id'] for t in tickets]
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(set(ids), {str(pk) for pk in Ticket.objects.values_list('ticket_id', flat=True)})
+
+    def test_ticket_feed_status_filters(self):
+        used = Ticket.objects.filter(booking=self.bookings[1]).first()
+        Ticket.objects.filter(pk=used.pk).update(is_used=True)
+        url = reverse('bookings:flutter_user_tickets')
+        counts = {status: len(self._walk(url, 'tickets', status=status)[0]) for status in ('active', 'used', 'expired')}
+        self.assertEqual(counts, {'active': 4, 'used': 1, 'expired': 2})
+        self.assertEqual(self.client.get(url, {'status': 'bogus'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'cursor': 'not-a-cursor'}).status_code, 400)
+
+    def test_ticket_feed_seeks_user_index(self):
+        # SQLite: SEARCH bookings_ticket USING INDEX ticket_user_feed_idx (user_id=?), tanpa TEMP B-TREE untuk ORDER BY
+        if connection.vendor != 'sqlite':
+            self.skipTest('Rencana query khusus SQLite')
+        tickets = Ticket.objects.filter(user=self.user, booking__status='CONFIRMED')
+        plan = ticket_rows(tickets).order_by('-generated_at', '-ticket_id')[:51].explain()
+        self.assertIn('ticket_user_feed_idx (user_id=?)', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertEqual(set(tickets.values_list('user_id', flat=True)), {self.user.pk})
+
+    def test_profile_ticket_feed_is_paginated(self):
+        url = reverse('profiles:user_tickets_json', args=[self.user.id])
+        tickets, pages = self._walk(url, 'tickets', limit=4)
+        self.assertEqual((len(tickets), pages), (7, 2))
+
+    def test_booking_feed(self):
+        url = reverse('bookings:flutter_user_bookings')
+        bookings, pages = self._walk(url, 'bookings', limit=2)
+        self.assertEqual(pages, 2)
+        self.assertEqual(bookings[0]['booking_id'], str(self.bookings[2].booking_id))
+        self.assertEqual(bookings[0]['items'], [])
+        by_id = {b['booking_id']: b for b in bookings}
+        self.assertEqual(by_id[str(self.bookings[1].booking_id)]['items'], [{'seat_category': 'REGULAR', 'quantity': 5}])
+        self.assertEqual(len(self._walk(url, 'bookings', status='pending')[0]), 1)
+
+
+class TicketEffectiveStatusTestCase(TicketFeedFixture, TestCase):
+
+    def test_annotation_matches_property(self):
+        Ticket.objects.filter(pk=Ticket.objects.filter(booking=self.bookings[0]).first().pk).update(is_used=True)
+        annotated = {t.pk: t.effective_status for t in Ticket.objects.with_effective_status()}
+        computed = {t.pk: t.effective_status for t in Ticket.objects.select_related('ticket_type__match')}
+        self.assertEqual(annotated, computed)
+        self.assertEqual(sorted(annotated.values()).count('expired'), 1)
+        self.assertEqual(sorted(annotated.values()).count('used'), 1)
+
+    def test_status_counts_single_query(self):
+        with self.assertNumQueries(1):
+            counts = Ticket.objects.filter(booking__user=self.user).status_counts()
+        self.assertEqual(counts, {'active': 5, 'used': 0, 'expired': 2})
+
+    def test_feed_reports_counts_on_first_page(self):
+        url = reverse('bookings:flutter_user_tickets')
+        first = self.client.get(url, {'limit': 3}).json()
+        self.assertEqual(first['counts'], {'active': 5, 'used': 0, 'expired': 2})
+        for ticket in first['tickets']:
+            self.assertEqual(ticket['effective_status'], 'expired' if ticket['is_match_finished'] else 'active')
+        rest = self.client.get(url, {'limit': 3, 'cursor': first['next_cursor']}).json()
+        self.assertNotIn('counts', rest)
+
+
+class SeatAllocationTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='seatfan', password='password123', email='seatfan@example.com')
+        venue = Venue.objects.create(name='Seated Stadium', city='City S')
+        cls.match = Match.objects.create(
+            home_team=Team.objects.create(name='Team S1', league='liga_1'),
+            away_team=Team.objects.create(name='Team S2', league='liga_1'),
+            venue=venue, date=timezone.now() + timezone.timedelta(days=7),
+        )
+        cls.vip = TicketPrice.objects.create(match=cls.match, seat_category='VIP', price=Decimal('200'), quantity_available=100)
+        cls.regular = TicketPrice.objects.create(match=cls.match, seat_category='REGULAR', price=Decimal('50'), quantity_available=100)
+        # 2 baris x 4 kursi VIP; REGULAR tanpa peta kursi
+        cls.section = SeatSection.objects.create(venue=venue, name='V1', seat_category='VIP', rows=2, seats_per_row=4)
+
+    def test_find_contiguous_respects_row_edges(self):
+        # Baris 1: kursi 0-1 terisi; baris 2 kosong
+        occupied = 0b0000_0011
+        self.assertEqual(seating.find_contiguous(occupied, 2, 4, 2), 2)
+        self.assertEqual(seating.find_contiguous(occupied, 2, 4, 3), 4)
+        self.assertIsNone(seating.find_contiguous(0b0001_0011, 2, 4, 4))
+        self.assertIsNone(seating.find_contiguous(0, 2, 4, 5))
+
+    def test_bookings_get_contiguous_seats_and_tickets_carry_labels(self):
+        first = reserve_tickets(self.user, self.match, {'VIP': 3, 'REGULAR': 2})
+        second = reserve_tickets(self.user, self.match, {'VIP': 2})
+        self.assertEqual(first.items.get(ticket_type=self.vip).seats, [[self.section.pk, i] for i in range(3)])
+        self.assertIsNone(first.items.get(ticket_type=self.regular).seats)
+        # Sisa baris 1 hanya 1 kursi, jadi grup berdua pindah ke baris 2
+        self.assertEqual(second.items.get().seats, [[self.section.pk, 4], [self.section.pk, 5]])
+
+        issue_tickets(first)
+        seats = sorted(filter(None, first.tickets.values_list('seat', flat=True)))
+        self.assertEqual(seats, ['V1-1-1', 'V1-1-2', 'V1-1-3'])
+        self.assertEqual(first.tickets.filter(seat__isnull=True).count(), 2)
+
+    def test_release_frees_seats(self):
+        booking = reserve_tickets(self.user, self.match, {'VIP': 4})
+        self.assertTrue(release_tickets(booking, 'CANCELLED'))
+        self.assertEqual(seating.free_seats(self.match.pk, self.match.venue_id), {'VIP': 8})
+        again = reserve_tickets(self.user, self.match, {'VIP': 4})
+        self.assertEqual(again.items.get().seats, [[self.section.pk, i] for i in range(4)])
+
+    def test_scattered_fallback_then_sold_out_rolls_back(self):
+        reserve_tickets(self.user, self.match, {'VIP': 3})
+        reserve_tickets(self.user, self.match, {'VIP': 3})
+        # Tersisa satu kursi di tiap baris: tidak berdampingan, tetap dialokasikan
+        split = reserve_tickets(self.user, self.match, {'VIP': 2})
+        self.assertEqual(split.items.get().seats, [[self.section.pk, 3], [self.section.pk, 7]])
+
+        with self.assertRaises(InsufficientStock):
+            reserve_tickets(self.user, self.match, {'VIP': 1, 'REGULAR': 1})
+        self.vip.refresh_from_db()
+        self.regular.refresh_from_db()
+        self.assertEqual((self.vip.quantity_available, self.regular.quantity_available), (92, 100))
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(bytes(SeatOccupancy.objects.get().bitmap), bytes([0xFF]))
+
+
+class PromotionPricingTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='promofan', password='password123', email='promofan@example.com')
+        cls.match = Match.objects.create(
+            home_team=Team.objects.create(name='Team P1', league='liga_1'),
+            away_team=Team.objects.create(name='Team P2', league='liga_1'),
+            venue=Venue.objects.create(name='Promo Stadium', city='City P'),
+            date=timezone.now() + timezone.timedelta(days=14),
+        )
+        TicketPrice.objects.create(match=cls.match, seat_category='VIP', price=Decimal('200000'), quantity_available=50)
+        TicketPrice.objects.create(match=cls.match, seat_category='REGULAR', price=Decimal('50000'), quantity_available=50)
+
+    def setUp(self):
+        cache.clear()
+
+    def _promo(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Promotion.objects.create(name=kwargs.pop('name', 'Promo'), **kwargs)
+
+    def test_early_bird_window(self):
+        now = timezone.now()
+        self._promo(kind='PERCENT', value=Decimal('10'), starts_at=now - timezone.timedelta(days=1), ends_at=now + timezone.timedelta(days=1))
+        self._promo(kind='PERCENT', value=Decimal('50'), starts_at=now + timezone.timedelta(days=1))
+        booking = reserve_tickets(self.user, self.match, {'VIP': 1, 'REGULAR': 1})
+        self.assertEqual((booking.discount, booking.total_price), (Decimal('25000'), Decimal('225000')))
+
+    def test_bundle_frees_cheapest_tickets(self):
+        self._promo(kind='BUNDLE', min_quantity=4, free_quantity=1)
+        booking = reserve_tickets(self.user, self.match, {'VIP': 3, 'REGULAR': 2})
+        self.assertEqual(booking.discount, Decimal('50000'))
+        self.assertEqual(reserve_tickets(self.user, self.match, {'VIP': 3}).discount, Decimal('0'))
+
+    def test_promo_codes_and_per_user_limit(self):
+        promo = self._promo(code=' fans10 ', kind='AMOUNT', value=Decimal('10000'), seat_category='REGULAR', per_user_limit=1)
+        self.assertEqual(promo.code, 'FANS10')
+        with self.assertRaisesMessage(InvalidPromoCode, 'Invalid promo code'):
+            reserve_tickets(self.user, self.match, {'REGULAR': 1}, promo_code='NOPE')
+        with self.assertRaisesMessage(InvalidPromoCode, 'not applicable'):
+            reserve_tickets(self.user, self.match, {'VIP': 1}, promo_code='FANS10')
+
+        booking = reserve_tickets(self.user, self.match, {'REGULAR': 2}, promo_code='fans10')
+        self.assertEqual((booking.promotion, booking.discount), (promo, Decimal('20000')))
+        with self.assertRaisesMessage(InvalidPromoCode, 'not applicable'):
+            reserve_tickets(self.user, self.match, {'REGULAR': 2}, promo_code='FANS10')
+        # Limit kembali setelah booking dibatalkan
+        release_tickets(booking, 'CANCELLED')
+        self.assertEqual(reserve_tickets(self.user, self.match, {'REGULAR': 1}, promo_code='FANS10').discount, Decimal('10000'))
+
+    def test_rules_are_cached_and_invalidated(self):
+        for i in range(5):
+            self._promo(name=f'Promo {i}', kind='PERCENT', value=Decimal(i + 1), code=f'CODE{i}')
+        reserve_tickets(self.user, self.match, {'REGULAR': 1})
+        with CaptureQueriesContext(connection) as cached:
+            reserve_tickets(self.user, self.match, {'REGULAR': 1}, promo_code='CODE4')
+        self.assertFalse([q for q in cached.captured_queries if 'bookings_promotion' in q['sql']])
+
+        self._promo(name='Global', kind='PERCENT', value=Decimal('20'))
+        self.assertEqual(reserve_tickets(self.user, self.match, {'REGULAR': 1}).discount, Decimal('10000'))
+
+    def test_create_booking_view_and_midtrans_items(self):
+        self._promo(code='HALF', kind='PERCENT', value=Decimal('50'))
+        self.client.login(username='promofan', password='password123')
+        url = reverse('bookings:create_booking', args=[self.match.id])
+        bad = self.client.post(url, json.dumps({'types': {'VIP': 1}, 'method': 'gopay', 'promo_code': 'X'}), content_type='application/json')
+        self.assertEqual(bad.status_code, 400)
+
+        response = self.client.post(url, json.dumps({'types': {'VIP': 1}, 'method': 'gopay', 'promo_code': 'half'}), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()['total_price'], response.json()['discount']), (100000.0, 100000.0))
+
+        from .views import _item_details
+        booking = Booking.objects.get(booking_id=response.json()['booking_id'])
+        items = _item_details(booking)
+        self.assertEqual(sum(item['price'] * item['quantity'] for item in items), float(booking.total_price))
+        self.assertEqual(items[-1]['name'], 'Promo HALF')
+
+
+class LoadTestCommandTestCase(TransactionTestCase):
+
+    def test_small_run_keeps_stock_invariant(self):
+        out = StringIO()
+        call_command(
+            'loadtest_bookings', users=24, workers=4, stock=15, max_quantity=3,
+            midtrans_latency_ms=0, stdout=out, stderr=StringIO(),
+        )
+        output = out.getvalue()
+        self.assertIn('create_booking', output)
+        self.assertEqual(output.count('OK  '), 3)
+        self.assertIn('errors 0', output)
+        # Data load test dibersihkan setelah selesai
+        self.assertFalse(User.objects.filter(username__startswith='loadtest-').exists())
+        self.assertFalse(Booking.objects.exists())
+
+    def test_refuses_production_without_force(self):
+        with override_settings(PRODUCTION=True):
+            with self.assertRaisesMessage(CommandError, '--force'):
+                call_command('loadtest_bookings', users=1, stdout=StringIO())
+        with patch.dict(connection.settings_dict, {'ENGINE': 'django.db.backends.postgresql', 'NAME': 'ligapass'}):
+            with self.assertRaisesMessage(CommandError, 'ligapass'):
+                call_command('loadtest_bookings', users=1, stdout=StringIO())
+        self.assertFalse(User.objects.filter(username__startswith='loadtest-').exists())
+
+
+class StockLedgerTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='ledgerfan', password='password123', email='ledgerfan@example.com')
+        cls.admin = User.objects.create_user(username='ledgeradmin', password='password123', email='ledgeradmin@example.com', role='admin')
+        cls.match = Match.objects.create(
+            home_team=Team.objects.create(name='Team L1', league='liga_1'),
+            away_team=Team.objects.create(name='Team L2', league='liga_1'),
+            date=timezone.now() + timezone.timedelta(days=5),
+        )
+        cls.vip = TicketPrice.objects.create(match=cls.match, seat_category='VIP', price=Decimal('100'), quantity_available=20)
+
+    def _assert_ledger_matches(self):
+        self.vip.refresh_from_db()
+        with self.assertNumQueries(1):
+            stock = ledger.ledger_stock([self.vip.pk])
+        self.assertEqual(stock, {self.vip.pk: self.vip.quantity_available})
+
+    def test_every_stock_change_is_recorded(self):
+        booking = reserve_tickets(self.user, self.match, {'VIP': 3})
+        other = reserve_tickets(self.user, self.match, {'VIP': 2})
+        self._assert_ledger_matches()
+        release_tickets(booking, 'CANCELLED')
+        Booking.objects.filter(pk=other.pk).update(created_at=timezone.now() - timezone.timedelta(days=1))
+        expire_stale_bookings()
+        self._assert_ledger_matches()
+
+        self.vip.quantity_available = 30
+        self.vip.save()
+        self._assert_ledger_matches()
+
+        movements = list(StockMovement.objects.order_by('pk').values_list('reason', 'delta'))
+        self.assertEqual(movements, [('INITIAL', 20), ('RESERVE', -3), ('RESERVE', -2), ('CANCEL', 3), ('EXPIRE', 2), ('ADJUST', 10)])
+        with self.assertRaises(ValueError):
+            StockMovement.objects.first().save()
+
+    @override_settings(INVENTORY_BACKEND='local')
+    def test_ledger_tracks_logical_stock_with_inventory_tier(self):
+        inventory.reset_store()
+        reserve_tickets(self.user, self.match, {'VIP': 4})
+        self.assertEqual(ledger.ledger_stock([self.vip.pk]), {self.vip.pk: 16})
+        self.assertEqual(ledger.reconcile([self.match.pk])['drift'], [])
+        inventory.flush_pending_stock()
+        self._assert_ledger_matches()
+
+    def test_reconcile_seeds_bulk_created_rows_and_repairs_drift(self):
+        bulk = TicketPrice.objects.bulk_create([
+            TicketPrice(match=self.match, seat_category='REGULAR', price=Decimal('50'), quantity_available=100),
+        ])[0]
+        TicketPrice.objects.filter(pk=self.vip.pk).update(quantity_available=999)
+
+        summary = ledger.reconcile([self.match.pk])
+        self.assertEqual(summary['seeded'], 1)
+        self.assertEqual(summary['drift'], [(self.vip.pk, 20, 999)])
+        self.assertEqual(ledger.ledger_stock([bulk.pk]), {bulk.pk: 100})
+
+        ledger.reconcile([self.match.pk], apply=True)
+        self._assert_ledger_matches()
+        self.assertEqual(self.vip.quantity_available, 20)
+
+    def test_sales_velocity_endpoint(self):
+        booking = reserve_tickets(self.user, self.match, {'VIP': 5})
+        release_tickets(reserve_tickets(self.user, self.match, {'VIP': 2}), 'CANCELLED')
+        url = reverse('bookings:stock_ledger_summary', args=[self.match.pk])
+
+        self.client.login(username='ledgerfan', password='password123')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.login(username='ledgeradmin', password='password123')
+        data = self.client.get(url, {'minutes': 10}).json()
+        self.assertEqual(data['categories'], {'VIP': {'stock': 15, 'sold': 5, 'per_minute': 0.5}})
+        self.assertTrue(booking.stock_movements.exists())
+
+
+@override_settings(INVENTORY_BACKEND='', INVENTORY_SHARDS=4, INVENTORY_SHARD_MIN_QUANTITY=100)
+class StockShardTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='shardfan', password='password123', email='shardfan@example.com')
+        cls.match = Match.objects.create(
+            home_team=Team.objects.create(name='Team S1', league='liga_1'),
+            away_team=Team.objects.create(name='Team S2', league='liga_1'),
+            date=timezone.now() + timezone.timedelta(days=5),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.regular = TicketPrice.objects.create(match=self.match, seat_category='REGULAR', price=Decimal('50'), quantity_available=1000)
+        self.vip = TicketPrice.objects.create(match=self.match, seat_category='VIP', price=Decimal('100'), quantity_available=10)
+
+    def _shards(self):
+        return list(StockShard.objects.filter(ticket_price=self.regular).order_by('shard').values_list('quantity', flat=True))
+
+    def _available(self):
+        tickets = json.loads(availability._build_snapshot(self.match.id)['content'])['tickets']
+        return {ticket['seat_category']: ticket['quantity_available'] for ticket in tickets}
+
+    def test_large_categories_are_sharded_on_create(self):
+        self.assertEqual(self._shards(), [250, 250, 250, 250])
+        self.assertFalse(StockShard.objects.filter(ticket_price=self.vip).exists())
+        self.assertEqual(shards.split(10, 4), [3, 3, 2, 2])
+
+    def test_reservation_takes_from_shard_and_flushes_later(self):
+        booking = reserve_tickets(self.user, self.match, {'REGULAR': 3, 'VIP': 2})
+        self.assertEqual(sum(self._shards()), 997)
+        items = {item.ticket_type_id: item.stock_committed for item in booking.items.all()}
+        self.assertEqual(items, {self.regular.pk: False, self.vip.pk: True})
+
+        self.regular.refresh_from_db()
+        self.assertEqual(self.regular.quantity_available, 1000)
+        self.assertEqual(self._available(), {'REGULAR': 997, 'VIP': 8})
+        self.assertEqual(ledger.reconcile([self.match.pk])['drift'], [])
+
+        self.assertEqual(inventory.flush_pending_stock(), 1)
+        self.regular.refresh_from_db()
+        self.assertEqual(self.regular.quantity_available, 997)
+        self.assertEqual(ledger.reconcile([self.match.pk])['drift'], [])
+
+    def test_reservation_spans_shards_when_no_single_shard_suffices(self):
+        StockShard.objects.filter(ticket_price=self.regular).update(quantity=2)
+        reserve_tickets(self.user, self.match, {'REGULAR': 7})
+        self.assertEqual(sum(self._shards()), 1)
+        with self.assertRaises(InsufficientStock):
+            reserve_tickets(self.user, self.match, {'REGULAR': 2})
+        self.assertEqual(sum(self._shards()), 1)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_release_returns_stock_to_shards(self):
+        flushed = reserve_tickets(self.user, self.match, {'REGULAR': 6})
+        inventory.flush_pending_stock()
+        pending = reserve_tickets(self.user, self.match, {'REGULAR': 4})
+        self.assertEqual(sum(self._shards()), 990)
+
+        release_tickets(pending, 'CANCELLED')
+        release_tickets(flushed, 'CANCELLED')
+        self.regular.refresh_from_db()
+        self.assertEqual(sum(self._shards()), 1000)
+        self.assertEqual(self.regular.quantity_available, 1000)
+        self.assertEqual(ledger.reconcile([self.match.pk])['drift'], [])
+
+    def test_quota_change_and_command_rebalance_shards(self):
+        reserve_tickets(self.user, self.match, {'REGULAR': 10})
+        self.regular.quantity_available = 1210
+        self.regular.save()
+        self.assertEqual(self._shards(), [300, 300, 300, 300])
+
+        out = StringIO()
+        call_command('shard_inventory', '--match', str(self.match.pk), '--shards', '3', stdout=out)
+        self.assertIn('1 TicketPrice dibagi ke 3 shard', out.getvalue())
+        self.assertEqual(self._shards(), [400, 400, 400])
+
+        call_command('shard_inventory', '--shards', '0', stdout=StringIO())
+        self.assertFalse(StockShard.objects.exists())
+        self.regular.refresh_from_db()
+        self.assertEqual(self.regular.quantity_available, 1200)
+        reserve_tickets(self.user, self.match, {'REGULAR': 5})
+        self.regular.refresh_from_db()
+        self.assertEqual(self.regular.quantity_available, 1195)
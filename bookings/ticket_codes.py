@@ -0,0 +1,65 @@
+"""
+Kode tiket bertanda tangan dan render QR.
+
+Kode dibuat sekali saat tiket diterbitkan: HMAC-SHA256(TICKET_CODE_SECRET,
+ticket_id) dalam hex 20 karakter, disimpan terindeks di Ticket.code. Kode
+tidak bisa ditebak tanpa secret dan tidak pernah berubah, sehingga daftar
+tiket cukup membaca kolom tanpa hitung kriptografi.
+
+Gambar QR dirender per batch oleh worker (render_ticket_qr) ke
+MEDIA_ROOT/tickets/qr/<kode>.png. View QR merender on-demand bila worker
+belum sempat.
+"""
+import hashlib
+import hmac
+import os
+from django.conf import settings
+
+CODE_LENGTH = 20
+QR_SUBDIR = os.path.join("tickets", "qr")
+
+
+def make_ticket_code(ticket_id):
+    secret = getattr(settings, "TICKET_CODE_SECRET", None) or settings.SECRET_KEY
+    digest = hmac.new(secret.encode(), str(ticket_id).encode(), hashlib.sha256).hexdigest()
+    return digest[:CODE_LENGTH].upper()
+
+
+def qr_path(code):
+    return os.path.join(settings.MEDIA_ROOT, QR_SUBDIR, f"{code}.png")
+
+
+def render_qr(code):
+    """Tulis PNG QR untuk kode ke disk (idempoten) dan kembalikan path-nya."""
+    import segno
+
+    path = qr_path(code)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        segno.make(code, error='m').save(tmp_path, kind='png', scale=8, border=2)
+        os.replace(tmp_path, path)
+    return path
+
+
+def render_pending_qr(batch_size=None):
+    """
+    Render QR untuk tiket yang belum punya gambar, per batch. Mengembalikan
+    jumlah QR yang dirender.
+    """
+    from bookings.models import Ticket
+
+    batch_size = batch_size or getattr(settings, "TICKET_QR_BATCH_SIZE", 500)
+    rendered = 0
+    while True:
+        rows = list(
+            Ticket.objects.filter(qr_rendered=False, code__isnull=False)
+            .order_by('generated_at')
+            .values_list('pk', 'code')[:batch_size]
+        )
+        if not rows:
+            return rendered
+        for _, code in rows:
+            render_qr(code)
+        Ticket.objects.filter(pk__in=[pk for pk, _ in rows]).update(qr_rendered=True)
+        rendered += len(rows)
@@ -5,6 +5,8 @@ app_name = 'bookings'
 
 urlpatterns = [
     path("<uuid:match_id>/", create_booking, name="create_booking"),
+    path("queue/<uuid:match_id>/join/", queue_join, name="queue_join"),
+    path("queue/<uuid:match_id>/status/", queue_status, name="queue_status"),
     path("payment/<uuid:booking_id>/", payment, name="payment"),
     path("payment/success/<uuid:booking_id>/", payment_success, name="payment_success"),
     path("cancel/<uuid:booking_id>/", cancel_booking, name="cancel_booking"),
@@ -16,6 +18,12 @@ urlpatterns = [
     path("flutter-check-status/<uuid:booking_id>/", flutter_check_status, name="flutter_check_status"),
     path("flutter-ticket-prices/<uuid:match_id>/", flutter_get_ticket_prices, name="flutter_ticket_prices"),
     path('flutter-user-tickets/', flutter_get_user_tickets, name='flutter_user_tickets'),
+    path('flutter-user-bookings/', flutter_get_user_bookings, name='flutter_user_bookings'),
     path('flutter-get-tickets/<uuid:booking_id>/', flutter_get_booking_tickets, name='flutter_get_booking_tickets'),
     path('flutter-sync-status/<uuid:booking_id>/', flutter_sync_status, name='flutter_sync_status'),
+    path('tickets/<str:code>/qr.png', ticket_qr, name='ticket_qr'),
+    path('gate/<uuid:match_id>/scan/', gate_scan, name='gate_scan'),
+    path('gate/<uuid:match_id>/sync/', gate_sync_scans, name='gate_sync_scans'),
+    path('gate/<uuid:match_id>/manifest/', gate_manifest, name='gate_manifest'),
+    path('ledger/<uuid:match_id>/', stock_ledger_summary, name='stock_ledger_summary'),
 ]
\ No newline at end of file
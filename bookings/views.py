@@ -1,104 +1,74 @@
-from django.http import JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.conf import settings
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from bookings.models import *
 from matches.models import *
-import requests, json, base64, uuid
+from bookings import availability, gate, ledger, midtrans, ticket_codes, waiting_room
+from bookings.idempotency import idempotent
+from bookings.pagination import InvalidCursor, keyset_page, page_params
+from bookings.serializers import TicketSerializer, booking_rows, ticket_rows
+from bookings.services import (
+    ReservationError, TicketTypeNotFound, InsufficientStock, reserve_tickets, release_tickets,
+    issue_tickets, enqueue_payment_notification, verify_notification_signature,
+    clear_payment_response, get_payment_response, store_payment_response,
+)
+import requests, json, uuid
 from django.conf import settings
 from django.utils import timezone
 from django.urls import reverse
 
 @login_required
 def flutter_get_ticket_prices(request, match_id):
-    match = get_object_or_404(Match, id=match_id)
-    ticket_prices = TicketPrice.objects.filter(match=match).order_by('price')
-    
-    tickets = []
-    for tp in ticket_prices:
-        tickets.append({
-            'id': tp.id,
-            'match_id': str(tp.match.id),
-            'seat_category': tp.seat_category,
-            'price': float(tp.price),
-            'quantity_available': tp.quantity_available,
-        })
-    
-    return JsonResponse({
-        'status': True,
-        'match': {
-            'id': str(match.id),
-            'title': f"{match.home_team.name} vs {match.away_team.name}",
-        },
-        'tickets': tickets,
-    })
+    """Ketersediaan tiket per match dari snapshot cache; 304 jika ETag klien masih sama."""
+    snapshot = availability.get_snapshot(match_id)
+    if snapshot is None:
+        return JsonResponse({'status': False, 'message': 'Match not found'}, status=404)
+
+    # ETag dan body diambil dari snapshot yang sama agar selalu cocok walau stok berubah di antaranya
+    etag = quote_etag(snapshot['etag'])
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(snapshot['content'], content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
     
 @login_required
+@idempotent
 def create_booking(request, match_id):
     match = get_object_or_404(Match, id=match_id)
 
+    # Pertandingan ramai: pengunjung yang belum mendapat giliran masuk ke waiting room
+    if not waiting_room.is_admitted(request, match_id):
+        if request.method != "GET":
+            return JsonResponse({"error": "Anda masih dalam antrean"}, status=429)
+        return _queue_visitor(request, match)
+
     # GET: tampilkan halaman pemesanan
     if request.method == "GET":
-        ticket_prices = TicketPrice.objects.filter(match=match).order_by('price')
-        return render(request, "create_booking.html", {
-            "match": match,
-            "ticket_prices": ticket_prices,
-        })
+        return _render_create_booking(request, match)
 
     # POST: buat booking baru
     elif request.method == "POST":
         data = json.loads(request.body)
         ticket_types = data.get("types", {})
         method = data.get("method")
-        total_price = 0
-        booking_items = []
+        promo_code = data.get("promo_code")
 
         if not ticket_types:
             return JsonResponse({"error": "No tickets selected"}, status=400)
         if not method:
             return JsonResponse({"error": "Payment method not selected"}, status=400)
 
-        # Hitung total dan validasi stok
-        for seat_category, quantity in ticket_types.items():
-            try:
-                ticket_type = TicketPrice.objects.get(match=match, seat_category=seat_category)
-            except TicketPrice.DoesNotExist:
-                return JsonResponse({"error": f"Ticket type {seat_category} not found"}, status=404)
-
-            quantity = int(quantity)
-            if quantity <= 0:
-                continue
-
-            if ticket_type.quantity_available < quantity:
-                return JsonResponse(
-                    {"error": f"Not enough tickets available for {seat_category}"},
-                    status=400
-                )
-
-            total_price += ticket_type.price * quantity
-            ticket_type.quantity_available -= quantity
-            ticket_type.save()
-            booking_items.append((ticket_type, quantity))
-
-        if not booking_items:
-            return JsonResponse({"error": "No valid tickets selected"}, status=400)
-
-        # Buat booking
-        booking = Booking.objects.create(
-            user=request.user,
-            total_price=total_price,
-            status='PENDING'
-        )
-
-        # Simpan tiap item booking
-        for ticket_type, qty in booking_items:
-            BookingItem.objects.create(
-                booking=booking,
-                ticket_type=ticket_type,
-                quantity=qty
-            )
+        # Validasi dan kurangi stok secara atomik
+        try:
+            booking = reserve_tickets(request.user, match, ticket_types, promo_code=promo_code)
+        except ReservationError as e:
+            return JsonResponse({"error": str(e)}, status=e.status_code)
 
         # Simpan metode pembayaran ke session
         request.session["selected_method"] = method
@@ -107,70 +77,140 @@ def create_booking(request, match_id):
         return JsonResponse({
             "message": "Booking created successfully",
             "booking_id": str(booking.booking_id),
-            "total_price": float(total_price),
+            "total_price": float(booking.total_price),
+            "discount": float(booking.discount),
         }, status=201)
 
     return JsonResponse({"error": "Invalid request method"}, status=405)
 
+def _render_create_booking(request, match):
+    ticket_prices = TicketPrice.objects.filter(match=match).order_by('price')
+    return render(request, "create_booking.html", {
+        "match": match,
+        "ticket_prices": ticket_prices,
+    })
+
+def _queue_visitor(request, match):
+    """Beri nomor antrean bila belum punya, lalu tampilkan waiting room atau halaman pemesanan."""
+    token = waiting_room.get_request_token(request, match.id)
+    position = waiting_room.read_token(token, match.id, request.user.pk)
+    if position is None:
+        token, position = waiting_room.join(match.id, request.user.pk)
+
+    queue = waiting_room.queue_status(match.id, position)
+    if queue["admitted"]:
+        response = _render_create_booking(request, match)
+    else:
+        response = render(request, "waiting_room.html", {"match": match, "queue": queue})
+    response.set_cookie(waiting_room.cookie_name(match.id), token, httponly=True, samesite="Lax")
+    return response
+
+@csrf_exempt
+@login_required
+def queue_join(request, match_id):
+    """Ambil token antrean untuk match (dipakai Flutter lewat header X-Queue-Token)."""
+    if request.method != "POST":
+        return JsonResponse({"status": False, "message": "Invalid method"}, status=405)
+
+    if waiting_room.get_config(match_id) is None:
+        return JsonResponse({"status": True, "token": None, "queue": {"active": False, "admitted": True}})
+
+    token = waiting_room.get_request_token(request, match_id)
+    position = waiting_room.read_token(token, match_id, request.user.pk)
+    if position is None:
+        token, position = waiting_room.join(match_id, request.user.pk)
+
+    response = JsonResponse({
+        "status": True,
+        "token": token,
+        "queue": waiting_room.queue_status(match_id, position),
+    })
+    response.set_cookie(waiting_room.cookie_name(match_id), token, httponly=True, samesite="Lax")
+    return response
+
+def queue_status(request, match_id):
+    """Posisi antrean dari token bertanda tangan + konfigurasi dari cache (tanpa state antrean di DB)."""
+    config = waiting_room.get_config(match_id)
+    if config is None:
+        return JsonResponse({"status": True, "queue": {"active": False, "admitted": True}})
+
+    token = waiting_room.get_request_token(request, match_id) or request.GET.get("token")
+    position = waiting_room.read_token(token, match_id, request.user.pk)
+    if position is None:
+        return JsonResponse({"status": False, "message": "Token antrean tidak valid"}, status=400)
+
+    status = waiting_room.queue_status(match_id, position, config)
+    response = JsonResponse({"status": True, "queue": status})
+    response["Cache-Control"] = f"private, max-age={status['poll_after']}"
+    return response
+
 @csrf_exempt
 @login_required
+@idempotent
 def flutter_create_booking(request, match_id):
     if request.method != "POST":
         return JsonResponse({"status": False, "message": "Invalid method"}, status=405)
 
+    if not waiting_room.is_admitted(request, match_id):
+        position = waiting_room.read_token(
+            waiting_room.get_request_token(request, match_id), match_id, request.user.pk
+        )
+        return JsonResponse({
+            "status": False,
+            "message": "Masih dalam antrean",
+            "queue": waiting_room.queue_status(match_id, position),
+        }, status=429)
+
     body = json.loads(request.body)
     ticket_types = body.get("ticket_types", {})
     method = body.get("payment_method")
+    promo_code = body.get("promo_code")
 
     if not ticket_types:
         return JsonResponse({"status": False, "message": "Empty ticket selection"})
 
     match = get_object_or_404(Match, id=match_id)
 
-    total = 0
-    items = []
-
     # validate & reserve
-    for seat_cat, qty in ticket_types.items():
-        tp = TicketPrice.objects.filter(match=match, seat_category=seat_cat).first()
-        if not tp:
-            return JsonResponse({"status": False, "message": f"{seat_cat} not found"})
-
-        qty = int(qty)
-        if tp.quantity_available < qty:
-            return JsonResponse({"status": False, "message": f"Insufficient {seat_cat}"})
-
-        # Reserve stock
-        tp.quantity_available -= qty
-        tp.save()
-
-        total += float(tp.price) * qty
-        items.append((tp, qty))
-
-    # create booking
-    booking = Booking.objects.create(
-        user=request.user,
-        total_price=total,
-        status="PENDING",
-    )
-
-    for tp, qty in items:
-        BookingItem.objects.create(
-            booking=booking,
-            ticket_type=tp,
-            quantity=qty,
-        )
+    try:
+        booking = reserve_tickets(request.user, match, ticket_types, promo_code=promo_code)
+    except TicketTypeNotFound as e:
+        return JsonResponse({"status": False, "message": f"{e.seat_category} not found"})
+    except InsufficientStock as e:
+        return JsonResponse({"status": False, "message": f"Insufficient {e.seat_category}"})
+    except ReservationError as e:
+        return JsonResponse({"status": False, "message": str(e)})
 
     # Return to Flutter
     return JsonResponse({
         "status": True,
         "booking_id": str(booking.booking_id),
-        "total_price": total,
+        "total_price": float(booking.total_price),
+        "discount": float(booking.discount),
         "payment_method": method,
     })
 
+
+def _item_details(booking):
+    """item_details Midtrans; potongan promo dikirim sebagai item negatif agar jumlahnya sama dengan gross_amount."""
+    items = [{
+        "id": str(item.id),
+        "price": float(item.ticket_type.price),
+        "quantity": item.quantity,
+        "name": f"Ticket {item.ticket_type.seat_category}"
+    } for item in booking.items.select_related('ticket_type')]
+    if booking.discount:
+        items.append({
+            "id": "PROMO",
+            "price": -float(booking.discount),
+            "quantity": 1,
+            "name": f"Promo {booking.promotion.code or booking.promotion.name}" if booking.promotion else "Promo",
+        })
+    return items
+
     
 @login_required
+@idempotent
 def payment(request, booking_id):
     booking = get_object_or_404(Booking, booking_id=booking_id, user=request.user)
 
@@ -191,19 +231,9 @@ def payment(request, booking_id):
         if not method:
             return JsonResponse({"error": "Payment method is required"}, status=400)
 
-        # Setup authorization Midtrans
-        server_key = settings.MIDTRANS_SERVER_KEY
-        auth_str = base64.b64encode(f"{server_key}:".encode()).decode()
-        headers = {
-            "Authorization": f"Basic {auth_str}",
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
-
         # Cek apakah transaksi sebelumnya sudah dibuat
         if booking.midtrans_order_id:
-            payment_responses = request.session.get("payment_responses", {})
-            cached = payment_responses.get(str(booking.booking_id))
+            cached = get_payment_response(booking)
             if cached:
                 return JsonResponse(cached)
             else:
@@ -217,12 +247,7 @@ def payment(request, booking_id):
         order_id = f"book-{method[:3]}-{uuid.uuid4().hex[:8]}"
 
         # Siapkan detail item
-        item_details = [{
-            "id": str(item.id),
-            "price": float(item.ticket_type.price),
-            "quantity": item.quantity,
-            "name": f"Ticket {item.ticket_type.seat_category}"
-        } for item in booking.items.all()]
+        item_details = _item_details(booking)
 
         payload = {
             "transaction_details": {
@@ -236,6 +261,10 @@ def payment(request, booking_id):
                 "phone": getattr(getattr(booking.user, "profile", None), "phone_number", ""),
             },
             "item_details": item_details,
+            "custom_expiry": {
+                "expiry_duration": settings.BOOKING_PAYMENT_TTL_MINUTES,
+                "unit": "minute",
+            },
         }
 
         # Tentukan payment type
@@ -258,23 +287,21 @@ def payment(request, booking_id):
 
         # Kirim request ke Midtrans
         try:
-            res = requests.post("https://api.sandbox.midtrans.com/v2/charge",
-                                headers=headers, json=payload, timeout=20)
+            res = midtrans.get_client().charge(payload)
             mid_data = res.json()
             if res.status_code >= 400:
                 return JsonResponse(mid_data, status=res.status_code)
         except requests.exceptions.RequestException as e:
             return JsonResponse({"error": f"Midtrans request failed: {e}"}, status=500)
 
-        # Cache response di session
-        payment_responses = request.session.get("payment_responses", {})
-        payment_responses[str(booking.booking_id)] = mid_data
-        request.session["payment_responses"] = payment_responses
-        request.session.modified = True
+        # Simpan field halaman pembayaran di Booking (bukan session/cache) agar refresh halaman selalu bisa dilayani
+        store_payment_response(booking, mid_data)
 
         booking.midtrans_order_id = order_id
+        booking.midtrans_actions = mid_data.get("actions", [])
+        booking.charged_at = timezone.now()
         booking.status = mid_data.get("transaction_status", "PENDING").upper()
-        booking.save(update_fields=["midtrans_order_id", "status"])
+        booking.save(update_fields=["midtrans_order_id", "midtrans_actions", "charged_at", "status"])
 
         return JsonResponse(mid_data)
 
@@ -282,6 +309,7 @@ def payment(request, booking_id):
 
 @csrf_exempt
 @login_required
+@idempotent
 def flutter_payment(request, booking_id):
     if request.method != "POST":
         return JsonResponse({"status": False, "message": "Invalid method"}, 405)
@@ -291,14 +319,6 @@ def flutter_payment(request, booking_id):
     method = body.get("method")
     token_id = body.get("token_id")
 
-    server_key = settings.MIDTRANS_SERVER_KEY
-    auth = base64.b64encode(f"{server_key}:".encode()).decode()
-    headers = {
-        "Authorization": f"Basic {auth}",
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-    }
-
     # Prevent duplicate payment
     if booking.midtrans_order_id:
         return JsonResponse({"status": False, "message": "Order already processed"})
@@ -316,15 +336,11 @@ def flutter_payment(request, booking_id):
             "email": booking.user.email,
             "phone": getattr(getattr(booking.user, "profile", None), "phone_number", ""),
         },
-        "item_details": [
-            {
-                "id": item.id,
-                "price": float(item.ticket_type.price),
-                "quantity": item.quantity,
-                "name": f"Ticket {item.ticket_type.seat_category}"
-            }
-            for item in booking.items.all()
-        ],
+        "item_details": _item_details(booking),
+        "custom_expiry": {
+            "expiry_duration": settings.BOOKING_PAYMENT_TTL_MINUTES,
+            "unit": "minute",
+        },
     }
 
     # Payment type
@@ -349,20 +365,20 @@ def flutter_payment(request, booking_id):
     else:
         return JsonResponse({"status": False, "message": "Invalid method"})
 
-    # Midtrans call
+    # Midtrans call; gagal di gateway = 502 agar retry dengan Idempotency-Key yang sama dieksekusi ulang
     try:
-        res = requests.post(
-            "https://api.sandbox.midtrans.com/v2/charge",
-            headers=headers,
-            json=payload,
-        )
+        res = midtrans.get_client().charge(payload)
         mid_data = res.json()
     except:
-        return JsonResponse({"status": False, "message": "Midtrans request failed"})
+        return JsonResponse({"status": False, "message": "Midtrans request failed"}, status=502)
+    if res.status_code >= 500:
+        return JsonResponse({"status": False, "message": "Midtrans request failed", "payment_data": mid_data}, status=502)
 
     # Save booking
+    store_payment_response(booking, mid_data)
     booking.midtrans_order_id = order_id
     booking.midtrans_actions = mid_data.get("actions", [])
+    booking.charged_at = timezone.now()
     booking.status = mid_data.get("transaction_status", "PENDING").upper()
     booking.save()
 
@@ -379,29 +395,17 @@ def cancel_booking(request, booking_id):
     if booking.status == "PENDING":
         if booking.midtrans_order_id:
              try:
-                 cancel_url = f"https://api.sandbox.midtrans.com/v2/{booking.midtrans_order_id}/cancel"
-                 server_key = settings.MIDTRANS_SERVER_KEY
-                 auth_str = base64.b64encode(f"{server_key}:".encode()).decode()
-                 headers = {"Authorization": f"Basic {auth_str}", "Accept": "application/json"}
-                 cancel_res = requests.post(cancel_url, headers=headers)
+                 cancel_res = midtrans.get_client().cancel(booking.midtrans_order_id)
                  if cancel_res.status_code != 200:
                       print(f"Midtrans cancel failed: {cancel_res.text}")
              except Exception as e:
                  print(f"Midtrans cancel request failed: {e}")
 
         # Kembalikan stok
-        for item in booking.items.all():
-            item.ticket_type.quantity_available += item.quantity
-            item.ticket_type.save(update_fields=["quantity_available"])
-
-        booking.status = "CANCELLED"
-        booking.save(update_fields=["status"])
+        release_tickets(booking, "CANCELLED")
 
-        # HAPUS DATA SESSION
-        if "payment_responses" in request.session:
-            if str(booking.booking_id) in request.session["payment_responses"]:
-                del request.session["payment_responses"][str(booking.booking_id)]
-                request.session.modified = True
+        # Hapus response charge yang tersimpan
+        clear_payment_response(booking)
 
         return JsonResponse({"message": "Booking cancelled successfully"})
 
@@ -419,12 +423,8 @@ def flutter_cancel_booking(request, booking_id):
         return JsonResponse({"status": False, "message": "Cannot cancel"})
 
     # restore stock
-    for item in booking.items.all():
-        item.ticket_type.quantity_available += item.quantity
-        item.ticket_type.save()
-
-    booking.status = "CANCELLED"
-    booking.save()
+    release_tickets(booking, "CANCELLED")
+    clear_payment_response(booking)
 
     return JsonResponse({"status": True, "message": "Booking cancelled"})
 
@@ -459,12 +459,7 @@ def manual_confirm_payment(request, booking_id):
         booking.save()
         
         # Create tickets for each booking item
-        for item in booking.items.all():
-            for i in range(item.quantity):
-                Ticket.objects.create(
-                    booking=booking,
-                    ticket_type=item.ticket_type
-                )
+        issue_tickets(booking)
         
         return JsonResponse({
             "status": True, 
@@ -516,47 +511,33 @@ def flutter_check_status(request, booking_id):
     return JsonResponse({
         "status": True,
         "payment_status": booking.status,
+        "midtrans_status": booking.midtrans_status or None,
     })
 
 
 @csrf_exempt
 def midtrans_notification(request):
+    """
+    Webhook Midtrans: verifikasi, simpan ke inbox PaymentNotification, lalu
+    langsung balas 200. Perubahan status booking, pengembalian stok, dan
+    penerbitan tiket dikerjakan worker process_payment_notifications.
+    """
     if request.method != "POST":
         return JsonResponse({'error': 'Invalid method'}, status=405)
 
     try:
         payload = json.loads(request.body)
-        order_id = payload.get("order_id")
-        if not order_id:
-            return JsonResponse({'error': 'Missing order_id'}, status=400)
-
-        transaction_status = payload.get("transaction_status")
-        fraud_status = payload.get("fraud_status")
-
-        booking = Booking.objects.filter(midtrans_order_id=order_id).first()
-        if not booking:
-            return JsonResponse({'message': 'Booking not found'}, status=200)
-
-        new_status = None
-        if transaction_status in ["settlement", "capture"] and fraud_status == "accept":
-            new_status = "CONFIRMED"
-            for item in booking.items.all():
-                for _ in range(item.quantity):
-                    Ticket.objects.create(booking=booking, ticket_type=item.ticket_type)
-        elif transaction_status in ["expire", "cancel", "deny"]:
-            new_status = "EXPIRED" if transaction_status == "expire" else "CANCELLED"
-            for item in booking.items.all():
-                item.ticket_type.quantity_available += item.quantity
-                item.ticket_type.save()
-
-        if new_status:
-            booking.status = new_status
-            booking.updated_at = timezone.now()
-            booking.save(update_fields=["status", "updated_at"])
-
-        return JsonResponse({'message': f'Processed {order_id} with {booking.status}'})
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+    order_id = payload.get("order_id")
+    if not order_id:
+        return JsonResponse({'error': 'Missing order_id'}, status=400)
+    if not verify_notification_signature(payload):
+        return JsonResponse({'error': 'Invalid signature'}, status=403)
+
+    enqueue_payment_notification(payload)
+    return JsonResponse({'message': f'Queued {order_id}'})
 
 @csrf_exempt
 @login_required
@@ -565,73 +546,45 @@ def flutter_get_user_tickets(request):
     if request.method != 'GET':
         return JsonResponse({'status': False, 'message': 'Method not allowed'}, status=405)
     
+    status_filter = request.GET.get('status')
+    if status_filter and status_filter not in Ticket.STATUSES:
+        return JsonResponse({'status': False, 'message': 'Invalid status filter'}, status=400)
+
     try:
         from reviews.models import Review
         
-        # Get all tickets for confirmed bookings of this user
-        tickets = Ticket.objects.filter(
-            booking__user=request.user,
-            booking__status='CONFIRMED'
-        ).select_related(
-            'booking',
-            'ticket_type',
-            'ticket_type__match',
-            'ticket_type__match__home_team',
-            'ticket_type__match__away_team',
-            'ticket_type__match__venue'
-        ).order_by('-generated_at')
-        
-        tickets_data = []
+        # Tiket dari booking CONFIRMED milik user, per halaman (?cursor=&limit=&status=)
+        cursor, limit = page_params(request)
+        serializer = TicketSerializer(request)
+        tickets = Ticket.objects.filter(user=request.user, booking__status='CONFIRMED')
+        rows, next_cursor = keyset_page(
+            ticket_rows(tickets.with_status(status_filter, serializer.now), serializer.now),
+            'generated_at', 'ticket_id', cursor, limit,
+        )
         
         # Cache for has_reviewed per match to avoid duplicate queries
         reviewed_matches = set(
             Review.objects.filter(user=request.user).values_list('match_id', flat=True)
         )
         
-        for ticket in tickets:
-            ticket_type = ticket.ticket_type
-            match = ticket_type.match
-            is_match_finished = match.date < timezone.now()
-            has_reviewed = match.id in reviewed_matches
-            
-            # Build logo URLs using proxy
-            home_logo_url = None
-            away_logo_url = None
-            
-            if match.home_team:
-                home_logo_url = request.build_absolute_uri(
-                    reverse('matches:flutter_team_logo_proxy', args=[match.home_team.id])
-                )
-            if match.away_team:
-                away_logo_url = request.build_absolute_uri(
-                    reverse('matches:flutter_team_logo_proxy', args=[match.away_team.id])
-                )
-            
-            tickets_data.append({
-                'id': str(ticket.ticket_id),
-                'booking_id': str(ticket.booking.booking_id),
-                'match_id': str(match.id),
-                'seat_category': ticket_type.seat_category,
-                'match_title': f"{match.home_team.name if match.home_team else 'TBD'} vs {match.away_team.name if match.away_team else 'TBD'}",
-                'home_team': match.home_team.name if match.home_team else 'TBD',
-                'away_team': match.away_team.name if match.away_team else 'TBD',
-                'home_team_logo': home_logo_url,
-                'away_team_logo': away_logo_url,
-                'match_date': match.date.isoformat(),
-                'venue': match.venue.name if match.venue else None,
-                'city': match.venue.city if match.venue else None,
-                'is_used': ticket.is_used,
-                'is_match_finished': is_match_finished,
-                'has_reviewed': has_reviewed,
-                'generated_at': ticket.generated_at.isoformat() if ticket.generated_at else None,
-                'qr_code': '',
-            })
+        tickets_data = []
+        for row in rows:
+            data = serializer.flutter(row)
+            data['has_reviewed'] = row.match_pk in reviewed_matches
+            tickets_data.append(data)
         
-        return JsonResponse({
+        response = {
             'status': True,
-            'tickets': tickets_data
-        })
+            'tickets': tickets_data,
+            'next_cursor': next_cursor,
+        }
+        # Jumlah per status (untuk badge tab) hanya di halaman pertama
+        if not cursor:
+            response['counts'] = tickets.status_counts(serializer.now)
+        return JsonResponse(response)
         
+    except InvalidCursor as e:
+        return JsonResponse({'status': False, 'message': str(e)}, status=400)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -642,47 +595,9 @@ def flutter_get_user_tickets(request):
 def flutter_get_booking_tickets(request, booking_id):
     if request.method == 'GET':
         try:
-            booking = Booking.objects.get(booking_id=booking_id, user=request.user)
-            tickets = booking.tickets.select_related(
-                'ticket_type',
-                'ticket_type__match',
-                'ticket_type__match__home_team',
-                'ticket_type__match__away_team',
-                'ticket_type__match__venue',
-            ).all()
-            
-            tickets_data = []
-            for ticket in tickets:
-                match = ticket.ticket_type.match
-                
-                # Use same method as matches app
-                home_logo_url = None
-                away_logo_url = None
-                if match.home_team:
-                    home_logo_url = request.build_absolute_uri(
-                        reverse('matches:flutter_team_logo_proxy', args=[match.home_team.id])
-                    )
-                if match.away_team:
-                    away_logo_url = request.build_absolute_uri(
-                        reverse('matches:flutter_team_logo_proxy', args=[match.away_team.id])
-                    )
-                
-                tickets_data.append({
-                    'id': str(ticket.ticket_id),
-                    'booking_id': str(booking.booking_id),
-                    'seat_category': ticket.ticket_type.seat_category,
-                    'match_title': f"{match.home_team.name} vs {match.away_team.name}",
-                    'home_team': match.home_team.name,
-                    'away_team': match.away_team.name,
-                    'home_team_logo': home_logo_url,
-                    'away_team_logo': away_logo_url,
-                    'match_date': match.date.isoformat() if match.date else None,
-                    'venue': match.venue.name if match.venue else None,
-                    'city': match.venue.city if match.venue else None,
-                    'is_used': ticket.is_used,
-                    'generated_at': ticket.generated_at.isoformat(),
-                    'qr_code': '',
-                })
+            booking = Booking.objects.only('booking_id').get(booking_id=booking_id, user=request.user)
+            serializer = TicketSerializer(request)
+            tickets_data = [serializer.flutter(row) for row in ticket_rows(booking.tickets.all())]
             
             return JsonResponse({
                 'status': True,
@@ -694,117 +609,157 @@ def flutter_get_booking_tickets(request, booking_id):
     
     return JsonResponse({'status': False, 'message': 'Method not allowed'}, status=405)
 
+@login_required
+def flutter_get_user_bookings(request):
+    """Riwayat booking user per halaman (?cursor=&limit=&status=PENDING|CONFIRMED|...)."""
+    status_filter = request.GET.get('status')
+    bookings = Booking.objects.filter(user=request.user)
+    if status_filter:
+        bookings = bookings.filter(status=status_filter.upper())
+
+    cursor, limit = page_params(request)
+    try:
+        rows, next_cursor = keyset_page(bookings, 'created_at', 'booking_id', cursor, limit)
+    except InvalidCursor as e:
+        return JsonResponse({'status': False, 'message': str(e)}, status=400)
+
+    return JsonResponse({
+        'status': True,
+        'bookings': booking_rows(rows),
+        'next_cursor': next_cursor,
+    })
+
 @csrf_exempt
 @login_required
 def flutter_sync_status(request, booking_id):
     """
-    Sync payment status from Midtrans API and update Django database.
-    Uses direct HTTP request instead of midtransclient.
+    Status pembayaran terbaru untuk aplikasi Flutter.
+    Status dari Midtrans diterapkan oleh worker (notifikasi + reconcile_payments),
+    jadi endpoint ini hanya membaca DB tanpa memanggil Midtrans.
     """
-    if request.method == 'POST':
-        try:
-            booking = Booking.objects.get(booking_id=booking_id, user=request.user)
-            
-            # If already confirmed, return immediately
-            if booking.status == 'CONFIRMED':
-                return JsonResponse({
-                    'status': True,
-                    'payment_status': 'CONFIRMED',
-                    'message': 'Payment already confirmed'
-                })
-            
-            # Check if we have midtrans_order_id
-            if not booking.midtrans_order_id:
-                return JsonResponse({
-                    'status': False,
-                    'payment_status': booking.status,
-                    'message': 'No Midtrans order ID found for this booking'
-                })
-            
-            # Use the actual order_id stored in booking
-            order_id = booking.midtrans_order_id
-            
-            # Midtrans API endpoint for checking transaction status
-            midtrans_url = f"https://api.sandbox.midtrans.com/v2/{order_id}/status"
-            
-            # Create authorization header
-            server_key = settings.MIDTRANS_SERVER_KEY
-            auth_string = base64.b64encode(f"{server_key}:".encode()).decode()
-            
-            headers = {
-                'Authorization': f'Basic {auth_string}',
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            }
-            
-            # Query Midtrans API
-            response = requests.get(midtrans_url, headers=headers)
-            
-            if response.status_code == 200:
-                data = response.json()
-                transaction_status = data.get('transaction_status', '')
-                fraud_status = data.get('fraud_status', 'accept')
-                
-                # Map Midtrans status to booking status
-                if transaction_status == 'capture':
-                    if fraud_status == 'accept':
-                        if booking.status != 'CONFIRMED':
-                            booking.status = 'CONFIRMED'
-                            booking.save()
-                            # Generate tickets
-                            for item in booking.items.all():
-                                for _ in range(item.quantity):
-                                    Ticket.objects.create(booking=booking, ticket_type=item.ticket_type)
-                                    
-                elif transaction_status == 'settlement':
-                    if booking.status != 'CONFIRMED':
-                        booking.status = 'CONFIRMED'
-                        booking.save()
-                        # Generate tickets
-                        for item in booking.items.all():
-                            for _ in range(item.quantity):
-                                Ticket.objects.create(booking=booking, ticket_type=item.ticket_type)
-                                
-                elif transaction_status in ['cancel', 'deny', 'expire']:
-                    if booking.status not in ['CANCELLED', 'EXPIRED']:
-                        booking.status = 'CANCELLED' if transaction_status != 'expire' else 'EXPIRED'
-                        booking.save()
-                        # Restore stock
-                        for item in booking.items.all():
-                            item.ticket_type.quantity_available += item.quantity
-                            item.ticket_type.save()
-                
-                return JsonResponse({
-                    'status': True,
-                    'payment_status': booking.status,
-                    'midtrans_status': transaction_status,
-                    'message': f'Status synced: {transaction_status}'
-                })
-            
-            elif response.status_code == 404:
-                return JsonResponse({
-                    'status': False,
-                    'payment_status': booking.status,
-                    'message': f'Transaction {order_id} not found in Midtrans'
-                })
-            else:
-                return JsonResponse({
-                    'status': False,
-                    'payment_status': booking.status,
-                    'message': f'Midtrans API error: {response.status_code} - {response.text}'
-                })
-                
-        except Booking.DoesNotExist:
-            return JsonResponse({
-                'status': False,
-                'message': 'Booking not found'
-            }, status=404)
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return JsonResponse({
-                'status': False,
-                'message': f'Error: {str(e)}'
-            }, status=500)
-    
-    return JsonResponse({'status': False, 'message': 'Method not allowed'}, status=405)
\ No newline at end of file
+    if request.method != 'POST':
+        return JsonResponse({'status': False, 'message': 'Method not allowed'}, status=405)
+
+    booking = Booking.objects.filter(booking_id=booking_id, user=request.user).only(
+        'booking_id', 'status', 'midtrans_order_id', 'midtrans_status'
+    ).first()
+    if not booking:
+        return JsonResponse({'status': False, 'message': 'Booking not found'}, status=404)
+
+    if booking.status == 'CONFIRMED':
+        return JsonResponse({
+            'status': True,
+            'payment_status': 'CONFIRMED',
+            'message': 'Payment already confirmed'
+        })
+
+    if not booking.midtrans_order_id:
+        return JsonResponse({
+            'status': False,
+            'payment_status': booking.status,
+            'message': 'No Midtrans order ID found for this booking'
+        })
+
+    midtrans_status = booking.midtrans_status or None
+    return JsonResponse({
+        'status': True,
+        'payment_status': booking.status,
+        'midtrans_status': midtrans_status,
+        'message': f'Status synced: {midtrans_status or "pending"}'
+    })
+
+@login_required
+def ticket_qr(request, code):
+    """Gambar QR tiket milik user; file di disk tidak pernah berubah sehingga bisa di-cache lama."""
+    ticket = Ticket.objects.filter(code=code, booking__user=request.user).only('code').first()
+    if not ticket:
+        return JsonResponse({'status': False, 'message': 'Ticket not found'}, status=404)
+
+    response = FileResponse(open(ticket_codes.render_qr(ticket.code), 'rb'), content_type='image/png')
+    patch_cache_control(response, private=True, max_age=60 * 60 * 24 * 365, immutable=True)
+    return response
+
+
+# --- GATE SCANNING ---
+def _is_gate_operator(user):
+    return user.is_authenticated and user.role == 'admin'
+
+
+@csrf_exempt
+@login_required
+def gate_scan(request, match_id):
+    """Scan satu tiket di gerbang: validasi + tandai terpakai dalam satu UPDATE."""
+    if request.method != 'POST':
+        return JsonResponse({'status': False, 'message': 'Method not allowed'}, status=405)
+    if not _is_gate_operator(request.user):
+        return JsonResponse({'status': False, 'message': 'Forbidden'}, status=403)
+
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'status': False, 'message': 'Invalid JSON'}, status=400)
+    if not isinstance(body, dict):
+        return JsonResponse({'status': False, 'message': 'Body must be a JSON object'}, status=400)
+    code = body.get('code')
+    if code is not None and not isinstance(code, str):
+        return JsonResponse({'status': False, 'message': 'code must be a string'}, status=400)
+
+    scan = gate.scan_ticket(match_id, code)
+    return JsonResponse({
+        'status': scan['result'] == gate.ACCEPTED,
+        'result': scan['result'],
+        'used_at': scan['used_at'].isoformat() if scan['used_at'] else None,
+    })
+
+
+@csrf_exempt
+@login_required
+def gate_sync_scans(request, match_id):
+    """Unggah massal scan dari scanner offline: {"scans": [{"code", "scanned_at"}, ...]}."""
+    if request.method != 'POST':
+        return JsonResponse({'status': False, 'message': 'Method not allowed'}, status=405)
+    if not _is_gate_operator(request.user):
+        return JsonResponse({'status': False, 'message': 'Forbidden'}, status=403)
+
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'status': False, 'message': 'Invalid JSON'}, status=400)
+    if not isinstance(body, dict):
+        return JsonResponse({'status': False, 'message': 'Body must be a JSON object'}, status=400)
+    scans = body.get('scans') or []
+    if not isinstance(scans, list):
+        return JsonResponse({'status': False, 'message': 'scans must be a list'}, status=400)
+    if len(scans) > settings.GATE_SYNC_MAX_SCANS:
+        return JsonResponse({'status': False, 'message': f'Maksimal {settings.GATE_SYNC_MAX_SCANS} scan per request'}, status=413)
+
+    return JsonResponse({'status': True, **gate.sync_scans(match_id, scans)})
+
+
+@login_required
+def gate_manifest(request, match_id):
+    """Manifest hash kode tiket untuk scanner offline."""
+    if not _is_gate_operator(request.user):
+        return JsonResponse({'status': False, 'message': 'Forbidden'}, status=403)
+
+    response = JsonResponse({'status': True, **gate.build_manifest(match_id)})
+    patch_cache_control(response, private=True, no_store=True)
+    return response
+
+
+@login_required
+def stock_ledger_summary(request, match_id):
+    """Dashboard admin: stok dari ledger dan kecepatan penjualan per kategori (?minutes=60)."""
+    if request.user.role != 'admin':
+        return JsonResponse({'status': False, 'message': 'Forbidden'}, status=403)
+    try:
+        minutes = max(1, int(request.GET.get('minutes', 60)))
+    except ValueError:
+        return JsonResponse({'status': False, 'message': 'Invalid minutes'}, status=400)
+
+    return JsonResponse({
+        'status': True,
+        'match_id': str(match_id),
+        'minutes': minutes,
+        'categories': ledger.sales_velocity(match_id, minutes),
+    })
@@ -0,0 +1,114 @@
+"""
+Virtual waiting room untuk pertandingan dengan permintaan tinggi.
+
+Setiap pengunjung mendapat token antrean bertanda tangan berisi nomor
+urutnya dan id user pemiliknya, sehingga token tidak bisa dipakai akun lain.
+Nomor urut diambil dari counter cache.incr di cache bersama (Redis di
+production) agar semua worker berbagi satu antrean. Jumlah pengunjung yang sudah boleh masuk dihitung dari konfigurasi
+WaitingRoom: initial_release + release_rate_per_minute * menit sejak dibuka.
+Jadi cek posisi hanya butuh verifikasi signature dan aritmetika; tidak ada
+state per pengunjung di server, dan konfigurasi dibaca dari cache.
+"""
+import time
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+TOKEN_SALT = "bookings.waiting_room"
+TOKEN_HEADER = "HTTP_X_QUEUE_TOKEN"
+CONFIG_CACHE_TIMEOUT = 30
+
+
+def config_cache_key(match_id):
+    return f"waiting_room:config:{match_id}"
+
+
+def _tail_cache_key(match_id):
+    return f"waiting_room:tail:{match_id}"
+
+
+def cookie_name(match_id):
+    return f"queue_{match_id}"
+
+
+def get_config(match_id):
+    """Konfigurasi antrean aktif untuk match (dict), atau None jika tidak ada antrean."""
+    key = config_cache_key(match_id)
+    config = cache.get(key)
+    if config is None:
+        from bookings.models import WaitingRoom
+
+        room = WaitingRoom.objects.filter(match_id=match_id, is_active=True).first()
+        config = {'active': False}
+        if room:
+            config = {
+                'active': True,
+                'rate': room.release_rate_per_minute,
+                'initial': room.initial_release,
+                'opened_at': room.opened_at.timestamp(),
+            }
+        cache.set(key, config, CONFIG_CACHE_TIMEOUT)
+    return config if config['active'] else None
+
+
+def admitted_count(config, now=None):
+    """Jumlah nomor antrean yang sudah dipersilakan masuk saat ini."""
+    elapsed = max(0.0, (now or time.time()) - config['opened_at'])
+    return config['initial'] + int(config['rate'] * elapsed / 60)
+
+
+def join(match_id, user_pk):
+    """Ambil nomor antrean berikutnya untuk user dan kembalikan (token, posisi)."""
+    key = _tail_cache_key(match_id)
+    cache.add(key, 0, timeout=None)
+    position = cache.incr(key)
+    token = signing.dumps({'m': str(match_id), 'u': str(user_pk), 'p': position}, salt=TOKEN_SALT, compress=True)
+    return token, position
+
+
+def read_token(token, match_id, user_pk):
+    """Posisi di dalam token jika signature valid, belum kadaluarsa, untuk match ini, dan milik user ini."""
+    if not token or user_pk is None:
+        return None
+    try:
+        data = signing.loads(
+            token, salt=TOKEN_SALT, max_age=getattr(settings, "WAITING_ROOM_TOKEN_MAX_AGE", 60 * 60 * 2)
+        )
+    except signing.BadSignature:
+        return None
+    if data.get('m') != str(match_id) or data.get('u') != str(user_pk):
+        return None
+    return data.get('p')
+
+
+def get_request_token(request, match_id):
+    """Token dari header X-Queue-Token (Flutter) atau cookie antrean (web)."""
+    return request.META.get(TOKEN_HEADER) or request.COOKIES.get(cookie_name(match_id))
+
+
+def queue_status(match_id, position, config=None):
+    config = config or get_config(match_id)
+    if config is None:
+        return {'active': False, 'admitted': True}
+
+    admitted = admitted_count(config)
+    ahead = max(0, position - admitted) if position else None
+    status = {
+        'active': True,
+        'position': position,
+        'ahead': ahead,
+        'admitted': position is not None and ahead == 0,
+        'poll_after': getattr(settings, "WAITING_ROOM_POLL_SECONDS", 5),
+    }
+    if ahead:
+        status['eta_seconds'] = int(ahead * 60 / max(config['rate'], 1))
+    return status
+
+
+def is_admitted(request, match_id):
+    """True jika match tidak memakai antrean, atau token request sudah mendapat giliran."""
+    config = get_config(match_id)
+    if config is None:
+        return True
+    position = read_token(get_request_token(request, match_id), match_id, request.user.pk)
+    return position is not None and position <= admitted_count(config)
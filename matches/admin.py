@@ -1,7 +1,8 @@
 # pbp-c-06/ligapass/LigaPass-295f803d1f6f3d40afe67918fcc353e296533dc5/matches/admin.py
 
 from django.contrib import admin
-from .models import Team, Venue, Match, TicketPrice
+from .team_resolver import normalize_key
+from .models import Team, TeamAlias, TeamNameReview, Venue, Match, TicketPrice
 
 # Tampilan inline untuk mengedit harga tiket langsung di halaman Match
 class TicketPriceInline(admin.TabularInline):
@@ -20,5 +21,31 @@ class TeamAdmin(admin.ModelAdmin):
     list_display = ('name', 'api_id')
     search_fields = ('name',)
 
+@admin.register(TeamAlias)
+class TeamAliasAdmin(admin.ModelAdmin):
+    list_display = ('alias', 'team', 'created_at')
+    search_fields = ('alias', 'team__name')
+
+@admin.register(TeamNameReview)
+class TeamNameReviewAdmin(admin.ModelAdmin):
+    list_display = ('name', 'suggestion', 'score', 'resolved', 'last_seen')
+    list_filter = ('resolved',)
+    search_fields = ('name', 'suggestion')
+    actions = ['create_alias_to_suggestion']
+
+    @admin.action(description='Jadikan alias dari tim yang disarankan')
+    def create_alias_to_suggestion(self, request, queryset):
+        teams = Team.objects.in_bulk([review.suggestion for review in queryset], field_name='name')
+        created = 0
+        for review in queryset.filter(resolved=False):
+            team = teams.get(review.suggestion)
+            if team is None:
+                continue
+            TeamAlias.objects.update_or_create(alias=normalize_key(review.name), defaults={'team': team})
+            review.resolved = True
+            review.save(update_fields=['resolved', 'last_seen'])
+            created += 1
+        self.message_user(request, f"{created} alias dibuat.")
+
 # Daftarkan model lainnya
 admin.site.register(Venue)
\ No newline at end of file
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class MatchesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'matches'
+
+    def ready(self):
+        from . import team_resolver
+        from .models import Team, TeamAlias
+        for model in (Team, TeamAlias):
+            post_save.connect(team_resolver.on_team_changed, sender=model)
+            post_delete.connect(team_resolver.on_team_changed, sender=model)
@@ -0,0 +1,95 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from matches import services, team_resolver
+
+
+# Klub yang tidak ada di fixture tetapi namanya mirip klub yang ada; tidak boleh dipetakan otomatis
+UNKNOWN_CLUBS = (
+    'Persikab Bandung', 'Persikota Tangerang', 'Persiba Balikpapan', 'Persim Bandung', 'Persela Lamongan',
+    'Persipura Jayapura', 'Persiraja Banda Aceh', 'PSIS Solo', 'Madura FC', 'Dewa Banten', 'Persijap Jakarta',
+)
+
+
+def _variants(name, rng):
+    """Ejaan lain yang realistis dari satu nama tim: huruf besar/kecil, singkatan, tanpa FC, salah ketik."""
+    variants = [name.lower(), name.upper(), name.replace('United', 'Utd'), name.replace(' FC', '')]
+    if len(name) > 6:
+        i = rng.randrange(1, len(name) - 1)
+        variants.append(name[:i] + name[i + 1:])  # satu huruf hilang
+        j = rng.randrange(1, len(name) - 2)
+        variants.append(name[:j] + name[j + 1] + name[j] + name[j + 2:])  # dua huruf tertukar
+    return variants
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark resolver nama tim: setiap nama tim di pertandingan db_backup.json beserta variasi '
+        'ejaannya di-resolve, lalu dilaporkan waktu per nama dan akurasinya.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=5, help='Jumlah pengulangan pengukuran per nama.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        names = [name for match in services._iter_fixture_matches() for name in (match['home_team'], match['away_team'])]
+        cases = [(name, name) for name in names] + [(variant, name) for name in names for variant in _variants(name, rng)]
+        # expected None: klub tak dikenal harus masuk antrian tinjauan
+        cases += [(name, None) for name in UNKNOWN_CLUBS]
+        self.stdout.write(
+            f"{len(names):,} nama tim dari {services.DB_FIXTURE_PATH.name}, {len(cases):,} kasus termasuk variasi ejaan "
+            f"dan {len(UNKNOWN_CLUBS)} klub tak dikenal"
+        )
+
+        start = time.perf_counter()
+        entries = team_resolver.build_entries()
+        resolver = team_resolver.TeamNameResolver(entries)
+        build_ms = (time.perf_counter() - start) * 1000
+        self.stdout.write(
+            f"-> Indeks: {len(resolver.keys)} kunci, {len(resolver.postings)} trigram, dibangun dalam {build_ms:.1f} ms"
+        )
+
+        # Tanpa memo: setiap panggilan menghitung ulang normalisasi + skor trigram
+        timings = []
+        for raw, _ in cases:
+            best = None
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                resolver._resolve(raw)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append(best)
+        timings.sort()
+
+        for raw, _ in cases:
+            resolver.resolve(raw)
+        start = time.perf_counter()
+        for raw, _ in cases:
+            resolver.resolve(raw)
+        memo_us = (time.perf_counter() - start) / len(cases) * 1e6
+
+        correct = wrong = review = rejected = 0
+        for raw, expected in cases:
+            resolution = resolver.resolve(raw)
+            if expected is None and not resolution.confident:
+                rejected += 1
+            elif not resolution.confident:
+                review += 1
+            elif resolution.name == expected:
+                correct += 1
+            else:
+                wrong += 1
+                self.stdout.write(f"   SALAH: {raw!r} -> {resolution.name!r} (harusnya {expected!r}, skor {resolution.score})")
+
+        self.stdout.write(
+            f"-> Resolve : rata-rata {sum(timings) / len(timings) * 1e6:.1f} µs, "
+            f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f} µs, maks {timings[-1] * 1e6:.1f} µs "
+            f"(dengan memo {memo_us:.2f} µs)"
+        )
+        self.stdout.write(
+            f"-> Akurasi : {correct:,} benar, {wrong:,} salah, {review:,} ke antrian tinjauan "
+            f"({correct / (len(cases) - len(UNKNOWN_CLUBS)):.1%} otomatis benar), "
+            f"{rejected}/{len(UNKNOWN_CLUBS)} klub tak dikenal tidak dipetakan"
+        )
@@ -33,6 +33,32 @@ class Team(models.Model):
     def __str__(self):
         return self.name
 
+class TeamAlias(models.Model):
+    """Ejaan lain nama tim dari sumber data (disimpan sebagai kunci ternormalisasi, lihat team_resolver)."""
+    alias = models.CharField(max_length=100, unique=True)
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='aliases')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def save(self, *args, **kwargs):
+        from .team_resolver import normalize_key
+        self.alias = normalize_key(self.alias)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.alias} -> {self.team}"
+
+class TeamNameReview(models.Model):
+    """Nama tim yang tidak dapat dicocokkan dengan yakin saat sync; menunggu ditinjau admin."""
+    name = models.CharField(max_length=100, unique=True)
+    suggestion = models.CharField(max_length=100, blank=True, default='')
+    score = models.FloatField(default=0)
+    resolved = models.BooleanField(default=False)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} (~{self.suggestion or '-'}, {self.score:.2f})"
+
 class Venue(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
@@ -59,6 +85,10 @@ class Match(models.Model):
     home_goals = models.IntegerField(null=True, blank=True) 
     away_goals = models.IntegerField(null=True, blank=True)
 
+    # Hash data sumber terakhir (lihat services._sync_hash); sync melewati match yang hash-nya sama
+    sync_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    updated_at = models.DateTimeField(auto_now=True, null=True, db_index=True)
+
     def __str__(self):
         return f"{self.home_team} vs {self.away_team} on {self.date.strftime('%Y-%m-%d')}"
     
@@ -2,8 +2,13 @@ import requests
 from django.conf import settings
 from datetime import datetime
 from .models import Team, Venue, Match, TicketPrice
+from . import team_resolver
 from django.utils import timezone
+from django.db import transaction
+import hashlib
+import itertools
 import sys
+import time
 import os
 import json
 from pathlib import Path
@@ -15,6 +20,71 @@ API_CACHE_FILE_PATH = JSON_DIR / 'matches_backup.json'
 # Path untuk file fixture database (data mentah)
 DB_FIXTURE_PATH = JSON_DIR / 'db_backup.json' 
 
+# Ukuran potongan file yang dibaca per langkah oleh parser JSON streaming
+JSON_READ_CHUNK_SIZE = 64 * 1024
+JSON_WHITESPACE = ' \t\r\n'
+
+
+# --- PARSER JSON STREAMING ---
+def _iter_json_array(path, chunk_size=JSON_READ_CHUNK_SIZE):
+    """
+    Yield elemen array JSON top-level satu per satu. File dibaca per potongan
+    chunk_size dan buffer hanya menyimpan sisa yang belum di-parse, sehingga
+    memori tetap datar berapa pun ukuran file.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, pos, eof = '', 0, False
+
+        def fill():
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in JSON_WHITESPACE:
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                fill()
+
+        skip_whitespace()
+        if pos >= len(buffer) or buffer[pos] != '[':
+            raise ValueError(f"{path} bukan array JSON")
+        pos += 1
+
+        while True:
+            skip_whitespace()
+            if pos >= len(buffer):
+                raise ValueError(f"Array JSON di {path} tidak lengkap")
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            truncated = end == len(buffer) or (
+                isinstance(item, (int, float)) and buffer[end] not in JSON_WHITESPACE + ',]'
+            )
+            if truncated and not eof:
+                # Angka di ujung buffer mungkin terpotong (mis. "67." dari "67.5"); baca lagi lalu ulangi
+                fill()
+                continue
+            pos = end
+            yield item
+
+            skip_whitespace()
+            if pos < len(buffer) and buffer[pos] == ',':
+                pos += 1
+            elif pos >= len(buffer) or buffer[pos] != ']':
+                raise ValueError(f"Array JSON di {path} tidak valid di posisi {pos}")
+
+
 # --- LOGIKA JSON (API CACHE) ---
 def _save_to_api_cache(data):
     """Menyimpan data pertandingan yang dinormalisasi ke JSON file (sebagai API cache/fallback)."""
@@ -30,6 +100,30 @@ def _save_to_api_cache(data):
         print(f"-> JSON: Gagal menyimpan data ke JSON cache file: {e}")
         return False
 
+def _stream_to_api_cache(matches):
+    """
+    Teruskan matches sambil menulisnya ke API cache satu per satu. File cache
+    baru menggantikan yang lama hanya bila seluruh data selesai dibaca.
+    """
+    if not JSON_DIR.exists():
+        os.makedirs(JSON_DIR)
+    tmp_path = API_CACHE_FILE_PATH.with_name(API_CACHE_FILE_PATH.name + '.tmp')
+    completed = False
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('[')
+            for index, match in enumerate(matches):
+                f.write(',\n' if index else '\n')
+                f.write(json.dumps(match, ensure_ascii=False, indent=4))
+                yield match
+            f.write('\n]')
+        os.replace(tmp_path, API_CACHE_FILE_PATH)
+        completed = True
+        print(f"-> JSON: Data API berhasil disimpan ke {API_CACHE_FILE_PATH}")
+    finally:
+        if not completed and tmp_path.exists():
+            os.remove(tmp_path)
+
 def _load_from_api_cache():
     """Memuat data pertandingan dari JSON file (fallback jika API gagal)."""
     if not API_CACHE_FILE_PATH.exists():
@@ -37,8 +131,7 @@ def _load_from_api_cache():
         return None
         
     try:
-        with open(API_CACHE_FILE_PATH, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = list(_iter_json_array(API_CACHE_FILE_PATH))
         print(f"-> JSON: Berhasil memuat {len(data)} pertandingan dari API cache.")
         return data
     except Exception as e:
@@ -47,6 +140,49 @@ def _load_from_api_cache():
 
 # --- LOGIKA JSON (DB FIXTURE FALLBACK) ---
 
+def _iter_fixture_matches():
+    """
+    Yield pertandingan ternormalisasi dari db_backup.json secara streaming.
+    Urutan model di fixture tidak dijamin (match bisa muncul sebelum tim/venue),
+    jadi file dibaca dua kali: pass pertama hanya menyimpan nama/api_id tim dan
+    nama/kota venue, pass kedua mentransformasi match satu per satu.
+    """
+    teams = {}
+    venues = {}
+    for item in _iter_json_array(DB_FIXTURE_PATH):
+        fields = item.get('fields', {})
+        if item.get('model') == 'matches.team':
+            teams[item['pk']] = {'name': fields.get('name'), 'api_id': fields.get('api_id')}
+        elif item.get('model') == 'matches.venue':
+            venues[item['pk']] = {'name': fields.get('name', 'Unknown Stadium'), 'city': fields.get('city', 'Unknown City')}
+
+    for item in _iter_json_array(DB_FIXTURE_PATH):
+        if item.get('model') != 'matches.match':
+            continue
+        fields = item['fields']
+
+        home_team_data = teams.get(fields.get('home_team'))
+        away_team_data = teams.get(fields.get('away_team'))
+        venue_data = venues.get(fields.get('venue'))
+
+        # Jika data relasi tidak lengkap di fixture, lewati
+        if not all([home_team_data, away_team_data, venue_data]):
+            print(f"-> JSON: Melewatkan fixture match (PK: {item['pk']}) karena data tim/venue tidak ada di fixture.")
+            continue
+
+        yield {
+            'id': fields['api_id'],
+            'date_str': fields['date'],
+            'home_team': home_team_data['name'],
+            'away_team': away_team_data['name'],
+            'home_goals': fields.get('home_goals'),
+            'away_goals': fields.get('away_goals'),
+            'venue': venue_data['name'],
+            'city': venue_data['city'],
+            'home_team_api_id': home_team_data['api_id'],
+            'away_team_api_id': away_team_data['api_id'],
+        }
+
 def _load_from_fixture_json():
     """Memuat dan mentransformasi data dari file fixture db_backup.json."""
     if not DB_FIXTURE_PATH.exists():
@@ -54,52 +190,8 @@ def _load_from_fixture_json():
         return None
     
     try:
-        with open(DB_FIXTURE_PATH, 'r', encoding='utf-8') as f:
-            fixture_data = json.load(f)
-
         print(f"-> JSON: Membaca file DB fixture ({DB_FIXTURE_PATH.name})...")
-        
-        # Pisahkan data berdasarkan model untuk memetakan relasi
-        teams = {}
-        venues = {}
-        matches_fixture = []
-
-        for item in fixture_data:
-            if item.get('model') == 'matches.team':
-                teams[item['pk']] = item['fields']
-            elif item.get('model') == 'matches.venue':
-                venues[item['pk']] = item['fields']
-            elif item.get('model') == 'matches.match':
-                matches_fixture.append(item)
-
-        # Transformasi data match ke format yang diharapkan
-        normalized_matches = []
-        for match_item in matches_fixture:
-            fields = match_item['fields']
-            
-            home_team_data = teams.get(fields.get('home_team'))
-            away_team_data = teams.get(fields.get('away_team'))
-            venue_data = venues.get(fields.get('venue'))
-
-            # Jika data relasi tidak lengkap di fixture, lewati
-            if not all([home_team_data, away_team_data, venue_data]):
-                print(f"-> JSON: Melewatkan fixture match (PK: {match_item['pk']}) karena data tim/venue tidak ada di fixture.")
-                continue
-
-            normalized_match = {
-                'id': fields['api_id'],
-                'date_str': fields['date'],
-                'home_team': home_team_data['name'],
-                'away_team': away_team_data['name'],
-                'home_goals': fields.get('home_goals'),
-                'away_goals': fields.get('away_goals'),
-                'venue': venue_data.get('name', 'Unknown Stadium'),
-                'city': venue_data.get('city', 'Unknown City'),
-                'home_team_api_id': home_team_data['api_id'],
-                'away_team_api_id': away_team_data['api_id'],
-            }
-            normalized_matches.append(normalized_match)
-        
+        normalized_matches = list(_iter_fixture_matches())
         print(f"-> JSON: Berhasil memuat dan mentransformasi {len(normalized_matches)} pertandingan dari DB fixture.")
         return normalized_matches
 
@@ -107,63 +199,26 @@ def _load_from_fixture_json():
         print(f"-> JSON: Gagal membaca atau mem-parse DB fixture file: {e}")
         return None
 
+def _open_stream(path, factory, label):
+    """
+    Buka generator dari factory() dan ambil elemen pertamanya. Mengembalikan
+    iterator lengkap, atau None bila file tidak ada, kosong, atau rusak di awal.
+    """
+    if not path.exists():
+        print(f"-> JSON: File {label} ({path.name}) tidak ditemukan.")
+        return None
+    stream = factory()
+    try:
+        first = next(stream)
+    except StopIteration:
+        print(f"-> JSON: File {label} ({path.name}) tidak berisi pertandingan.")
+        return None
+    except Exception as e:
+        print(f"-> JSON: Gagal membaca atau mem-parse {label} ({path.name}): {e}")
+        return None
+    print(f"-> JSON: Membaca {label} ({path.name}) secara streaming...")
+    return itertools.chain([first], stream)
 
-# --- PEMETAAN NAMA TIM SECARA HARDCODE ---
-TEAM_NAME_STANDARDIZATION = {
-    # 1
-    "arema": "Arema FC",
-    "arema fc": "Arema FC",
-    # 2
-    "bali united": "Bali United FC",
-    "bali united fc": "Bali United FC",
-    # 3
-    "bhayangkara": "Bhayangkara Presisi Lampung FC",
-    "bhayangkara fc": "Bhayangkara Presisi Lampung FC",
-    "bhayangkara presisi indonesia": "Bhayangkara Presisi Lampung FC",
-    "bhayangkara presisi indonesia fc": "Bhayangkara Presisi Lampung FC",
-    #4
-    "pusamania borneo": "Borneo Samarinda FC",
-    "borneo samarinda": "Borneo Samarinda FC",
-    # 5
-    "dewa united": "Dewa United Banten FC",
-    "dewa united fc": "Dewa United Banten FC",
-    # 6
-    "madura united": "Madura United FC",
-    "persepam madura utd": "Madura United FC",
-    # 7
-    "malut united": "Malut United FC",
-    # 8
-    "persebaya surabaya": "Persebaya Surabaya",
-    # 9
-    "persib bandung": "Persib Bandung",
-    # 10
-    "persija jakarta": "Persija Jakarta",
-    # 11
-    "persijap jepara": "Persijap Jepara",
-    # 12
-    "persik": "Persik Kediri",
-    "persik kediri": "Persik Kediri",
-    # 13
-    "persis solo": "Persis Solo",
-    # 14
-    "persita": "Persita Tangerang",
-    # 15
-    "psbs biak numfor": "PSBS Biak Numfor",
-    # 16
-    "psim yogyakarta": "PSIM Yogyakarta",
-    # 17
-    "psm makassar": "PSM Makassar",
-    # 18
-    "semen padang": "Semen Padang FC",
-    "semen padang fc": "Semen Padang FC",
-    
-    # Tim tidak bermain di liga super 2025
-    "psis semarang": "PSIS Semarang",
-    "pss sleman": "PSS Sleman",
-    "cilegon united": "Cilegon United",
-    "ps tira": "PS TIRA",
-    "barito putera": "PS Barito Putera",
-}
 
 # -------------------------- DEFINISI TIM LIGA 1 --------------------------
 LIGA_1_TEAMS = {
@@ -210,11 +265,10 @@ def _fetch_freeapi_matches(league_id=8983):
         return [] 
 
 def _clean_team_name(name):
-    """Membersihkan dan menstandarkan nama tim."""
+    """Membersihkan dan menstandarkan nama tim lewat alias + indeks fuzzy (lihat team_resolver)."""
     if name is None:
         return None
-    clean_key = name.lower().strip()
-    return TEAM_NAME_STANDARDIZATION.get(clean_key, name.strip().title())
+    return team_resolver.resolve(name).name
 
 def _normalize_match_data(raw_match):
     """Mengubah format data mentah dari API menjadi format yang lebih terstruktur. (normalisasi data)"""
@@ -248,12 +302,15 @@ def _normalize_match_data(raw_match):
         print(f"Error normalizing match data (ID: {raw_match.get('id', 'N/A')}): {e}")
         return None
 
-def _get_sync_data():
+def _get_sync_data(stream=False):
     """
     Mendapatkan data untuk sinkronisasi dengan prioritas sebagai berikut:  
     1. External API
     2. API Cache (matches_backup.json)
     3. DB Fixture (db_backup.json)
+
+    Dengan stream=True, data dari file dikembalikan sebagai iterator yang
+    membaca file sedikit demi sedikit (lihat _iter_json_array).
     """
     
     all_matches = []
@@ -282,59 +339,53 @@ def _get_sync_data():
         print("-> PERINGATAN: Gagal mengambil data dari API. Mencoba JSON Backup (API Cache)...")
 
     # 2 - Fallback ke JSON Backup (API Cache)
-    data_from_json = _load_from_api_cache() # Ini membaca 'matches_backup.json'
+    data_from_json = _open_stream(API_CACHE_FILE_PATH, lambda: _iter_json_array(API_CACHE_FILE_PATH), "API cache")
     if data_from_json:
         print("-> SUMBER DATA: Menggunakan data dari JSON Backup (API Cache).")
-        return data_from_json, "api_cache"
+        return (data_from_json if stream else list(data_from_json)), "api_cache"
 
     # 3 - Fallback ke DB Fixture JSON (db_backup.json)
     print(f"-> STATUS: API Cache ({API_CACHE_FILE_PATH.name}) tidak ditemukan. Mencoba memuat dari DB Fixture ({DB_FIXTURE_PATH.name})...")
-    data_from_fixture = _load_from_fixture_json()
+    data_from_fixture = _open_stream(DB_FIXTURE_PATH, _iter_fixture_matches, "DB fixture")
     
     if data_from_fixture:
         print("-> SUMBER DATA: Menggunakan data dari DB Fixture.")
         # Simpan data yang baru di-load dari fixture ini ke dalam file cache API (matches_backup.json)
         # agar pada run berikutnya, kita tidak perlu mem-parse fixture lagi.
-        _save_to_api_cache(data_from_fixture)
-        return data_from_fixture, "db_fixture"
+        data_from_fixture = _stream_to_api_cache(data_from_fixture)
+        return (data_from_fixture if stream else list(data_from_fixture)), "db_fixture"
     
     # 4 - Final failure
     print("-> ERROR: Gagal mendapatkan data dari semua sumber (API, API Cache, DB Fixture).")
     return [], "error_no_source"
 
-# --- FUNGSI UTAMA SINKRONISASI ---
-def sync_database_with_apis():
-    """Sinkronisasi data Match, Team, Venue dari API (atau JSON fallback) ke database."""
-    print("=========================================")
-    print("Memulai sinkronisasi database...")
-    
-    data_to_sync, source_key = _get_sync_data()
-    
-    if not data_to_sync:
-        print("-> DB: Tidak ada data valid untuk disinkronisasi. Proses DB Write dilewati.")
-        print("=========================================")
-        print("Sinkronisasi database selesai (tidak ada perubahan).")
-        print("=========================================\n")
-        if source_key == "error_no_source":
-            return "Gagal mendapatkan data dari semua sumber (API, Cache, Fixture).", "error"
-        return "Tidak ada data baru untuk disinkronisasi (sumber: " + source_key + ").", source_key
-    
-    print(f"-> DB: Memulai pembaruan/pembuatan {len(data_to_sync)} entri database...")
-    
-    matches_updated_count = 0
-    matches_created_count = 0
-    teams_created_count = 0
-    teams_updated_count = 0
-    venues_created_count = 0
-    venues_updated_count = 0
-
-    # Cache lokal untuk mengurangi query DB di dalam loop
-    team_cache = {team.name: team for team in Team.objects.all()}
-    venue_cache = {venue.name: venue for venue in Venue.objects.all()}
-    
+# --- SINKRONISASI BULK ---
+# Kategori tiket default untuk match baru (kategori, harga, kuota)
+DEFAULT_TICKET_PRICES = (
+    ('VVIP', 500000, 50),
+    ('VIP', 300000, 200),
+    ('REGULAR', 150000, 1000),
+)
+SYNC_BATCH_SIZE = 500
+# Jumlah pertandingan yang dinormalisasi dan di-upsert per potongan saat streaming
+SYNC_CHUNK_SIZE = 1000
+
+
+def _sync_hash(match_data):
+    """SHA-256 dari dict pertandingan ternormalisasi (urutan key tidak berpengaruh)."""
+    payload = json.dumps(match_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _prepare_sync_rows(data_to_sync):
+    """
+    Fase 1: normalisasi seluruh payload di memori.
+    Mengembalikan {api_id: {'fields', 'teams', 'venue', 'sync_hash'}}; data ganda memakai nilai terakhir.
+    """
+    rows = {}
     for match_data in data_to_sync:
         match_id_api = match_data.get('id')
-        
+
         # Validasi data penting sebelum proses
         home_team_name = match_data.get('home_team')
         away_team_name = match_data.get('away_team')
@@ -345,110 +396,265 @@ def sync_database_with_apis():
         if not all([match_id_api, home_team_name, away_team_name, home_team_api_id, away_team_api_id, date_str]):
             print(f"-> DB: SKIPPED Match API ID {match_id_api}: Data tidak lengkap.")
             continue
-        
         try:
-            # --- Proses Venue ---
-            venue_name_final = match_data.get('venue') or 'Unknown Stadium'
-            venue_city_final = match_data.get('city') or 'Unknown City'
-            
-            if venue_name_final in venue_cache:
-                venue = venue_cache[venue_name_final]
-                if venue.city != venue_city_final:
-                    venue.city = venue_city_final
-                    venue.save(update_fields=['city'])
-                    venues_updated_count += 1
-            else:
-                venue, created_venue = Venue.objects.get_or_create(
-                    name=venue_name_final,
-                    defaults={'city': venue_city_final}
-                )
-                if created_venue: venues_created_count += 1
-                venue_cache[venue_name_final] = venue
-
-            # --- Proses Tim Tuan Rumah (Home) ---
-            home_league = 'liga_1' if home_team_name in LIGA_1_TEAMS else 'n/a'
-            if home_team_name in team_cache:
-                home_team = team_cache[home_team_name]
-                if home_team.api_id != home_team_api_id or home_team.league != home_league:
-                    home_team.api_id = home_team_api_id
-                    home_team.league = home_league
-                    home_team.save(update_fields=['api_id', 'league'])
-                    teams_updated_count += 1
-            else:
-                home_team, created_home = Team.objects.update_or_create(
-                    name=home_team_name,
-                    defaults={
-                        'api_id': home_team_api_id,
-                        'logo_url': None, 
-                        'league': home_league, 
-                    }
-                )
-                if created_home: teams_created_count += 1
-                team_cache[home_team_name] = home_team
-
-            # --- Proses Tim Tamu (Away) ---
-            away_league = 'liga_1' if away_team_name in LIGA_1_TEAMS else 'n/a'
-            if away_team_name in team_cache:
-                away_team = team_cache[away_team_name]
-                if away_team.api_id != away_team_api_id or away_team.league != away_league:
-                    away_team.api_id = away_team_api_id
-                    away_team.league = away_league
-                    away_team.save(update_fields=['api_id', 'league'])
-                    teams_updated_count += 1
-            else:
-                away_team, created_away = Team.objects.update_or_create(
-                    name=away_team_name,
-                    defaults={
-                        'api_id': away_team_api_id,
-                        'logo_url': None, 
-                        'league': away_league, 
-                    }
-                )
-                if created_away: teams_created_count += 1
-                team_cache[away_team_name] = away_team
-
-            # --- Proses Pertandingan (Match) ---
             match_datetime_aware = datetime.fromisoformat(date_str)
-            
-            home_goals = match_data.get('home_goals')
-            away_goals = match_data.get('away_goals')
-
-            status_short = "FT" if home_goals is not None and away_goals is not None else "NS"
-            status_long = "Match Finished" if status_short == "FT" else "Not Started"
-
-            match, created = Match.objects.update_or_create(
-                api_id=match_id_api,
-                defaults={
-                    'home_team': home_team, 
-                    'away_team': away_team, 
-                    'venue': venue, 
-                    'date': match_datetime_aware, # Gunakan datetime object yang aware
-                    'status_short': status_short,
-                    'status_long': status_long,
-                    'home_goals': home_goals, 
-                    'away_goals': away_goals,
-                }
-            )
-            
-            if created:
-                matches_created_count += 1
-                # Gunakan bulk_create untuk efisiensi
-                TicketPrice.objects.bulk_create([
-                    TicketPrice(match=match, seat_category='VVIP', price=500000, quantity_available=50),
-                    TicketPrice(match=match, seat_category='VIP', price=300000, quantity_available=200),
-                    TicketPrice(match=match, seat_category='REGULAR', price=150000, quantity_available=1000),
-                ], ignore_conflicts=True)
-            else:
-                matches_updated_count += 1
-
-        except Exception as e:
+        except (TypeError, ValueError) as e:
             print(f"!!! DB: Gagal memproses Match API ID {match_id_api} ({home_team_name} vs {away_team_name}): {e}")
             continue
 
-    print(f"-> DB: Total Pertandingan Diproses: {len(data_to_sync)}")
-    print(f"-> DB: Match Baru: {matches_created_count}, Match Diperbarui: {matches_updated_count}")
-    print(f"-> DB: Tim Baru: {teams_created_count}, Tim Diperbarui: {teams_updated_count}")
-    print(f"-> DB: Venue Baru: {venues_created_count}, Venue Diperbarui: {venues_updated_count}")
+        venue_name_final = match_data.get('venue') or 'Unknown Stadium'
+        home_goals = match_data.get('home_goals')
+        away_goals = match_data.get('away_goals')
+        status_short = "FT" if home_goals is not None and away_goals is not None else "NS"
+        rows[match_id_api] = {
+            'fields': {
+                'home_team': home_team_name,
+                'away_team': away_team_name,
+                'venue': venue_name_final,
+                'date': match_datetime_aware,
+                'status_short': status_short,
+                'status_long': "Match Finished" if status_short == "FT" else "Not Started",
+                'home_goals': home_goals,
+                'away_goals': away_goals,
+            },
+            'teams': tuple(
+                (name, api_id, 'liga_1' if name in LIGA_1_TEAMS else 'n/a')
+                for name, api_id in ((home_team_name, home_team_api_id), (away_team_name, away_team_api_id))
+            ),
+            'venue': (venue_name_final, match_data.get('city') or 'Unknown City'),
+            'sync_hash': _sync_hash(match_data),
+        }
+    return rows
+
+
+def _changed_rows(rows):
+    """Buang match yang hash-nya sama dengan hash tersimpan (satu query)."""
+    stored = dict(Match.objects.filter(api_id__in=list(rows)).values_list('api_id', 'sync_hash'))
+    return {api_id: row for api_id, row in rows.items() if stored.get(api_id) != row['sync_hash']}
+
+
+def _upsert_teams_and_venues(rows, counts):
+    """
+    Fase 2: upsert Team (INSERT ... ON CONFLICT (name) DO UPDATE) dan Venue
+    (nama venue tidak unik: INSERT yang baru + bulk_update kota yang berubah)
+    yang dipakai oleh rows. Mengembalikan ({nama tim: id}, {nama venue: id}).
+    """
+    teams, venues = {}, {}
+    for row in rows.values():
+        for name, api_id, league in row['teams']:
+            teams[name] = (api_id, league)
+        name, city = row['venue']
+        venues[name] = city
+
+    existing_teams = {
+        name: (api_id, league)
+        for name, api_id, league in Team.objects.filter(name__in=list(teams)).values_list('name', 'api_id', 'league')
+    }
+    changed_teams = [
+        Team(name=name, api_id=api_id, logo_url=None, league=league)
+        for name, (api_id, league) in teams.items()
+        if existing_teams.get(name) != (api_id, league)
+    ]
+    Team.objects.bulk_create(
+        changed_teams, batch_size=SYNC_BATCH_SIZE,
+        update_conflicts=True, unique_fields=['name'], update_fields=['api_id', 'league'],
+    )
+    counts['teams_created'] = sum(1 for team in changed_teams if team.name not in existing_teams)
+    counts['teams_updated'] = len(changed_teams) - counts['teams_created']
+    # PK UUID dibuat di Python, jadi PK baris yang konflik harus dibaca ulang dari DB
+    team_ids = dict(Team.objects.filter(name__in=list(teams)).values_list('name', 'id'))
+
+    existing_venues = {venue.name: venue for venue in Venue.objects.filter(name__in=list(venues))}
+    new_venues = [Venue(name=name, city=city) for name, city in venues.items() if name not in existing_venues]
+    changed_venues = []
+    for name, venue in existing_venues.items():
+        if venue.city != venues[name]:
+            venue.city = venues[name]
+            changed_venues.append(venue)
+    Venue.objects.bulk_create(new_venues, batch_size=SYNC_BATCH_SIZE)
+    Venue.objects.bulk_update(changed_venues, ['city'], batch_size=SYNC_BATCH_SIZE)
+    counts['venues_created'] = len(new_venues)
+    counts['venues_updated'] = len(changed_venues)
+    venue_ids = {venue.name: venue.id for venue in [*existing_venues.values(), *new_venues]}
+    return team_ids, venue_ids
+
+
+def _upsert_matches(rows, team_ids, venue_ids, counts):
+    """
+    Fase 3: upsert Match (INSERT ... ON CONFLICT (api_id) DO UPDATE) lalu buat
+    TicketPrice default untuk match baru dalam satu batch.
+    """
+    existing = set(Match.objects.filter(api_id__in=list(rows)).values_list('api_id', flat=True))
+    Match.objects.bulk_create(
+        [
+            Match(
+                api_id=api_id,
+                home_team_id=team_ids[row['fields']['home_team']],
+                away_team_id=team_ids[row['fields']['away_team']],
+                venue_id=venue_ids[row['fields']['venue']],
+                date=row['fields']['date'],
+                status_short=row['fields']['status_short'],
+                status_long=row['fields']['status_long'],
+                home_goals=row['fields']['home_goals'],
+                away_goals=row['fields']['away_goals'],
+                sync_hash=row['sync_hash'],
+            )
+            for api_id, row in rows.items()
+        ],
+        batch_size=SYNC_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['api_id'],
+        update_fields=[
+            'home_team', 'away_team', 'venue', 'date', 'status_short', 'status_long', 'home_goals', 'away_goals',
+            'sync_hash', 'updated_at',
+        ],
+    )
+    created = [api_id for api_id in rows if api_id not in existing]
+    counts['matches_created'] = len(created)
+    counts['matches_updated'] = len(rows) - len(created)
+
+    new_match_ids = list(Match.objects.filter(api_id__in=created).values_list('id', flat=True))
+    TicketPrice.objects.bulk_create(
+        [
+            TicketPrice(match_id=match_id, seat_category=seat_category, price=price, quantity_available=quantity)
+            for match_id in new_match_ids
+            for seat_category, price, quantity in DEFAULT_TICKET_PRICES
+        ],
+        batch_size=SYNC_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    if new_match_ids:
+        _init_ticket_stock(new_match_ids)
+
+
+def _init_ticket_stock(match_ids):
+    """
+    bulk_create tidak mengirim post_save, jadi pekerjaan signal TicketPrice
+    (lihat bookings/apps.py) dijalankan sekaligus untuk match baru: INITIAL di
+    ledger, shard untuk kategori besar, counter tier inventori, dan snapshot
+    ketersediaan.
+    """
+    from bookings import availability, inventory, ledger, shards
+
+    ledger.reconcile(match_ids)
+    if inventory.is_enabled():
+        ticket_price_ids = list(TicketPrice.objects.filter(match_id__in=match_ids).values_list('pk', flat=True))
+        transaction.on_commit(lambda: inventory.refresh_counters(ticket_price_ids))
+    elif shards.is_enabled():
+        minimum = getattr(settings, "INVENTORY_SHARD_MIN_QUANTITY", 500)
+        shards.rebalance(
+            TicketPrice.objects.filter(match_id__in=match_ids, quantity_available__gte=minimum)
+            .values_list('pk', flat=True)
+        )
+    availability.invalidate(match_ids)
+
+
+def bulk_sync(data_to_sync, force=False):
+    """
+    Tulis data pertandingan ternormalisasi ke DB dengan query bulk dalam satu
+    transaksi (jumlah query tidak bergantung pada jumlah pertandingan).
+    Match yang hash sumbernya tidak berubah dilewati (beserta tim/venuenya)
+    kecuali force=True. Mengembalikan dict jumlah baris baru/diperbarui/
+    dilewati dan durasi tiap fase (ms).
+    """
+    counts = {}
+    timings = {}
+
+    start = time.perf_counter()
+    rows = _prepare_sync_rows(data_to_sync)
+    changed = rows if force else _changed_rows(rows)
+    timings['normalize'] = (time.perf_counter() - start) * 1000
+
+    with transaction.atomic():
+        start = time.perf_counter()
+        team_ids, venue_ids = _upsert_teams_and_venues(changed, counts)
+        timings['teams_venues'] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        _upsert_matches(changed, team_ids, venue_ids, counts)
+        timings['matches'] = (time.perf_counter() - start) * 1000
+
+    if counts['teams_created']:
+        # Tim baru ikut menjadi kunci exact di indeks resolver
+        team_resolver.invalidate()
+
+    counts['received'] = len(data_to_sync)
+    counts['matches'] = len(rows)
+    counts['matches_skipped'] = len(rows) - len(changed)
+    counts['timings'] = timings
+    return counts
+
+
+def bulk_sync_stream(matches, chunk_size=None, force=False):
+    """
+    Jalankan bulk_sync() per potongan chunk_size pertandingan dari iterable
+    (mis. generator _iter_json_array) dalam satu transaksi, sehingga memori
+    hanya menampung satu potongan. Waktu membaca/parse sumber dicatat sebagai
+    fase 'load'. Mengembalikan total counts semua potongan.
+    """
+    chunk_size = chunk_size or SYNC_CHUNK_SIZE
+    iterator = iter(matches)
+    totals = {'chunks': 0, 'timings': {'load': 0.0}}
+    with transaction.atomic():
+        while True:
+            start = time.perf_counter()
+            chunk = list(itertools.islice(iterator, chunk_size))
+            totals['timings']['load'] += (time.perf_counter() - start) * 1000
+            if not chunk:
+                return totals
+            result = bulk_sync(chunk, force=force)
+            totals['chunks'] += 1
+            for key, value in result.pop('timings').items():
+                totals['timings'][key] = totals['timings'].get(key, 0.0) + value
+            for key, value in result.items():
+                totals[key] = totals.get(key, 0) + value
+
+
+# --- FUNGSI UTAMA SINKRONISASI ---
+def sync_database_with_apis():
+    """Sinkronisasi data Match, Team, Venue dari API (atau JSON fallback) ke database."""
+    print("=========================================")
+    print("Memulai sinkronisasi database...")
+    
+    data_to_sync, source_key = _get_sync_data(stream=True)
+    
+    if not data_to_sync:
+        print("-> DB: Tidak ada data valid untuk disinkronisasi. Proses DB Write dilewati.")
+        print("=========================================")
+        print("Sinkronisasi database selesai (tidak ada perubahan).")
+        print("=========================================\n")
+        if source_key == "error_no_source":
+            return "Gagal mendapatkan data dari semua sumber (API, Cache, Fixture).", "error"
+        return "Tidak ada data baru untuk disinkronisasi (sumber: " + source_key + ").", source_key
+    
+    print(f"-> DB: Memulai pembaruan/pembuatan entri database (per {SYNC_CHUNK_SIZE} pertandingan)...")
+
+    try:
+        result = bulk_sync_stream(data_to_sync)
+    except Exception as e:
+        # Satu transaksi: bila gagal, tidak ada perubahan yang tersimpan
+        print(f"!!! DB: Sinkronisasi bulk gagal dan dibatalkan: {e}")
+        print("=========================================\n")
+        return f"Sinkronisasi database gagal: {e}", "error"
+
+    queued = team_resolver.flush_review_queue()
+    timings = result['timings']
+    print(
+        f"-> DB: Total Pertandingan Diproses: {result.get('received', 0)} "
+        f"({result.get('matches', 0)} valid, {result['chunks']} potongan)"
+    )
+    print(
+        f"-> DB: Match Baru: {result.get('matches_created', 0)}, Match Diperbarui: {result.get('matches_updated', 0)}, "
+        f"Match Tidak Berubah (dilewati): {result.get('matches_skipped', 0)}"
+    )
+    print(f"-> DB: Tim Baru: {result.get('teams_created', 0)}, Tim Diperbarui: {result.get('teams_updated', 0)}")
+    print(f"-> DB: Venue Baru: {result.get('venues_created', 0)}, Venue Diperbarui: {result.get('venues_updated', 0)}")
+    if queued:
+        print(f"-> DB: {queued} nama tim tidak dikenali dengan yakin, masuk antrian tinjauan admin.")
+    print(
+        f"-> DB: Waktu per fase: baca sumber {timings['load']:.1f} ms, normalisasi {timings.get('normalize', 0):.1f} ms, "
+        f"tim & venue {timings.get('teams_venues', 0):.1f} ms, match & tiket {timings.get('matches', 0):.1f} ms"
+    )
     print("=========================================")
     print("Sinkronisasi database selesai.")
     print("=========================================\n")
@@ -462,4 +668,4 @@ def sync_database_with_apis():
     else:
         message = "Sinkronisasi selesai."
 
-    return message, source_key
\ No newline at end of file
+    return message, source_key
@@ -0,0 +1,301 @@
+"""
+Resolver nama tim dari sumber data (API / fixture) ke nama Team yang baku.
+
+Nama dinormalisasi menjadi kunci (huruf kecil tanpa aksen/tanda baca,
+"utd" -> "united", token "fc"/"sc" dibuang), lalu dicocokkan dengan:
+
+1. Tabel alias: TeamAlias (keputusan admin), SEED_ALIASES, dan nama Team
+   yang sudah ada. Kunci yang sama persis langsung dipakai (skor 1.0).
+2. Indeks trigram karakter untuk ejaan lain: kandidat diambil dari posting
+   list trigram, lalu diberi skor koefisien Dice (trigram, atau bigram tanpa
+   spasi untuk huruf tertukar/spasi bergeser). Kandidat terbaik dipakai
+   bila skornya >= TEAM_RESOLVER_MIN_SCORE, tidak bersaing ketat dengan
+   tim lain, dan setiap token cocok dengan token alias kandidat (sama persis,
+   atau satu salah ketik untuk token panjang). Skor Dice saja tidak cukup:
+   "Persikab Bandung" dan "Persib Bandung" adalah klub berbeda.
+
+Nama yang tidak yakin tetap dipakai apa adanya (perilaku lama) dan dicatat
+di antrian TeamNameReview lewat flush_review_queue() untuk ditinjau admin.
+
+Indeks dibangun sekali per proses dan dibangun ulang bila generation di
+cache berubah (TeamAlias/Team diubah), dicek paling sering tiap
+REFRESH_INTERVAL detik agar resolve() tetap dalam orde mikrodetik.
+"""
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+
+GENERATION_KEY = "matches:team_resolver:generation"
+REFRESH_INTERVAL = 30
+# Selisih skor minimal antara tim terbaik dan tim kedua agar dianggap yakin
+AMBIGUITY_MARGIN = 0.05
+MEMO_SIZE = 10000
+# Skor bigram hanya dipakai untuk nama cukup panjang; nama pendek ("Persis" vs "Persik") terlalu mudah tertukar
+MIN_BIGRAM_LENGTH = 8
+# Token yang lebih pendek harus sama persis ("Persib" vs "Persim" bisa jadi klub lain)
+MIN_TYPO_LENGTH = 7
+
+TOKEN_SYNONYMS = {'utd': 'united'}
+NOISE_TOKENS = {'fc', 'sc', 'cf', 'club'}
+
+Resolution = namedtuple('Resolution', 'name score suggestion confident')
+
+# --- PEMETAAN NAMA TIM SECARA HARDCODE ---
+# Alias awal; alias tambahan dikelola lewat tabel TeamAlias di admin
+SEED_ALIASES = {
+    # 1
+    "arema": "Arema FC",
+    "arema fc": "Arema FC",
+    # 2
+    "bali united": "Bali United FC",
+    "bali united fc": "Bali United FC",
+    # 3
+    "bhayangkara": "Bhayangkara Presisi Lampung FC",
+    "bhayangkara fc": "Bhayangkara Presisi Lampung FC",
+    "bhayangkara presisi indonesia": "Bhayangkara Presisi Lampung FC",
+    "bhayangkara presisi indonesia fc": "Bhayangkara Presisi Lampung FC",
+    #4
+    "pusamania borneo": "Borneo Samarinda FC",
+    "borneo samarinda": "Borneo Samarinda FC",
+    # 5
+    "dewa united": "Dewa United Banten FC",
+    "dewa united fc": "Dewa United Banten FC",
+    # 6
+    "madura united": "Madura United FC",
+    "persepam madura utd": "Madura United FC",
+    # 7
+    "malut united": "Malut United FC",
+    # 8
+    "persebaya surabaya": "Persebaya Surabaya",
+    # 9
+    "persib bandung": "Persib Bandung",
+    # 10
+    "persija jakarta": "Persija Jakarta",
+    # 11
+    "persijap jepara": "Persijap Jepara",
+    # 12
+    "persik": "Persik Kediri",
+    "persik kediri": "Persik Kediri",
+    # 13
+    "persis solo": "Persis Solo",
+    # 14
+    "persita": "Persita Tangerang",
+    # 15
+    "psbs biak numfor": "PSBS Biak Numfor",
+    # 16
+    "psim yogyakarta": "PSIM Yogyakarta",
+    # 17
+    "psm makassar": "PSM Makassar",
+    # 18
+    "semen padang": "Semen Padang FC",
+    "semen padang fc": "Semen Padang FC",
+    
+    # Tim tidak bermain di liga super 2025
+    "psis semarang": "PSIS Semarang",
+    "pss sleman": "PSS Sleman",
+    "cilegon united": "Cilegon United",
+    "ps tira": "PS TIRA",
+    "barito putera": "PS Barito Putera",
+}
+
+_resolver = None
+_resolver_generation = None
+_checked_at = 0.0
+_resolver_lock = threading.Lock()
+_review_queue = {}
+_review_lock = threading.Lock()
+
+
+# --- NORMALISASI ---
+def normalize_key(name):
+    text = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode().lower()
+    text = text.replace('.', '')  # "F.C." -> "fc"
+    tokens = (TOKEN_SYNONYMS.get(token, token) for token in re.findall(r'[a-z0-9]+', text))
+    return ' '.join(token for token in tokens if token not in NOISE_TOKENS)
+
+
+def _grams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _bigrams(key):
+    """Bigram tanpa spasi: toleran terhadap huruf tertukar dan spasi yang bergeser ("AremaF C")."""
+    compact = key.replace(' ', '')
+    return {compact[i:i + 2] for i in range(len(compact) - 1)}
+
+
+def _dice(a, b):
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+def _within_one_edit(a, b):
+    """True bila a dan b berbeda paling banyak satu huruf: hapus, sisip, ganti, atau dua huruf bersebelahan tertukar."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2] and a[i + 2:] == b[i + 2:])
+    shorter, longer = sorted((a, b), key=len)
+    # Huruf tambahan di akhir token biasanya nama klub lain ("Persija" vs "Persijap"), bukan salah ketik
+    return i < len(shorter) and shorter[i:] == longer[i + 1:]
+
+
+def _tokens_match(key, candidate):
+    """
+    Setiap token key cocok berurutan dengan token candidate (sama persis, atau
+    satu salah ketik untuk token panjang). Hurufnya sama persis tetapi spasinya
+    bergeser ("PSIMYogyakarta") juga dianggap cocok.
+    """
+    if key.replace(' ', '') == candidate.replace(' ', ''):
+        return True
+    tokens, others = key.split(), candidate.split()
+    return len(tokens) == len(others) and all(
+        token == other or (max(len(token), len(other)) >= MIN_TYPO_LENGTH and _within_one_edit(token, other))
+        for token, other in zip(tokens, others)
+    )
+
+
+# --- INDEKS ---
+class TeamNameResolver:
+    """Indeks alias + trigram di memori. entries = [(alias, nama baku), ...]; alias pertama yang menang."""
+
+    def __init__(self, entries, min_score=None):
+        self.min_score = getattr(settings, "TEAM_RESOLVER_MIN_SCORE", 0.8) if min_score is None else min_score
+        self.exact = {}
+        for alias, canonical in entries:
+            key = normalize_key(alias)
+            if key:
+                self.exact.setdefault(key, canonical)
+
+        self.keys = list(self.exact)
+        self.sizes = []
+        self.bigrams = []
+        self.postings = {}
+        for index, key in enumerate(self.keys):
+            grams = _grams(key)
+            self.sizes.append(len(grams))
+            self.bigrams.append(_bigrams(key))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(index)
+        self._memo = {}
+
+    def resolve(self, name):
+        resolution = self._memo.get(name)
+        if resolution is None:
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            resolution = self._memo[name] = self._resolve(name)
+        return resolution
+
+    def _resolve(self, name):
+        fallback = name.strip().title()
+        key = normalize_key(name)
+        if not key:
+            return Resolution(fallback, 0.0, '', False)
+        canonical = self.exact.get(key)
+        if canonical is not None:
+            return Resolution(canonical, 1.0, canonical, True)
+
+        grams = _grams(key)
+        shared = {}
+        for gram in grams:
+            for index in self.postings.get(gram, ()):
+                shared[index] = shared.get(index, 0) + 1
+        # Skor terbaik per tim baku (satu tim bisa punya banyak alias): Dice trigram atau bigram tanpa spasi
+        bigrams = _bigrams(key) if len(key.replace(' ', '')) >= MIN_BIGRAM_LENGTH else set()
+        scores = {}
+        for index, count in shared.items():
+            score = max(2 * count / (len(grams) + self.sizes[index]), _dice(bigrams, self.bigrams[index]))
+            canonical = self.exact[self.keys[index]]
+            if score > scores.get(canonical, 0):
+                scores[canonical] = score
+        if not scores:
+            return Resolution(fallback, 0.0, '', False)
+
+        ranked = heapq.nlargest(2, scores.items(), key=lambda pair: pair[1])
+        best, score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        score = round(score, 3)
+        if score >= self.min_score and score - runner_up >= AMBIGUITY_MARGIN and any(
+            _tokens_match(key, self.keys[index]) for index in shared if self.exact[self.keys[index]] == best
+        ):
+            return Resolution(best, score, best, True)
+        return Resolution(fallback, score, best, False)
+
+
+def build_entries():
+    """Alias dari DB dan seed: TeamAlias lebih dulu (keputusan admin menang), lalu SEED_ALIASES, lalu nama Team."""
+    from .models import Team, TeamAlias
+
+    entries = list(TeamAlias.objects.values_list('alias', 'team__name'))
+    entries.extend(SEED_ALIASES.items())
+    entries.extend((canonical, canonical) for canonical in SEED_ALIASES.values())
+    entries.extend((name, name) for name in Team.objects.values_list('name', flat=True))
+    return entries
+
+
+def get_resolver():
+    """Resolver milik proses ini; dibangun ulang bila generation di cache berubah."""
+    global _resolver, _resolver_generation, _checked_at
+
+    now = time.monotonic()
+    if _resolver is not None and now - _checked_at < REFRESH_INTERVAL:
+        return _resolver
+    generation = cache.get(GENERATION_KEY, 0)
+    with _resolver_lock:
+        if _resolver is None or generation != _resolver_generation:
+            _resolver = TeamNameResolver(build_entries())
+            _resolver_generation = generation
+        _checked_at = now
+        return _resolver
+
+
+def invalidate():
+    """Bangun ulang indeks di proses ini segera dan di proses lain dalam REFRESH_INTERVAL."""
+    global _resolver
+
+    _resolver = None
+    if not cache.add(GENERATION_KEY, 1, None):
+        cache.incr(GENERATION_KEY)
+
+
+def on_team_changed(sender, instance=None, raw=False, **kwargs):
+    """Signal post_save/post_delete Team dan TeamAlias."""
+    if not raw:
+        invalidate()
+
+
+# --- RESOLVE + ANTRIAN TINJAUAN ---
+def resolve(name):
+    """Resolve nama tim; nama yang tidak yakin dicatat untuk flush_review_queue()."""
+    resolution = get_resolver().resolve(name)
+    if not resolution.confident and resolution.name:
+        with _review_lock:
+            _review_queue[resolution.name] = (resolution.suggestion, resolution.score)
+    return resolution
+
+
+def flush_review_queue():
+    """Simpan nama yang tertunda ke TeamNameReview (satu upsert bulk). Mengembalikan jumlah nama."""
+    from .models import TeamNameReview
+
+    with _review_lock:
+        pending = dict(_review_queue)
+        _review_queue.clear()
+    if not pending:
+        return 0
+    TeamNameReview.objects.bulk_create(
+        [TeamNameReview(name=name, suggestion=suggestion, score=score) for name, (suggestion, score) in pending.items()],
+        update_conflicts=True, unique_fields=['name'], update_fields=['suggestion', 'score', 'last_seen'],
+    )
+    return len(pending)
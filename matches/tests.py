@@ -13,10 +13,11 @@ from django.contrib.messages import get_messages
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
 
-from matches.models import Match, Team, Venue, TicketPrice
+from matches.models import Match, Team, TeamAlias, TeamNameReview, Venue, TicketPrice
 from reviews.models import Review
-from bookings.models import Booking, Ticket
-from matches import services
+from bookings import ledger, shards
+from bookings.models import Booking, StockMovement, StockShard, Ticket
+from matches import services, team_resolver
 from matches.forms import MatchForm, TicketPriceFormSet
 
 User = get_user_model()
@@ -677,4 +678,186 @@ class MatchServicesTests(TestCase):
         
         self.assertEqual(Team.objects.count(), 2)
         updated_team = Team.objects.get(name="Persija Jakarta")
-        self.assertEqual(updated_team.league, 'liga_1')
\ No newline at end of file
+        self.assertEqual(updated_team.league, 'liga_1')
+
+    def test_bulk_sync_upserts_in_constant_queries(self):
+        rows = [
+            {
+                'id': 1000 + i, 'date_str': f'2025-10-{10 + i % 10}T10:00:00+00:00',
+                'home_team': f'Tim {i}', 'away_team': f'Tim {i + 1}',
+                'home_goals': None, 'away_goals': None,
+                'venue': f'Stadion {i % 3}', 'city': 'Kota',
+                'home_team_api_id': 100 + i, 'away_team_api_id': 101 + i,
+            }
+            for i in range(20)
+        ]
+        # SELECT hash + 9 query (SELECT/INSERT per fase) + SAVEPOINT/RELEASE transaksi
+        # + 7 query INITIAL ledger untuk TicketPrice baru (lihat _init_ticket_stock)
+        with self.assertNumQueries(19):
+            result = services.bulk_sync(rows)
+        self.assertEqual(result['matches_created'], 20)
+        self.assertEqual((result['teams_created'], result['venues_created']), (21, 3))
+        self.assertEqual(TicketPrice.objects.filter(match__api_id__gte=1000).count(), 60)
+        self.assertEqual(set(result['timings']), {'normalize', 'teams_venues', 'matches'})
+
+        rows[0].update(home_goals=2, away_goals=1)
+        for row in rows[::3]:
+            row['city'] = 'Kota Baru'
+        rows.append({**rows[1], 'id': 999, 'date_str': 'bukan tanggal'})
+        result = services.bulk_sync(rows)
+        self.assertEqual((result['matches_created'], result['matches_updated'], result['matches_skipped']), (0, 7, 13))
+        self.assertEqual((result['teams_created'], result['teams_updated']), (0, 0))
+        self.assertEqual(result['venues_updated'], 1)
+        match = Match.objects.get(api_id=1000)
+        self.assertEqual((match.status_short, match.home_goals), ('FT', 2))
+        self.assertEqual(match.venue.city, 'Kota Baru')
+        self.assertEqual(match.ticket_prices.count(), 3)
+        self.assertFalse(Match.objects.filter(api_id=999).exists())
+
+    @override_settings(INVENTORY_SHARDS=4, INVENTORY_SHARD_MIN_QUANTITY=500)
+    def test_bulk_sync_initialises_stock_for_new_ticket_prices(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            services.bulk_sync(self.sample_normalized_data)
+
+        match = Match.objects.get(api_id=self.sample_normalized_data[0]['id'])
+        self.assertEqual(ledger.reconcile(match_ids=[match.id])['seeded'], 0)
+        self.assertEqual(
+            dict(StockMovement.objects.filter(ticket_price__match=match, reason='INITIAL')
+                 .values_list('ticket_price__seat_category', 'delta')),
+            {'VVIP': 50, 'VIP': 200, 'REGULAR': 1000},
+        )
+        regular = match.ticket_prices.get(seat_category='REGULAR')
+        self.assertEqual(shards.totals([regular.pk]), {regular.pk: 1000})
+        self.assertFalse(StockShard.objects.filter(ticket_price__match=match).exclude(ticket_price=regular).exists())
+
+    def test_bulk_sync_skips_unchanged_matches(self):
+        services.bulk_sync(self.sample_normalized_data)
+        match = Match.objects.get(api_id=123)
+        self.assertEqual(len(match.sync_hash), 64)
+        self.assertIsNotNone(match.updated_at)
+
+        # Hash sama: hanya satu SELECT hash + transaksi kosong, tidak ada tulisan
+        with self.assertNumQueries(3):
+            result = services.bulk_sync([dict(reversed(list(self.sample_normalized_data[0].items())))])
+        self.assertEqual((result['matches_updated'], result['matches_skipped']), (0, 1))
+        self.assertEqual(Match.objects.get(api_id=123).updated_at, match.updated_at)
+
+        result = services.bulk_sync(self.sample_normalized_data, force=True)
+        self.assertEqual((result['matches_updated'], result['matches_skipped']), (1, 0))
+
+        changed = [{**self.sample_normalized_data[0], 'home_goals': 3, 'away_goals': 0}]
+        result = services.bulk_sync(changed)
+        self.assertEqual(result['matches_updated'], 1)
+        match.refresh_from_db()
+        self.assertEqual((match.status_short, match.home_goals), ('FT', 3))
+        self.assertNotEqual(match.sync_hash, services._sync_hash(self.sample_normalized_data[0]))
+
+    def test_iter_json_array_streams_small_chunks(self):
+        data = [{'id': 1, 'name': 'Tim "A"', 'nested': [1, 2, {'x': None}]}, 12345, 'teks, dengan ]', True, 67.5, -1.5e10]
+        path = self.mock_json_dir / 'stream.json'
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        try:
+            for chunk_size in (1, 3, 1024):
+                self.assertEqual(list(services._iter_json_array(path, chunk_size=chunk_size)), data)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('[{"id": 1}, {"id": 2')
+            stream = services._iter_json_array(path, chunk_size=4)
+            self.assertEqual(next(stream), {'id': 1})
+            with self.assertRaises(ValueError):
+                next(stream)
+        finally:
+            os.remove(path)
+
+    @patch('matches.services._fetch_freeapi_matches')
+    def test_fixture_stream_feeds_bulk_sync_in_chunks(self, mock_fetch):
+        mock_fetch.return_value = []
+        # Match muncul sebelum tim/venue seperti pada db_backup.json asli
+        fixture = [item for item in self.sample_db_fixture_data if item['model'] == 'matches.match']
+        fixture += [
+            {"model": "matches.match", "pk": 2, "fields": {
+                "api_id": 124, "date": "2025-10-17T10:00:00+00:00",
+                "home_team": 2, "away_team": 1, "venue": 1, "home_goals": 1, "away_goals": 1,
+            }},
+            {"model": "matches.match", "pk": 3, "fields": {
+                "api_id": 125, "date": "2025-10-24T10:00:00+00:00",
+                "home_team": 1, "away_team": 99, "venue": 1, "home_goals": None, "away_goals": None,
+            }},
+        ]
+        fixture += [item for item in self.sample_db_fixture_data if item['model'] != 'matches.match']
+        with open(self.mock_db_fixture_file, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f)
+
+        data, source = services._get_sync_data(stream=True)
+        self.assertEqual(source, "db_fixture")
+        self.assertNotIsInstance(data, list)
+        result = services.bulk_sync_stream(data, chunk_size=1)
+
+        self.assertEqual((result['chunks'], result['received'], result['matches_created']), (2, 2, 2))
+        self.assertIn('load', result['timings'])
+        self.assertEqual(Match.objects.get(api_id=124).home_team.name, "Persib Bandung")
+        self.assertEqual(TicketPrice.objects.count(), 6)
+        # Cache API ditulis sambil streaming dan diganti hanya setelah selesai
+        self.assertEqual([match['id'] for match in services._load_from_api_cache()], [123, 124])
+        self.assertFalse((self.mock_json_dir / 'matches_backup.json.tmp').exists())
+
+
+class TeamResolverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        team_resolver.invalidate()
+        team_resolver.flush_review_queue()
+
+    def test_resolves_spelling_variants_with_confidence(self):
+        resolver = team_resolver.TeamNameResolver(team_resolver.build_entries())
+        exact = resolver.resolve("Persepam Madura Utd")
+        self.assertEqual((exact.name, exact.score, exact.confident), ("Madura United FC", 1.0, True))
+        self.assertEqual(resolver.resolve("Semen Padang F.C.").name, "Semen Padang FC")
+
+        typo = resolver.resolve("Persebya Surabaya")
+        self.assertTrue(typo.confident)
+        self.assertEqual(typo.name, "Persebaya Surabaya")
+        self.assertLess(typo.score, 1.0)
+
+        # Nama pendek yang mirip beberapa tim tidak boleh dipetakan otomatis
+        ambiguous = resolver.resolve("Persis")
+        self.assertFalse(ambiguous.confident)
+        self.assertEqual(ambiguous.name, "Persis")
+        self.assertEqual(resolver.resolve("Persela Lamongan").name, "Persela Lamongan")
+
+    def test_unknown_clubs_with_similar_names_are_not_merged(self):
+        resolver = team_resolver.TeamNameResolver(team_resolver.build_entries())
+        for name, suggestion in [
+            ("Persikab Bandung", "Persib Bandung"),
+            ("Persikota Tangerang", "Persita Tangerang"),
+            ("Persijap Jakarta", "Persija Jakarta"),
+        ]:
+            resolution = resolver.resolve(name)
+            self.assertFalse(resolution.confident, name)
+            self.assertEqual((resolution.name, resolution.suggestion), (name, suggestion))
+        # Salah ketik satu huruf pada token panjang dan spasi bergeser tetap dipetakan
+        self.assertEqual(resolver.resolve("PSIMYogyakarta").name, "PSIM Yogyakarta")
+        self.assertTrue(resolver.resolve("Persebaya Surbaya").confident)
+
+    def test_alias_table_and_review_queue(self):
+        self.assertEqual(services._clean_team_name("Persija Jkt"), "Persija Jkt")
+        self.assertEqual(team_resolver.flush_review_queue(), 1)
+        review = TeamNameReview.objects.get(name="Persija Jkt")
+        self.assertEqual(review.suggestion, "Persija Jakarta")
+        self.assertEqual(team_resolver.flush_review_queue(), 0)
+
+        admin = User.objects.create_superuser(username='resolveradmin', password='password123', email='ra@example.com')
+        team = Team.objects.create(name="Persija Jakarta")
+        self.client.force_login(admin)
+        self.client.post(reverse('admin:matches_teamnamereview_changelist'), {
+            'action': 'create_alias_to_suggestion', '_selected_action': [review.pk],
+        })
+        self.assertEqual(TeamAlias.objects.get().team, team)
+        self.assertEqual(TeamAlias.objects.get().alias, "persija jkt")
+        review.refresh_from_db()
+        self.assertTrue(review.resolved)
+
+        # Signal TeamAlias membangun ulang indeks
+        self.assertEqual(services._clean_team_name("PERSIJA JKT."), "Persija Jakarta")
+        self.assertEqual(team_resolver.flush_review_queue(), 0)
+
@@ -1,7 +1,9 @@
+import shutil
+import tempfile
 import uuid
 from io import BytesIO
 from PIL import Image
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.utils import timezone
@@ -11,8 +13,18 @@ from news.models import News, CATEGORY_CHOICES
 # Menyimpan model User (hasil get_user_model) ke variabel User
 User = get_user_model()
 
+# Thumbnail hasil upload di test ditulis ke folder sementara, bukan ke media/ repo
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+
+
 # Kelas test untuk menguji views di app news
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
 class NewsViewsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
     # setUp dipanggil sebelum setiap test dijalankan
     def setUp(self):
         self.client = Client()
@@ -1,4 +1,3 @@
-import hashlib
 import json
 import re
 from django.urls import reverse
@@ -13,6 +12,8 @@ from authentication.models import User
 from authentication.views import flutter_logout, logout_user
 from profiles.models import AdminJournalistProfile, Profile
 from bookings.models import Booking, Ticket
+from bookings.pagination import InvalidCursor, keyset_page, page_params
+from bookings.serializers import TicketSerializer, ticket_rows
 # import base64
 # import imghdr
 from django.core.files.base import ContentFile
@@ -404,37 +405,27 @@ def user_tickets_json(request, id):
     if request.user.role != "user" or request.user.id != id:
         return JsonResponse({"error": "Unauthorized"}, status=403)
 
-    tickets = (
-        Ticket.objects
-        .select_related("booking", "ticket_type__match", "ticket_type__match__home_team", "ticket_type__match__away_team")
-        .filter(booking__user_id=id, booking__status="CONFIRMED")
-        .order_by("-generated_at")
-    )
+    status_filter = request.GET.get("status")
+    if status_filter and status_filter not in Ticket.STATUSES:
+        return JsonResponse({"error": "Invalid status filter"}, status=400)
 
-    results = []
-    for t in tickets:
-        tt = t.ticket_type
-        match = tt.match
-        raw = f"{t.ticket_id}:{t.generated_at.timestamp()}"
-        barcode_code = hashlib.sha1(raw.encode()).hexdigest()[:16].upper()
-
-        results.append({
-            "ticket_id": str(t.ticket_id),
-            "match_id": str(match.id),
-            "seat_category": tt.seat_category,
-            "match_home": getattr(match.home_team, "name", "-"),
-            "match_away": getattr(match.away_team, "name", "-"),
-            "home_logo": match.home_team.display_logo_url if match.home_team else None,
-            "away_logo": match.away_team.display_logo_url if match.away_team else None,
-            "venue": getattr(match.venue, "name", "-"),
-            "date": match.date.strftime("%d %b %Y, %H:%M") if match.date else "-",
-            "match_iso": match.date.isoformat() if match.date else None,
-            "barcode_code": barcode_code,
-            "is_used": t.is_used,
-            "generated_at": t.generated_at.strftime("%Y-%m-%d %H:%M"),
-        })
+    cursor, limit = page_params(request)
+    serializer = TicketSerializer(request)
+    tickets = Ticket.objects.filter(user_id=id, booking__status="CONFIRMED")
+    try:
+        rows, next_cursor = keyset_page(
+            ticket_rows(tickets.with_status(status_filter, serializer.now), serializer.now),
+            "generated_at", "ticket_id", cursor, limit,
+        )
+    except InvalidCursor as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    results = [serializer.profile(row) for row in rows]
 
-    return JsonResponse({"tickets": results})
+    data = {"tickets": results, "next_cursor": next_cursor}
+    if not cursor:
+        data["counts"] = tickets.status_counts(serializer.now)
+    return JsonResponse(data)
 
 # ======================================== Flutter
 @csrf_exempt